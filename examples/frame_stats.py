@@ -77,6 +77,10 @@ if __name__ == '__main__':
         summary['Janks'] = trace.android.num_janks(interval=INTERVAL)
         summary['Janks Per Second'] = summary['Janks']/total_duration
         summary['Average FPS'] = trace.android.framerate(interval=INTERVAL)
+        # FPS for every 1s window (NaN when nothing presented)
+        fps = Series(trace.android.framerate_windows(window=1.0, interval=INTERVAL).fps).dropna()
+        summary['Min FPS (1s)'] = fps.min()
+        summary['10% FPS (1s)'] = fps.quantile(.1)
         sb_all[F_DICT[fp]] = summary
     
     sb_all.to_csv(r'{path}\frame_stats.csv'.format(path=PATH))
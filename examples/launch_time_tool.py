@@ -41,4 +41,13 @@ for i in range(10):
 		time.sleep(7)
 		Stop_Activity = 'adb shell am force-stop ' + Pkg_List[key]
 		os.system(Stop_Activity)
-		time.sleep(10)
\ No newline at end of file
+		time.sleep(10)
+
+#Report launch latency of each captured trace i.e. first time app seen on CPU
+#till last screen update it caused (see `trace.android.app_launch_latencies`)
+from ftrace import Ftrace
+for i in range(10):
+	for key in App_List:
+		trace = Ftrace(key+'_'+str(i)+'.html')
+		for launch in trace.android.app_launch_latencies():
+			print key, i, launch.task.name, launch.latency
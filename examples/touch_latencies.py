@@ -23,6 +23,7 @@
 import glob
 import os
 import sys
+from bisect import bisect
 from pandas import Series, DataFrame
 FTRACE_DIR = os.path.join(
     os.path.expanduser("~"),
@@ -53,6 +54,13 @@ def parse_file(filepath):
     trace = Ftrace(filepath)
     return (filepath, trace)
 
+def frequency_at(freq_intervals, timestamp):
+    """Returns cpu frequency as-of timestamp, None if unknown"""
+    idx = bisect(freq_intervals._start_times, timestamp) - 1
+    if idx >= 0 and freq_intervals[idx].interval.end >= timestamp:
+        return freq_intervals[idx].frequency
+    return None
+
 if __name__ == '__main__':
     _files = glob.glob(r'{path}\*{file_ext}'.format(path=PATH, file_ext=FILE_EXT))
     F_DICT = {_fp: os.path.split(_fp)[1].split('.')[0] for _fp in _files}
@@ -64,13 +72,17 @@ if __name__ == '__main__':
         fp, trace = parse_file(_file)
 
         total_duration = trace.duration if INTERVAL is None else INTERVAL
-        ss = Series((event.interval.duration * 1000 for event in trace.android.input_latencies(TOUCH_IRQ, interval=INTERVAL)))
+        input_latencies = trace.android.input_latencies(TOUCH_IRQ, interval=INTERVAL)
+        ss = Series((event.interval.duration * 1000 for event in input_latencies))
         summary = ss.describe()
         summary['90%'] = ss.quantile(.9)
         summary['Janks Per Second'] = trace.android.jankrate(interval=INTERVAL)
         summary['Average FPS'] = trace.android.framerate(interval=INTERVAL)
         
-        ss_first = Series((event.interval.duration * 1000 for event in trace.android.input_latencies(TOUCH_IRQ, interval=INTERVAL) if trace.cpu.frequency_intervals(cpu=0, interval=event.interval) and  trace.cpu.frequency_intervals(cpu=0, interval=event.interval)[0] == 384000))
+        # latencies starting with cpu0 at lowest frequency (as-of input start)
+        freq_intervals = trace.cpu.frequency_intervals(cpu=0)
+        ss_first = Series((event.interval.duration * 1000 for event in input_latencies
+                           if frequency_at(freq_intervals, event.interval.start) == 384000))
         summary_first = ss_first.describe()
         summary_first['90%'] = ss_first.quantile(.9)
         summary_first['Janks Per Second'] = summary['Janks Per Second']
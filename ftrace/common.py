@@ -97,7 +97,7 @@ def bind_method(cls, name, func):
         setattr(cls, name, func)
 
 
-def filter_by_task(iterable, attr, value, how='first'):
+def filter_by_task(iterable, attr, value, how='first', interval=None):
     """
     Filter iterable to objects whose `attr` has `value`.
 
@@ -105,21 +105,43 @@ def filter_by_task(iterable, attr, value, how='first'):
     ----------
 
     iterable : iterable
-        Iterable <list, set> object
+        Iterable <list, set> object, or `TaskIndex` (see composites) which
+        only looks up indexed subset for 'pid'/'name' (binary search for
+        interval) instead of scanning every object.
     attr : string
         Name of attribute to compare.
     value : object
-        Value to filter by.
+        Value to filter by. For 'name', can also be compiled regex.
     how : string
         Which events to return. Valid args: 'any'/'all', 'first', 'last'
+    interval : Interval (optional)
+        Only objects with timestamp (or start) within interval.
     """
+    lookup = getattr(iterable, 'lookup', None)
+    if lookup is not None and attr in iterable.attrs:
+        return lookup(attr, value, how=how, interval=interval)
+    elif lookup is not None:
+        raise FtraceError(msg="Unsupported attribute for TaskIndex: {}".format(attr))
+
+    match = value.match if attr == 'name' and hasattr(value, 'match') else None
+
     def filter_func(event):
+        if interval is not None:
+            timestamp = getattr(event, 'timestamp', None)
+            if timestamp is None:
+                timestamp = event.interval.start
+            if not interval.start <= timestamp <= interval.end:
+                return False
         try:
-            return getattr(event.task, attr, None) == value
+            task_value = getattr(event.task, attr, None)
         except AttributeError:
-            return getattr(event.event.task, attr, None) == value
-        except:
-            return False
+            try:
+                task_value = getattr(event.event.task, attr, None)
+            except AttributeError:
+                return False
+        if match is not None:
+            return task_value is not None and match(task_value) is not None
+        return task_value == value
 
     filtered = ifilter(filter_func, iterable)
     rv = None
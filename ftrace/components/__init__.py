@@ -7,4 +7,11 @@ from .disk import Disk
 from .camera import Camera
 from .audio import Audio
 from .thermal import Thermal
-from .bus import Bus
\ No newline at end of file
+from .bus import Bus
+from .migrations import Migrations
+from .summary import Summary
+from .energy import Energy
+from .latency import Latency
+from .workqueue import Workqueue
+from .irq import IRQ
+from .sync import Sync
\ No newline at end of file
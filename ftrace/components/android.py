@@ -25,14 +25,19 @@ except ImportError:
     logging.basicConfig()
     from logging import getLogger as Logger
 
+import math
+from array import array
+from bisect import bisect_left, bisect_right
 from collections import defaultdict, namedtuple
+from heapq import heappush, heappop, merge
 from ftrace.interval import Interval, IntervalList
 from ftrace.event import EventList
 from ftrace.ftrace import register_api, FTraceComponent
-from ftrace.composites import sorted_items
+from ftrace.composites import sorted_items, Cursor, TaskIndex
 from ftrace.utils.decorators import requires, coroutine, memoize
 from ftrace.atrace import AtraceTag
-from ftrace.common import filter_by_task
+from ftrace.task import TaskState
+from ftrace.common import ConstantBase, filter_by_task
 from six import string_types
 
 log = Logger('Android')
@@ -49,6 +54,86 @@ LaunchLatency = namedtuple('LaunchLatency', ['task', 'interval', 'latency'])
 InputLatency = namedtuple('InputLatency', ['interval', 'latency'])
 # For Rendering intervals
 Rendering = namedtuple('Rendering', ['interval'])
+# SF VSYNC intervals & frames presented in each, stored column-wise
+VsyncTimeline = namedtuple('VsyncTimeline', ['start', 'duration', 'frames'])
+# Frames, present time & FPS per fixed window, stored column-wise
+FrameRates = namedtuple('FrameRates', ['start', 'frames', 'present_time', 'fps'])
+# Nested (B/E) slices of a thread in begin order, stored column-wise.
+# `parent` is index of enclosing slice (-1 for root), `name` index into names.
+ThreadSlices = namedtuple('ThreadSlices', ['start', 'end', 'depth', 'parent', 'name'])
+# Node in slice tree, with self time (excluding children) within interval
+SliceNode = namedtuple('SliceNode', ['name', 'depth', 'interval', 'self_time', 'children'])
+# Total & self time (and count) per call path in flame graph
+FlameStats = namedtuple('FlameStats', ['total', 'self_time', 'count'])
+# Async (S/F) spans in begin order, stored column-wise. `lane` is
+# (non-overlapping) lane within (pid, name) track, `name` index into names.
+AsyncSlices = namedtuple('AsyncSlices', ['pid', 'name', 'cookie', 'lane', 'start', 'end'])
+AsyncSlice = namedtuple('AsyncSlice', ['pid', 'name', 'cookie', 'lane', 'interval'])
+# Counter samples of (pid, name) track, stored column-wise
+CounterTrack = namedtuple('CounterTrack', ['timestamp', 'value'])
+# Time-weighted mean, min & max of counter
+CounterStats = namedtuple('CounterStats', ['mean', 'min', 'max'])
+# Per-frame pipeline (UI thread -> RenderThread -> SF), stored column-wise.
+# `pid` is app process, `vsync` start of frame's SF VSYNC, `present` time
+# SF posted it (NaN if unknown/never) and `missed` 1 if past deadline.
+FramePipeline = namedtuple('FramePipeline', ['pid', 'vsync', 'ui_start', 'ui_duration',
+                                             'render_start', 'render_duration',
+                                             'present', 'missed'])
+# Frame that missed its deadline, attributed to its longest stage
+MissedFrame = namedtuple('MissedFrame', ['pid', 'stage', 'interval'])
+
+class FrameStage(ConstantBase):
+    UI = ()
+    RENDER = ()
+    COMPOSITION = ()
+
+
+class _NameIndex(object):
+    """
+    Sorted (suffix array style) index over section/counter names,
+    resolving prefix & substring patterns in O(log n + matches).
+
+    Suffixes are kept as (name index, offset) pairs and compared lazily,
+    so memory is linear in total length of names.
+    """
+    def __init__(self, names):
+        self._names = names = sorted(names)
+        # buffer is a view (no copy) comparing like the suffix it covers.
+        suffixes = sorted(((name_idx, offset) for name_idx, name in enumerate(names)
+                           for offset in xrange(len(name))),
+                          key=lambda suffix: buffer(names[suffix[0]], suffix[1]))
+        self._suffix_names = array('l', (name_idx for name_idx, _ in suffixes))
+        self._suffix_offsets = array('l', (offset for _, offset in suffixes))
+
+    def prefixed(self, prefix):
+        """Returns frozenset of names starting with prefix"""
+        rv = set()
+        for name in self._names[bisect_left(self._names, prefix):]:
+            if not name.startswith(prefix):
+                break
+            rv.add(name)
+        return frozenset(rv)
+
+    def containing(self, pattern):
+        """Returns frozenset of names containing pattern"""
+        names, suffix_names, offsets = self._names, self._suffix_names, self._suffix_offsets
+        end = len(pattern)
+        # bisect_left, comparing only first len(pattern) chars of suffixes.
+        lo, hi = 0, len(suffix_names)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            offset = offsets[mid]
+            if names[suffix_names[mid]][offset:offset + end] < pattern:
+                lo = mid + 1
+            else:
+                hi = mid
+        rv = set()
+        for idx in xrange(lo, len(suffix_names)):
+            name = names[suffix_names[idx]]
+            if not name.startswith(pattern, offsets[idx]):
+                break
+            rv.add(name)
+        return frozenset(rv)
 
 
 @register_api('android')
@@ -86,6 +171,21 @@ class Android(FTraceComponent):
 
         self.__event_handlers = {}
         self._tmw_intervals_by_name = defaultdict(IntervalList)
+        # per-thread nested slices & (shared) slice names
+        self._slices_by_pid = {}
+        self._slice_names = []
+        # async spans, their names & begin events, and index by name
+        self._async_slices = AsyncSlices(pid=array('l'), name=array('l'),
+                                         cookie=array('l'), lane=array('h'),
+                                         start=array('d'), end=array('d'))
+        self._async_names = []
+        self._async_begin_events = []
+        self._async_idx_by_name = defaultdict(lambda: array('l'))
+        # counter tracks by (pid, name), and their keys by name
+        self._counter_tracks = {}
+        self._counter_keys_by_name = defaultdict(list)
+        # input latencies by touch irq name
+        self._input_latencies_by_irq = {}
 
     def _initialize(self):
         self._parse_tmw_events()
@@ -93,33 +193,119 @@ class Android(FTraceComponent):
     @property
     @requires('tracing_mark_write')
     def event_names(self):
-        return set(self._tmw_intervals_by_name.keys())
+        return set(self._tmw_intervals_by_name.keys()).union(
+            self._counter_keys_by_name.keys())
+
+    @property
+    @requires('tracing_mark_write')
+    def counter_keys(self):
+        """(pid, name) keys of counter tracks seen"""
+        return sorted(key for keys in self._counter_keys_by_name.itervalues()
+                      for key in keys)
 
     @requires('tracing_mark_write')
     @memoize
     def event_intervals(self, name=None, task=None,
-                        interval=None, match_exact=True):
+                        interval=None, match_exact=True, match_prefix=False):
         """Returns event intervals for specified `name` and `task`
         Name here implies `section` or `counter` name.
+
+        If not `match_exact`, name matches any name containing it (or
+        starting with it if `match_prefix`). Matching names are resolved
+        via name index and their intervals merged (once) & cached.
         """
         if name is None:
-            intervals = \
-                IntervalList(sorted_items(self._tmw_intervals_by_name.values()))
+            intervals = self._merged_intervals(frozenset(self.event_names))
         elif isinstance(name, string_types):
-            if match_exact:
-                intervals = self._tmw_intervals_by_name[name]
+            if match_prefix:
+                intervals = self._merged_intervals(self._name_index.prefixed(name))
+            elif match_exact:
+                intervals = self._named_intervals(name)
             else:
-                intervals = IntervalList(sorted_items(value for key, value in
-                    self._tmw_intervals_by_name.iteritems() if name in key))
+                intervals = self._merged_intervals(self._name_index.containing(name))
         else: # assume iterable (must match exact)
-            intervals = IntervalList(sorted_items(value for key, value in
-                    self._tmw_intervals_by_name.iteritems() if key in name))
+            intervals = self._merged_intervals(
+                frozenset(name).intersection(self.event_names))
         intervals = intervals.slice(interval=interval)
         if task:
             intervals = IntervalList(filter(lambda it: it.event.task == task, intervals))
 
         return intervals
 
+    @requires('tracing_mark_write')
+    @memoize
+    def context_index(self):
+        """
+        Returns `TaskIndex` (by pid & name of thread that wrote them) over
+        all event intervals, for indexed `filter_by_task` lookups.
+        """
+        return TaskIndex(self.event_intervals())
+
+    @property
+    def _name_index(self):
+        try:
+            return self.__name_index
+        except AttributeError:
+            self.__name_index = _NameIndex(self.event_names)
+            return self.__name_index
+
+    @memoize
+    def _merged_intervals(self, names):
+        """Returns (cached) IntervalList merging intervals of all names"""
+        if len(names) == 1:
+            return self._named_intervals(next(iter(names)))
+        return IntervalList(sorted_items(self._named_intervals(name)
+                                         for name in names))
+
+    @memoize
+    def _named_intervals(self, name):
+        """
+        Returns (cached) IntervalList of contexts and/or `Counter` intervals
+        of name. Counter intervals are built on first use from per-track
+        arrays, merged across pids.
+        """
+        intervals = [self._counter_intervals(key)
+                     for key in self._counter_keys_by_name.get(name, [])]
+        if name in self._tmw_intervals_by_name:
+            intervals.append(self._tmw_intervals_by_name[name])
+        if not intervals:
+            return IntervalList()
+        elif len(intervals) == 1:
+            return intervals[0]
+        return IntervalList(sorted_items(intervals))
+
+    def _counter_intervals(self, key):
+        """
+        Returns IntervalList of `Counter` of (pid, name) track, with each
+        value holding till next sample. Value is unknown (-1) before
+        first sample.
+        """
+        pid, name = key
+        track = self._counter_tracks[key]
+        rv = IntervalList()
+        last_timestamp, last_value, last_event = self._trace.interval.start, -1.0, None
+        for timestamp, value in zip(track.timestamp, track.value):
+            rv.append(Counter(pid=pid, name=name, event=last_event, value=last_value,
+                              interval=Interval(last_timestamp, timestamp)))
+            last_timestamp, last_value = timestamp, value
+            last_event = self._counter_event(key, timestamp)
+        rv.append(Counter(pid=pid, name=name, event=last_event, value=last_value,
+                          interval=Interval(last_timestamp, self._trace.duration)))
+        return rv
+
+    def _counter_event(self, key, timestamp):
+        """Returns `tracing_mark_write` event of (pid, name) counter sample at timestamp"""
+        events = self._events
+        idx = bisect_left(events._timestamps, timestamp)
+        while idx < len(events) and events[idx].timestamp == timestamp:
+            event = events[idx]
+            if event.tracepoint == 'tracing_mark_write' and \
+                    (getattr(event.data, 'pid', None),
+                     getattr(event.data, 'counter_name', None)) == key:
+                return event
+            idx += 1
+        return None
+
     #--------------------------------------------------------------------------
     """
     Utility script to estimate Frame Rate (FPS) and Jank.
@@ -174,16 +360,9 @@ class Android(FTraceComponent):
     def present_duration(self, interval=None):
         """
         """
-        present_duration = 0.0
-        vsync_events = self.event_intervals(name='VSYNC-sf', interval=interval)
-        if not vsync_events:
-            vsync_events = self.event_intervals(name='VSYNC', interval=interval)
-        for vsync_event in vsync_events:
-            duration = vsync_event.interval.duration
-            if duration < 2*VSYNC:
-                present_duration += duration
-        return present_duration
-
+        vsync_timeline = self._vsync_timeline(interval=interval)
+        return sum(duration for duration in vsync_timeline.duration
+                   if duration < 2*VSYNC)
 
     @requires('tracing_mark_write')
     @memoize
@@ -200,32 +379,203 @@ class Android(FTraceComponent):
 
         See https://source.android.com/devices/graphics/implement.html
         """
-        total_frames = 0.0
+        vsync_timeline = self._vsync_timeline(interval=interval)
+        total_frames = float(sum(vsync_timeline.frames))
+        present_time = self.present_duration(interval=interval)
+        return round(total_frames/present_time, 1) if present_time != 0.0 else float('nan')
+
+    @requires('tracing_mark_write')
+    @memoize
+    def framerate_windows(self, window=1.0, interval=None):
+        """
+        Returns `FrameRates` of arrays with frames, present time & FPS
+        (NaN if nothing presented) for every `window` seconds of interval.
+        Each SF VSYNC interval is counted (whole) in window it starts in.
+        """
+        interval = interval or self._trace.interval
+        num_windows = max(int(math.ceil(interval.duration / window)), 1)
+        frames = array('l', [0]) * num_windows
+        present_times = array('d', [0.0]) * num_windows
+        # whole trace timeline, so VSYNC intervals are not trimmed at edges.
+        starts, durations, vsync_frames = self._vsync_timeline()
+        lo = bisect_left(starts, interval.start)
+        hi = bisect_left(starts, interval.end)
+        for idx in xrange(lo, hi):
+            window_idx = min(int((starts[idx] - interval.start) / window), num_windows - 1)
+            frames[window_idx] += vsync_frames[idx]
+            if durations[idx] < 2*VSYNC:
+                present_times[window_idx] += durations[idx]
+
+        return FrameRates(
+            start=array('d', (interval.start + idx * window for idx in xrange(num_windows))),
+            frames=frames,
+            present_time=present_times,
+            fps=array('d', (round(num_frames / present_time, 1) if present_time
+                            else float('nan') for num_frames, present_time
+                            in zip(frames, present_times))))
 
-        # These are times when SF begins compositing.
+    @memoize
+    def _vsync_timeline(self, interval=None):
+        """
+        Returns `VsyncTimeline` of arrays with start, duration & frames
+        presented for every SF VSYNC counter interval, in a single merge of
+        VSYNC timeline with (sorted) frame post times.
+
+        Frames are counted only if VSYNC toggled afterwards (SF had work).
+        """
         vsync_events = self.event_intervals(name='VSYNC-sf', interval=interval)
         if not vsync_events:
             vsync_events = self.event_intervals(name='VSYNC', interval=interval)
-
-        for vsync_event_a, vsync_event_b in zip(vsync_events, vsync_events[1:]) :               
-            frames_presented = len(self.event_intervals('postFramebuffer', 
-                                                        interval=vsync_event_a.interval))
+        post_timestamps = self._frame_post_timestamps()
+
+        starts = array('d', (ve.interval.start for ve in vsync_events))
+        durations = array('d', (ve.interval.duration for ve in vsync_events))
+        frames = array('l', [0]) * len(vsync_events)
+        # searchsorted-style count of posts within (start, end] of each VSYNC
+        for idx, (vsync_event_a, vsync_event_b) in \
+                enumerate(zip(vsync_events, vsync_events[1:])):
             # Below required to skip interval when we had nothing to do.
             # As this event 'toggles' every VSYNC when SurfaceFlinger has work
             # to do. If nothing is done (i.e. no 'postFramebuffer' events)
             # there was jank in this interval.
-            if vsync_event_a.value != vsync_event_b.value and frames_presented:
-                total_frames += frames_presented
-            
-        present_time = self.present_duration(interval=interval)
-        return round(total_frames/present_time, 1) if present_time != 0.0 else float('nan')
+            if vsync_event_a.value != vsync_event_b.value:
+                frames[idx] = \
+                    bisect_right(post_timestamps, vsync_event_a.interval.end) - \
+                    bisect_right(post_timestamps, vsync_event_a.interval.start)
+        return VsyncTimeline(start=starts, duration=durations, frames=frames)
+
+    @memoize
+    def _frame_post_timestamps(self):
+        """
+        Returns sorted array of times SF posted a frame i.e. start of
+        'postFramebuffer' (or 'doComposition' if not traced).
+        """
+        post_events = self.event_intervals(name='postFramebuffer')
+        if not post_events:
+            post_events = self.event_intervals(name='doComposition')
+        return array('d', (pe.interval.start for pe in post_events))
+
+    @requires('tracing_mark_write')
+    @memoize
+    def frame_pipeline(self, task=None, interval=None):
+        """
+        Returns `FramePipeline` of arrays with one entry per UI thread frame
+        (`Choreographer#doFrame`, or `performTraversals` if not traced) of
+        task's process (if any) starting within interval (if any), linked to
+        its RenderThread `DrawFrame` and SF composition that presented it.
+
+        Frame is missed if not presented within 2 VSYNCs of its VSYNC
+        (i.e. SF composition following next VSYNC), so works on builds
+        without `FrameMissed` counter.
+        """
+        pipeline = self._frame_pipeline()
+        pid = getattr(task, 'pid', task)
+        interval = interval or self._trace.interval
+        # frames are sorted by UI thread start.
+        lo = bisect_left(pipeline.ui_start, interval.start)
+        hi = bisect_right(pipeline.ui_start, interval.end)
+        indices = [idx for idx in xrange(lo, hi)
+                   if pid is None or pipeline.pid[idx] == pid]
+        if len(indices) == len(pipeline.ui_start):
+            return pipeline
+        return FramePipeline(*(array(column.typecode, (column[idx] for idx in indices))
+                               for column in pipeline))
+
+    @memoize
+    def _frame_pipeline(self):
+        """
+        Returns `FramePipeline` for all frames, linked in a single merged
+        pass over UI thread & RenderThread frames (sorted by start).
+
+        Frames are linked per app process, as atrace markers of both UI thread
+        and RenderThread carry the process pid: each `DrawFrame` is linked to
+        pending UI frame of its process, and each frame to first SF post
+        (see `_frame_post_timestamps`) after it was drawn.
+        """
+        ui_frames = self.event_intervals(name='Choreographer#doFrame')
+        if not ui_frames:
+            ui_frames = self.event_intervals(name='performTraversals')
+        render_frames = self.event_intervals(name=RENDER_THREAD_DRAW_NAMES)
+        post_timestamps = self._frame_post_timestamps()
+        vsync_starts = self._vsync_timeline().start
+        NaN = float('nan')
+
+        pipeline = FramePipeline(pid=array('l'), vsync=array('d'),
+                                 ui_start=array('d'), ui_duration=array('d'),
+                                 render_start=array('d'), render_duration=array('d'),
+                                 present=array('d'), missed=array('B'))
+        # process pid -> index of frame awaiting its DrawFrame
+        pending_by_pid = {}
+
+        for frame in sorted_items([ui_frames, render_frames]):
+            if frame.name in RENDER_THREAD_DRAW_NAMES:
+                idx = pending_by_pid.pop(frame.pid, None)
+                if idx is not None:
+                    pipeline.render_start[idx] = frame.interval.start
+                    pipeline.render_duration[idx] = frame.interval.duration
+                continue
+            start = frame.interval.start
+            idx = bisect_right(vsync_starts, start) - 1
+            pending_by_pid[frame.pid] = len(pipeline.pid)
+            pipeline.pid.append(frame.pid)
+            pipeline.vsync.append(vsync_starts[idx] if idx >= 0 else start)
+            pipeline.ui_start.append(start)
+            pipeline.ui_duration.append(frame.interval.duration)
+            pipeline.render_start.append(NaN)
+            pipeline.render_duration.append(NaN)
+
+        for idx, ui_start in enumerate(pipeline.ui_start):
+            render_start = pipeline.render_start[idx]
+            drawn = ui_start + pipeline.ui_duration[idx] if render_start != render_start \
+                else render_start + pipeline.render_duration[idx]
+            post_idx = bisect_left(post_timestamps, drawn)
+            present = post_timestamps[post_idx] if post_idx < len(post_timestamps) else NaN
+            deadline = pipeline.vsync[idx] + 2*VSYNC
+            pipeline.present.append(present)
+            # not presented by end of trace, only missed if deadline passed.
+            pipeline.missed.append(0 if present <= deadline or
+                                   (present != present and deadline > self._trace.duration)
+                                   else 1)
+        return pipeline
+
+    @requires('tracing_mark_write')
+    @memoize
+    def missed_frames(self, task=None, interval=None):
+        """
+        Returns IntervalList of `MissedFrame` from frame's VSYNC till it
+        was presented (or end of trace), attributed to stage that overran:
+        UI thread or RenderThread if still drawing by next VSYNC (when SF
+        would compose it), SF composition otherwise.
+        """
+        pipeline = self.frame_pipeline(task=task, interval=interval)
+        rv = IntervalList()
+        for idx, missed in enumerate(pipeline.missed):
+            if not missed:
+                continue
+            next_vsync = pipeline.vsync[idx] + VSYNC
+            render_duration = pipeline.render_duration[idx]
+            if pipeline.ui_start[idx] + pipeline.ui_duration[idx] > next_vsync:
+                stage = FrameStage.UI
+            elif render_duration == render_duration and \
+                    pipeline.render_start[idx] + render_duration > next_vsync:
+                stage = FrameStage.RENDER
+            else:
+                stage = FrameStage.COMPOSITION
+            present = pipeline.present[idx]
+            end = present if present == present else self._trace.duration
+            rv.append(MissedFrame(pid=pipeline.pid[idx], stage=stage,
+                                  interval=Interval(pipeline.vsync[idx], end)))
+        return rv
 
     @requires('tracing_mark_write')
     @memoize
     def jank_intervals(self, interval=None):
         """
         Returns list of intervals when a jank (missed frame) occurred.
+        Falls back to `missed_frames` if `FrameMissed` counter is not traced.
         """
+        if 'FrameMissed' not in self._counter_keys_by_name:
+            return self.missed_frames(interval=interval)
         missedFrames = self.event_intervals('FrameMissed', interval=interval)
         return IntervalList(filter(lambda x:x.value==1, missedFrames))
 
@@ -285,15 +635,21 @@ class Android(FTraceComponent):
     @memoize
     def input_latencies(self, irq_name, interval=None):
         """
-        Returns input-to-display latencies seen in trace.
+        Returns input-to-display latencies seen in trace, starting (i.e.
+        touch IRQ) within interval (if any).
 
         IMPORTANT: Trace must be collected with 'input' and 'view' events.
         """
         try:
-            return self._input_latencies.slice(interval=interval)
-        except AttributeError:
-            return self._input_latency_handler(irq_name=irq_name).\
-                        slice(interval=interval)
+            input_latencies = self._input_latencies_by_irq[irq_name]
+        except KeyError:
+            input_latencies = self._input_latency_handler(irq_name=irq_name)
+            self._input_latencies_by_irq[irq_name] = input_latencies
+        if interval is None:
+            return input_latencies
+        lo = bisect_left(input_latencies._start_times, interval.start)
+        hi = bisect_right(input_latencies._start_times, interval.end)
+        return IntervalList(input_latencies[lo:hi])
     
     @requires('tracing_mark_write')
     @memoize
@@ -308,13 +664,24 @@ class Android(FTraceComponent):
     
     def _input_latency_handler(self, irq_name):
         """
-        Returns list of all input events
+        Returns list of all input events.
+
+        Single forward merge over touch IRQ, InputReader, deliverInputEvent,
+        aq:pending & doComposition streams: each stream has a `Cursor`
+        answering "next event after t" lookups, which only move forward
+        as input windows are walked in time order.
         """
-        self._input_latencies = IntervalList()
-        all_tasks = self._trace.cpu.task_intervals()
-        all_aq_events = self.input_events()
-        touch_irqs = IntervalList(filter_by_task(
-            all_tasks, 'name', irq_name, 'any'))
+        input_latencies = IntervalList()
+        seen_timestamps = set()
+        task_index = self._trace.cpu.task_index()
+        touch_irqs = Cursor(task_index.subset('name', irq_name))
+        di_events = Cursor(self.event_intervals(name=['deliverInputEvent', 'input']))
+        pfb_events = Cursor(self.event_intervals(name='doComposition'))
+
+        # pid -> Cursor over pending input events (aq) of that task
+        aq_index = TaskIndex(self.input_events())
+        aq_events_by_pid = {pid: Cursor(aq_index.subset('pid', pid))
+                            for pid in aq_index.pids}
 
         def _input_intervals():
             """
@@ -333,68 +700,60 @@ class Android(FTraceComponent):
             had event to process. This could be disabled in some systems.
             """
             last_timestamp = self._trace.interval.start
-            for ir_event in filter_by_task(all_tasks, 'name', 'InputReader', 'any'):
+            for ir_event in filter_by_task(task_index, 'name', 'InputReader', 'any'):
                 yield Interval(last_timestamp, ir_event.interval.end)
                 last_timestamp = ir_event.interval.end
 
         for interval in _input_intervals():
-            irqs = touch_irqs.slice(interval=interval, trimmed=False)
+            irqs = touch_irqs.between(interval.start, interval.end)
             # Necessary as we may be interested in different IRQ name
-            if irqs:
-                # Use longest IRQ
-                start_ts = max(irqs, key=lambda x: x.interval.duration).interval.start
-
-
-                end_ts = start_ts
-                post_ir_interval = Interval(start_ts, self._trace.duration)
-                di_events = self.event_intervals(name=['deliverInputEvent', 'input'], interval=post_ir_interval)
-
-                if di_events:
-                    # IMPORTANT: If InputDispatcher sythesizes multiple
-                    # events to same application, we ignore consequent event
-                    # and only parse 1st event. This is because we heuristically
-                    # can't determine start of next input event to differentiate.
-                    di_event = di_events[0]
-                    # necessary in case a synthetic events is cancelled
-                    # canceled appropriately when the events are no longer
-                    # being resynthesized (because the application or IME is
-                    # already handling them or dropping them entirely)
-                    # This is done by checking for dumping input latencies when
-                    # active input event queue length (aq) is > 1 for same task.
-
-                    # For more details, see
-                    # https://android.googlesource.com/platform/frameworks/base.git/+
-                    # /f9e989d5f09e72f5c9a59d713521f37d3fdd93dd%5E!/
-
-                    # This returns first interval when aq has pending event(s)
-                    di_event_name = getattr(di_event, 'name', None)
-                    if di_event_name and di_event_name == 'input':
-                        pfb_events = self.event_intervals(name='doComposition', interval=post_ir_interval)
-                    else:  
-                        aq_event = filter_by_task(all_aq_events.slice(
-                                                  interval=post_ir_interval),
-                                                  'pid', di_event.event.task.pid)
-    
-                        if aq_event and aq_event.value > 0:
-                            post_di_start = aq_event.interval.start
-                        else:
-                            if aq_event:
-                                continue # if AQ event exists.
-                            post_di_start = di_events[0].interval.start
-    
-                        post_di_interval = Interval(post_di_start,
-                                                    self._trace.duration)
-    
-                        pfb_events = self.event_intervals(name='doComposition', interval=post_di_interval)
-                                                          
-                    if pfb_events:
-                        end_ts = pfb_events[0].interval.end
-                if start_ts != end_ts and end_ts > start_ts and start_ts not in self._input_latencies._start_timestamps:
-                    input_interval = Interval(start=start_ts, end=end_ts)
-                    self._input_latencies.append(InputLatency(interval=input_interval,
-                                            latency=input_interval.duration))
+            if not irqs:
+                continue
+            # Use longest IRQ
+            start_ts = max(irqs, key=lambda x: x.interval.duration).interval.start
+            if start_ts in seen_timestamps:
+                continue
 
-        return self._input_latencies
+            # IMPORTANT: If InputDispatcher sythesizes multiple
+            # events to same application, we ignore consequent event
+            # and only parse 1st event. This is because we heuristically
+            # can't determine start of next input event to differentiate.
+            di_event = di_events.next_after(start_ts)
+            if di_event is None:
+                continue
+
+            # necessary in case a synthetic events is cancelled
+            # canceled appropriately when the events are no longer
+            # being resynthesized (because the application or IME is
+            # already handling them or dropping them entirely)
+            # This is done by checking for dumping input latencies when
+            # active input event queue length (aq) is > 1 for same task.
+
+            # For more details, see
+            # https://android.googlesource.com/platform/frameworks/base.git/+
+            # /f9e989d5f09e72f5c9a59d713521f37d3fdd93dd%5E!/
+
+            # This returns first interval when aq has pending event(s)
+            di_event_name = getattr(di_event, 'name', None)
+            if di_event_name and di_event_name == 'input':
+                post_di_start = start_ts
+            else:
+                aq_events = aq_events_by_pid.get(di_event.event.task.pid)
+                aq_event = aq_events.next_after(start_ts) if aq_events else None
+                post_di_start = aq_event.interval.start if aq_event \
+                    else di_event.interval.start
+
+            pfb_event = pfb_events.next_after(post_di_start)
+            if pfb_event is None:
+                continue
+            end_ts = pfb_event.interval.end
+            if end_ts > start_ts:
+                seen_timestamps.add(start_ts)
+                input_interval = Interval(start=start_ts, end=end_ts)
+                input_latencies.append(InputLatency(interval=input_interval,
+                                        latency=input_interval.duration))
+
+        return input_latencies
 
     #---------------------------------------------------------------------------
     """
@@ -433,6 +792,30 @@ class Android(FTraceComponent):
         """
         return self._launched_app_events(interval=interval)
 
+    @memoize
+    def _first_seen_by_pid(self):
+        """
+        Returns dict of {pid: first time task was seen (i.e. scheduled)
+        on CPU}, computed once in single pass over (sorted) task intervals.
+        Intervals of unknown state (i.e. prior to first sched event) are skipped.
+        """
+        first_seen_by_pid = {}
+        for task_interval in self._trace.cpu.task_intervals():
+            if task_interval.state is TaskState.UNKNOWN:
+                continue
+            first_seen_by_pid.setdefault(task_interval.task.pid,
+                                         task_interval.interval.start)
+        return first_seen_by_pid
+
+    @memoize
+    def _draw_intervals_by_pid(self):
+        """Returns dict of {pid: IntervalList of UI thread draw events}"""
+        draw_intervals_by_pid = defaultdict(IntervalList)
+        for draw_event in self.event_intervals(name=UI_THREAD_DRAW_NAMES,
+                                               match_exact=False):
+            draw_intervals_by_pid[draw_event.event.task.pid].append(draw_event)
+        return draw_intervals_by_pid
+
     @memoize
     def _start_launch_time(self, launched_event):
         """
@@ -440,9 +823,9 @@ class Android(FTraceComponent):
         the launched task.
         """
         if launched_event:
-            interval = Interval(0, launched_event.timestamp)
-            return self._trace.cpu.task_intervals(task=launched_event.task,
-                interval=interval)[0].interval.start
+            start_time = self._first_seen_by_pid().get(launched_event.task.pid)
+            if start_time is not None and start_time <= launched_event.timestamp:
+                return start_time
 
     @requires('tracing_mark_write')
     @memoize
@@ -457,29 +840,40 @@ class Android(FTraceComponent):
 
         layer_state_t indicates changes in position/color/depth/size/alpha/crop etc
         Display_state indicates changes in orientation, etc
+
+        Windows between consecutive `performTraversals` are checked for
+        `setTransactionState`/`wmUpdateFocus` by bisecting their (sorted)
+        start times, rather than querying events per window.
         """
         end_time = None
         max_end_time = self._start_launch_time(next_launched_event) \
-            if next_launched_event else self._trace.duration
+            if next_launched_event else None
+        if max_end_time is None:
+            max_end_time = self._trace.duration
+
+        def _seen_between(start_times, start, end):
+            """True if any event started in (start, end]"""
+            return bisect_right(start_times, end) > bisect_right(start_times, start)
+
+        sts_start_times = self.event_intervals(name='setTransactionState')._start_times
+        wmuf_start_times = self.event_intervals(name='wmUpdateFocus')._start_times
         # after launch
-        pl_interval = Interval(launched_event.timestamp, max_end_time)
-        performTraversals = self.event_intervals(name=UI_THREAD_DRAW_NAMES,
-                                                 task=launched_event.task,
-                                                 interval=pl_interval,
-                                                 match_exact=False)
+        pt_start_times = self._draw_intervals_by_pid().get(
+            launched_event.task.pid, IntervalList())._start_times
+        idx_first = bisect_right(pt_start_times, launched_event.timestamp)
+        idx_last = bisect_right(pt_start_times, max_end_time)
+
         last_end = max_end_time
-        for pt_event in reversed(performTraversals):
-            sts_interval = Interval(pt_event.interval.start, last_end)
-            sts_events = self.event_intervals(name='setTransactionState',
-                                              interval=sts_interval)
+        for idx in xrange(idx_last - 1, idx_first - 1, -1):
+            pt_start = pt_start_times[idx]
             # ignore 'setTransactionState' due to app close/focus switch
             # by checking 'wmUpdateFocus'
-            wmuf_events = self.event_intervals(name='wmUpdateFocus',
-                                              interval=sts_interval)
-            if sts_events and not wmuf_events and sts_interval.end != max_end_time:
-                end_time = sts_interval.end
+            if last_end != max_end_time and \
+                    _seen_between(sts_start_times, pt_start, last_end) and \
+                    not _seen_between(wmuf_start_times, pt_start, last_end):
+                end_time = last_end
                 break
-            last_end = pt_event.interval.start
+            last_end = pt_start
 
         return end_time
 
@@ -499,7 +893,7 @@ class Android(FTraceComponent):
                 continue
             start_time, end_time = \
                 self._start_launch_time(event), self._end_launch_time(event, next_event)
-            if (start_time and end_time) is not None:
+            if start_time is not None and end_time is not None:
                 launch_interval = Interval(start_time, end_time)
                 launch_latencies.append(LaunchLatency(task=event.task,
                                         interval=launch_interval,
@@ -514,6 +908,30 @@ class Android(FTraceComponent):
         last_timestamp = self._trace.interval.start
         last_event = None
         counter_events_by_pid = defaultdict(EventList)
+        # thread pid -> stack of open slice indices (parallel to events)
+        slice_stack_by_pid = defaultdict(list)
+        name_ids = {}
+
+        def begin_slice(pid, event):
+            try:
+                slices = self._slices_by_pid[pid]
+            except KeyError:
+                slices = self._slices_by_pid[pid] = ThreadSlices(
+                    start=array('d'), end=array('d'), depth=array('h'),
+                    parent=array('l'), name=array('l'))
+            name = event.data.section_name
+            try:
+                name_id = name_ids[name]
+            except KeyError:
+                name_id = name_ids[name] = len(self._slice_names)
+                self._slice_names.append(name)
+            stack = slice_stack_by_pid[pid]
+            stack.append(len(slices.start))
+            slices.start.append(event.timestamp)
+            slices.end.append(self._trace.duration) # until closed
+            slices.depth.append(len(stack) - 1)
+            slices.parent.append(stack[-2] if len(stack) > 1 else -1)
+            slices.name.append(name_id)
 
         try:
             while True:
@@ -522,7 +940,10 @@ class Android(FTraceComponent):
                 tag = event.data.atrace_tag
                 if tag is AtraceTag.CONTEXT_BEGIN:
                     counter_events_by_pid[pid].append(event)
+                    begin_slice(pid, event)
                 elif tag is AtraceTag.CONTEXT_END and counter_events_by_pid[pid]:
+                    self._slices_by_pid[pid].end[slice_stack_by_pid[pid].pop()] = \
+                        event.timestamp
                     last_event = counter_events_by_pid[pid].pop()
                     last_timestamp = last_event.timestamp
                     last_pid, last_name = \
@@ -546,83 +967,342 @@ class Android(FTraceComponent):
                         self._tmw_intervals_by_name[name].append(context)
 
 
+    @requires('tracing_mark_write')
+    @memoize
+    def slice_tree(self, task, interval=None):
+        """
+        Returns list of root `SliceNode` of nested (B/E) slices of thread
+        (task or pid) overlapping interval (if any), with intervals and self
+        time (excluding children) trimmed to interval.
+        """
+        pid = getattr(task, 'pid', task)
+        try:
+            slices = self._slices_by_pid[pid]
+        except KeyError:
+            return []
+        lo, hi = self._slice_range(pid, interval)
+        start, end = (interval.start, interval.end) if interval \
+            else (self._trace.interval.start, self._trace.duration)
+
+        nodes, roots = {}, []
+        for idx in xrange(lo, hi):
+            # zero-length slices only if within interval.
+            if slices.end[idx] < start or slices.start[idx] > end:
+                continue
+            slice_start = max(slices.start[idx], start)
+            slice_end = min(slices.end[idx], end)
+            if slice_end <= slice_start and slices.end[idx] > slices.start[idx]:
+                continue
+            node = nodes[idx] = SliceNode(name=self._slice_names[slices.name[idx]],
+                                          depth=slices.depth[idx],
+                                          interval=Interval(slice_start, slice_end),
+                                          self_time=[slice_end - slice_start],
+                                          children=[])
+            parent = nodes.get(slices.parent[idx])
+            if parent is not None:
+                parent.children.append(node)
+                parent.self_time[0] -= slice_end - slice_start
+            else:
+                roots.append(node)
+
+        def finalize(node):
+            return node._replace(self_time=node.self_time[0],
+                                 children=[finalize(child) for child in node.children])
+        return [finalize(root) for root in roots]
+
+    @requires('tracing_mark_write')
+    @memoize
+    def flame_graph(self, task=None, interval=None):
+        """
+        Returns dict of {call path: FlameStats} aggregating total & self time
+        (trimmed to interval, if any) of nested slices of thread (task or
+        pid), or of all threads if task is None. Call path is tuple of slice
+        names from root e.g. ('Choreographer#doFrame', 'performTraversals').
+        """
+        if task is not None:
+            pids = [getattr(task, 'pid', task)]
+        else:
+            pids = self._slices_by_pid.keys()
+        start, end = (interval.start, interval.end) if interval \
+            else (self._trace.interval.start, self._trace.duration)
+
+        totals, self_times, counts = defaultdict(float), defaultdict(float), defaultdict(int)
+        for pid in pids:
+            slices = self._slices_by_pid.get(pid)
+            if slices is None:
+                continue
+            paths = self._slice_paths(pid)
+            lo, hi = self._slice_range(pid, interval)
+            for idx in xrange(lo, hi):
+                duration = min(slices.end[idx], end) - max(slices.start[idx], start)
+                if duration < 0:
+                    continue
+                path = paths[idx]
+                totals[path] += duration
+                self_times[path] += duration
+                counts[path] += 1
+                parent = slices.parent[idx]
+                if parent >= 0:
+                    self_times[paths[parent]] -= duration
+
+        return dict((path, FlameStats(total=totals[path],
+                                      self_time=self_times[path],
+                                      count=counts[path]))
+                    for path in totals)
+
+    @memoize
+    def _slice_paths(self, pid):
+        """Returns list of call path (tuple of names) for each slice of pid"""
+        slices = self._slices_by_pid[pid]
+        paths = []
+        for name_id, parent in zip(slices.name, slices.parent):
+            name = self._slice_names[name_id]
+            paths.append(paths[parent] + (name,) if parent >= 0 else (name,))
+        return paths
+
+    @memoize
+    def _slice_root_ends(self, pid):
+        """Returns (root indices, root ends) arrays of pid's slices"""
+        slices = self._slices_by_pid[pid]
+        roots = array('l', (idx for idx, depth in enumerate(slices.depth) if depth == 0))
+        return roots, array('d', (slices.end[idx] for idx in roots))
+
+    def _slice_range(self, pid, interval):
+        """
+        Returns [lo, hi) indices of pid's slices that may overlap interval.
+        Roots never overlap, so their ends are sorted & first root ending
+        after interval start bounds the range (children follow parents).
+        """
+        slices = self._slices_by_pid[pid]
+        if interval is None:
+            return 0, len(slices.start)
+        roots, root_ends = self._slice_root_ends(pid)
+        idx = bisect_right(root_ends, interval.start)
+        lo = roots[idx] if idx < len(roots) else len(slices.start)
+        hi = bisect_right(slices.start, interval.end)
+        return lo, max(lo, hi)
+
+    @requires('tracing_mark_write')
+    @memoize
+    def counter_track(self, name, pid=None):
+        """
+        Returns `CounterTrack` (timestamp & value arrays) of counter `name`
+        for pid, or merged across all pids (latest sample wins) if pid is None.
+        """
+        if pid is not None:
+            return self._counter_tracks.get(
+                (pid, name), CounterTrack(timestamp=array('d'), value=array('d')))
+        keys = self._counter_keys_by_name.get(name, [])
+        if len(keys) == 1:
+            return self._counter_tracks[keys[0]]
+        samples = merge(*[zip(self._counter_tracks[key].timestamp,
+                              self._counter_tracks[key].value) for key in keys])
+        rv = CounterTrack(timestamp=array('d'), value=array('d'))
+        for timestamp, value in samples:
+            rv.timestamp.append(timestamp)
+            rv.value.append(value)
+        return rv
+
+    @requires('tracing_mark_write')
+    def counter_at(self, name, timestamp, pid=None):
+        """
+        Returns value of counter `name` (for pid, if any) as of timestamp
+        i.e. last sample at or before it, NaN if none.
+        """
+        track = self.counter_track(name, pid=pid)
+        idx = bisect_right(track.timestamp, timestamp) - 1
+        return track.value[idx] if idx >= 0 else float('nan')
+
+    @requires('tracing_mark_write')
+    @memoize
+    def counter_stats(self, name, interval=None, pid=None):
+        """
+        Returns `CounterStats` with time-weighted mean, min & max of counter
+        `name` (for pid, if any) over interval (if any), where each sample
+        holds till next one. Time before first sample is excluded.
+        """
+        track = self.counter_track(name, pid=pid)
+        timestamps, values = track.timestamp, track.value
+        start, end = (interval.start, interval.end) if interval \
+            else (self._trace.interval.start, self._trace.duration)
+        lo = max(bisect_right(timestamps, start) - 1, 0)
+        hi = bisect_left(timestamps, end)
+
+        total_time = weighted = 0.0
+        _min = _max = None
+        for idx in xrange(lo, hi):
+            sample_end = timestamps[idx + 1] if idx + 1 < len(timestamps) \
+                else self._trace.duration
+            duration = min(sample_end, end) - max(timestamps[idx], start)
+            if duration < 0:
+                continue
+            value = values[idx]
+            total_time += duration
+            weighted += value * duration
+            _min = value if _min is None else min(_min, value)
+            _max = value if _max is None else max(_max, value)
+
+        if _min is None:
+            return CounterStats(mean=float('nan'), min=float('nan'), max=float('nan'))
+        return CounterStats(mean=weighted / total_time if total_time else float(_min),
+                            min=_min, max=_max)
+
+    @requires('tracing_mark_write')
+    @memoize
+    def counter_resample(self, name, resolution=0.01, interval=None, pid=None,
+                         as_numpy=False):
+        """
+        Returns array of time-weighted mean of counter `name` (for pid, if
+        any; averaged across pids otherwise) for every `resolution` (in
+        seconds) bucket of interval (if any). NaN before first sample.
+        """
+        if pid is not None:
+            counters = self._counter_intervals((pid, name)) \
+                if (pid, name) in self._counter_tracks else IntervalList()
+        else:
+            counters = self._named_intervals(name)
+        return counters.resample(
+            interval=interval or self._trace.interval, resolution=resolution,
+            value=lambda counter: counter.value if counter.event is not None else None,
+            as_numpy=as_numpy)
+
+    @requires('tracing_mark_write')
+    @memoize
+    def async_slices(self, name=None, pid=None, interval=None):
+        """
+        Returns IntervalList of `AsyncSlice` for specified section name
+        (if any) and pid (if any) overlapping interval (if any), trimmed.
+        """
+        spans = self._async_slices
+        indices, starts, max_duration = self._async_index(name)
+        lo, hi = 0, len(indices)
+        if interval is not None:
+            # spans overlap, so scan from those starting up to longest
+            # span before interval.
+            lo = bisect_left(starts, interval.start - max_duration)
+            hi = bisect_right(starts, interval.end)
+        rv = IntervalList()
+        start, end = (interval.start, interval.end) if interval else (None, None)
+        for idx in indices[lo:hi]:
+            if pid is not None and spans.pid[idx] != pid:
+                continue
+            span_start, span_end = spans.start[idx], spans.end[idx]
+            if interval is not None:
+                if span_start > end or span_end < start:
+                    continue
+                span_start, span_end = max(span_start, start), min(span_end, end)
+            rv.append(AsyncSlice(pid=spans.pid[idx],
+                                 name=self._async_names[spans.name[idx]],
+                                 cookie=spans.cookie[idx], lane=spans.lane[idx],
+                                 interval=Interval(span_start, span_end)))
+        return rv
+
+    @memoize
+    def _async_index(self, name=None):
+        """
+        Returns (indices, starts, max duration) of async spans of name (all
+        if None). Spans are recorded as they begin, so starts are sorted.
+        """
+        spans = self._async_slices
+        if name is not None:
+            indices = self._async_idx_by_name.get(name, array('l'))
+        else:
+            indices = array('l', xrange(len(spans.start)))
+        starts = array('d', (spans.start[idx] for idx in indices))
+        max_duration = max([spans.end[idx] - spans.start[idx] for idx in indices] or [0.0])
+        return indices, starts, max_duration
+
+    @requires('tracing_mark_write')
+    @memoize
+    def async_tracks(self):
+        """Returns dict of {(pid, name): number of lanes} of async tracks"""
+        spans, rv = self._async_slices, defaultdict(int)
+        for pid, name_id, lane in zip(spans.pid, spans.name, spans.lane):
+            key = (pid, self._async_names[name_id])
+            rv[key] = max(rv[key], lane + 1)
+        return dict(rv)
+
     @coroutine
     def _async_event_handler(self):
         """
-        TODO: Track by cookie. This is rarely used!!!
+        Tracks async (S/F) events by (pid, name, cookie), assigning each
+        span lowest free (non-overlapping) lane of its (pid, name) track.
         """
-        last_timestamp = self._trace.interval.start
-        last_event = None
-        # Stack them like Jason (JSON) 'PID', then 'cookie'
-        counter_events_by_cookie = defaultdict(EventList)
-        counter_events_by_pid = defaultdict(lambda : counter_events_by_cookie)
+        # (pid, name, cookie) -> index of open span
+        open_spans = {}
+        # (pid, name) -> (heap of freed lanes, number of lanes)
+        free_lanes_by_track = defaultdict(lambda: ([], [0]))
+        name_ids = {}
+        spans = self._async_slices
+
+        def close_span(idx, timestamp):
+            spans.end[idx] = timestamp
+            pid, name = spans.pid[idx], self._async_names[spans.name[idx]]
+            free_lanes, _ = free_lanes_by_track[(pid, name)]
+            heappush(free_lanes, spans.lane[idx])
+            context = Context(pid=pid, name=name,
+                              interval=Interval(spans.start[idx], timestamp),
+                              event=self._async_begin_events[idx])
+            self._tmw_intervals_by_name[name].append(context)
 
         try:
             while True:
                 event = (yield)
                 pid, cookie = event.data.pid, event.data.cookie
+                name = event.data.section_name
                 tag = event.data.atrace_tag
-                event_list = counter_events_by_pid[pid][cookie]
+                key = (pid, name, cookie)
                 if tag is AtraceTag.ASYNC_BEGIN:
-                    event_list.append(event)
-                elif tag is AtraceTag.ASYNC_END and event_list:
-                    last_event = event_list.pop()
-                    last_timestamp = last_event.timestamp
-                    interval = Interval(last_timestamp, event.timestamp)
-                    context = Context(pid=pid, name=last_event.data.section_name,
-                                  interval=interval, event=last_event)
-                    self._tmw_intervals_by_name[context.name].append(context)
+                    if key in open_spans: # re-used before finish
+                        close_span(open_spans.pop(key), event.timestamp)
+                    free_lanes, num_lanes = free_lanes_by_track[(pid, name)]
+                    if free_lanes:
+                        lane = heappop(free_lanes)
+                    else:
+                        lane, num_lanes[0] = num_lanes[0], num_lanes[0] + 1
+                    try:
+                        name_id = name_ids[name]
+                    except KeyError:
+                        name_id = name_ids[name] = len(self._async_names)
+                        self._async_names.append(name)
+                    idx = open_spans[key] = len(spans.start)
+                    spans.pid.append(pid)
+                    spans.name.append(name_id)
+                    spans.cookie.append(cookie)
+                    spans.lane.append(lane)
+                    spans.start.append(event.timestamp)
+                    spans.end.append(self._trace.duration) # until finished
+                    self._async_begin_events.append(event)
+                    self._async_idx_by_name[name].append(idx)
+                elif tag is AtraceTag.ASYNC_END and key in open_spans:
+                    close_span(open_spans.pop(key), event.timestamp)
                 else:
                     log.warn("Missing start marker {event}".format(event=event))
 
         except GeneratorExit:
             # close things off
-            for pid, by_name in counter_events_by_pid.iteritems():
-                for cookie, event_list in by_name.iteritems():
-                    for event in event_list:
-                        last_timestamp = event.timestamp
-                        interval = Interval(last_timestamp, self._trace.duration)
-                        context = Context(pid=pid, name=event.data.section_name,
-                                          interval=interval, event=event)
-                        self._tmw_intervals_by_name[context.name].append(context)
+            for idx in sorted(open_spans.itervalues()):
+                close_span(idx, self._trace.duration)
 
     @coroutine
     def _counter_handler(self):
         """
+        Collects counter samples per (pid, name) track into parallel
+        timestamp/value arrays. `Counter` intervals (see `event_intervals`)
+        are built from these on first use.
         """
-        last_timestamp = self._trace.interval.start
-        last_value = -1.0
-        last_event = None
-        # Stack them like Jason (JSON) 'PID', then 'Counter name'
-        counter_events_by_name = defaultdict(EventList)
-        counter_events_by_pid = defaultdict(lambda : counter_events_by_name)
-        try:
-            while True:
-                event = (yield)
-                pid = event.data.pid
-                counter_name = event.data.counter_name
-                event_list = counter_events_by_pid[pid][counter_name]
-                if event_list:
-                    last_event = event_list.pop()
-                    last_timestamp = last_event.timestamp
-                    last_value = last_event.data.value
-                event_list.append(event)
-                interval = Interval(last_timestamp, event.timestamp)
-                counter = Counter(pid=pid, name=counter_name, event=last_event,
-                              value=last_value, interval=interval)
-                self._tmw_intervals_by_name[counter.name].append(counter)
-
-        except GeneratorExit:
-            # close things off
-            for pid, by_name in counter_events_by_pid.iteritems():
-                for counter_name, event_list in by_name.iteritems():
-                    for event in event_list:
-                        last_timestamp = event.timestamp
-                        last_value = event.data.value
-                        interval = Interval(last_timestamp, self._trace.duration)
-                        counter = Counter(pid=pid, name=counter_name, event=event,
-                                          value=last_value, interval=interval)
-                        self._tmw_intervals_by_name[counter.name].append(counter)
+        tracks = self._counter_tracks
+        while True:
+            event = (yield)
+            key = (event.data.pid, event.data.counter_name)
+            try:
+                track = tracks[key]
+            except KeyError:
+                track = tracks[key] = CounterTrack(timestamp=array('d'),
+                                                   value=array('d'))
+                self._counter_keys_by_name[key[1]].append(key)
+            track.timestamp.append(event.timestamp)
+            track.value.append(event.data.value)
 
     def _parse_tmw_events(self):
         """Parse tracing_mark_write intervals"""
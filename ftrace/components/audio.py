@@ -25,11 +25,15 @@ except ImportError:
     logging.basicConfig()
     from logging import getLogger as Logger
 
+from array import array
+from bisect import bisect_left, bisect_right
 from collections import namedtuple
+from heapq import merge
 from ftrace.interval import Interval, IntervalList
 from ftrace.ftrace import register_api, FTraceComponent
+from ftrace.task import TaskState
 from ftrace.utils.decorators import requires, memoize
-from ftrace.common import filter_by_task, percentile
+from ftrace.common import FtraceError, percentile
 from ftrace.audio import GlitchType
 
 log = Logger('Audio')
@@ -37,6 +41,12 @@ log = Logger('Audio')
 # For audio jitter & latency
 AudioJitter = namedtuple('AudioJitter', ['interval', 'latency'])
 AudioLatency = namedtuple('AudioLatency', ['glitch_type', 'interval', 'latency'])
+# OSL callbacks (after first of each thread), stored column-wise. `period`
+# is time since previous callback, `jitter` deviation from expected period.
+AudioCallbacks = namedtuple('AudioCallbacks', ['timestamp', 'period', 'jitter'])
+# Audio glitches (classified fRdy2 samples), stored column-wise.
+# `glitch_type` is `GlitchType` value.
+AudioGlitches = namedtuple('AudioGlitches', ['start', 'end', 'glitch_type'])
 
 @register_api('audio')
 class Audio(FTraceComponent):
@@ -58,6 +68,10 @@ class Audio(FTraceComponent):
         - Input Latency
         - Output Latency
         - RoudTrip Latency (Input + Output Latency)
+
+    Callbacks, frames ready (`fRdy2`) & writes are kept as sorted arrays,
+    classified in single passes, so counts over any interval are
+    O(log n) bisects.
     
     Reference:
     ----------
@@ -78,11 +92,18 @@ class Audio(FTraceComponent):
 
     @requires('tracing_mark_write')
     @memoize
-    def num_frames_written(self, interval=None):
+    def num_frames_written(self, interval=None, buffer_size_frames=None):
         """
         Returns number of frames written within specified interval.
+
+        Each `write` (of mixer buffer to audio HAL) is one buffer of
+        `buffer_size_frames` frames.
         """
-        raise NotImplementedError
+        lo, hi = self._range(self._write_starts, interval)
+        buffer_size_frames = self._buffer_size_frames(buffer_size_frames)
+        if hi > lo and buffer_size_frames is None:
+            raise FtraceError(msg="Unknown buffer size, specify `buffer_size_frames`")
+        return (hi - lo) * (buffer_size_frames or 0)
         
     @requires('tracing_mark_write')
     @memoize
@@ -111,10 +132,8 @@ class Audio(FTraceComponent):
         Returns number of overruns within specified interval.
         """
         # hard to detect as we are still unsure of buffer_size.
-        glitches = self.audio_glitches(interval=interval, 
-                                       buffer_size_frames=buffer_size_frames)
-        filter_func = lambda audio_glitch: audio_glitch.glitch_type is GlitchType.OVERRUN
-        return len(filter(filter_func, glitches))
+        return self._num_glitches([GlitchType.OVERRUN], interval=interval,
+                                  buffer_size_frames=buffer_size_frames)
 
 
     @requires('tracing_mark_write')
@@ -123,10 +142,8 @@ class Audio(FTraceComponent):
         """
         Returns number of underruns within specified interval.
         """
-        glitches = self.audio_glitches(interval=interval, 
-                                       buffer_size_frames=buffer_size_frames)
-        filter_func = lambda audio_glitch: audio_glitch.glitch_type in GlitchType.underruns()
-        return len(filter(filter_func, glitches))
+        return self._num_glitches(GlitchType.underruns(), interval=interval,
+                                  buffer_size_frames=buffer_size_frames)
     
     
     @requires('tracing_mark_write')
@@ -135,28 +152,15 @@ class Audio(FTraceComponent):
         """
         Returns number of underruns within specified interval.
         """
-        try:
-            self._fRdy2s
-        except AttributeError:
-            self._audio_flinger_handler(buffer_size_frames=buffer_size_frames)
-        
+        glitches = self._classify_glitches(self._buffer_size_frames(buffer_size_frames))
+        lo, hi = self._range(glitches.start, interval)
         audio_glitches = IntervalList()
-        for frdy in self._fRdy2s.slice(interval=interval):
-            if frdy.value  == 0:
-                 # framesReady() is zero, total underrun
-                glitch_type = GlitchType.UNDERRUN_EMPTY
-            elif frdy.value < self.buffer_size_frames:
-                # framesReady() is non-zero but < full frame count
-                glitch_type = GlitchType.UNDERRUN_PARTIAL
-            elif frdy.value == self.buffer_size_frames:
-                #glitch_type = GlitchType.UNDERRUN_FULL
-                continue
-            elif frdy.value > self.buffer_size_frames:
-                glitch_type = GlitchType.OVERRUN
-                
-            audio_glitches.append(AudioLatency(glitch_type=glitch_type,
-                                               interval=frdy.interval,
-                                               latency=frdy.interval.duration))
+        for idx in xrange(lo, hi):
+            glitch_interval = Interval(glitches.start[idx], glitches.end[idx])
+            audio_glitches.append(AudioLatency(
+                glitch_type=GlitchType(glitches.glitch_type[idx]),
+                interval=glitch_interval,
+                latency=glitch_interval.duration))
             
         return audio_glitches
         
@@ -166,7 +170,20 @@ class Audio(FTraceComponent):
         """
         Returns list of intervals frames were written within specified interval.
         """
-        raise NotImplementedError
+        lo, hi = self._range(self._write_starts, interval)
+        return IntervalList(self._writes[lo:hi])
+
+    @requires('tracing_mark_write')
+    @memoize
+    def callbacks(self, interval=None):
+        """
+        Returns `AudioCallbacks` of arrays with arrival time, period (since
+        previous callback) & jitter of OSL callbacks within interval (if any).
+        """
+        lo, hi = self._range(self._callbacks.timestamp, interval)
+        if lo == 0 and hi == len(self._callbacks.timestamp):
+            return self._callbacks
+        return AudioCallbacks(*(column[lo:hi] for column in self._callbacks))
     
     @requires('tracing_mark_write')
     @memoize
@@ -175,45 +192,130 @@ class Audio(FTraceComponent):
         Returns list of intervals of audio jitter within specified interval.
         
         Jitter = Expected callback time - Actual callback time.
+
+        `buffer_size_frames` is accepted for compatibility, but unused: jitter
+        only depends on (estimated) callback period i.e. `buffer_size_seconds`.
         """
-        try:
-            self._cbk_jitters
-        except AttributeError:
-            self._audio_flinger_handler(buffer_size_frames=buffer_size_frames)
+        callbacks = self.callbacks(interval=interval)
+        rv = IntervalList()
+        for timestamp, period, jitter in zip(*callbacks):
+            rv.append(AudioJitter(interval=Interval(timestamp - period, timestamp),
+                                  latency=jitter))
+        return rv
+
+    def _buffer_size_frames(self, buffer_size_frames=None):
+        """Returns buffer size (frames) specified, set or estimated"""
+        return buffer_size_frames if buffer_size_frames is not None \
+            else self.buffer_size_frames
 
-        return self._cbk_jitters.slice(interval=interval)
+    def _range(self, timestamps, interval=None):
+        """Returns index range of (sorted) timestamps within interval"""
+        if interval is None:
+            return 0, len(timestamps)
+        return bisect_left(timestamps, interval.start), \
+            bisect_right(timestamps, interval.end)
 
+    def _num_glitches(self, glitch_types, interval=None, buffer_size_frames=None):
+        """Returns number of glitches of glitch types within interval"""
+        starts_by_type = self._glitch_starts(self._buffer_size_frames(buffer_size_frames))
+        count = 0
+        for glitch_type in glitch_types:
+            lo, hi = self._range(starts_by_type[glitch_type], interval)
+            count += hi - lo
+        return count
+
+    @memoize
+    def _glitch_starts(self, buffer_size_frames):
+        """Returns dict of {GlitchType: sorted array of glitch start times}"""
+        glitches = self._classify_glitches(buffer_size_frames)
+        starts_by_type = {glitch_type: array('d') for glitch_type in GlitchType.universe()}
+        for start, glitch_type in zip(glitches.start, glitches.glitch_type):
+            starts_by_type[GlitchType(glitch_type)].append(start)
+        return starts_by_type
+
+    @memoize
+    def _classify_glitches(self, buffer_size_frames):
+        """
+        Returns `AudioGlitches` classifying every fRdy2 (frames ready)
+        sample against buffer size, in single pass.
+        """
+        glitches = AudioGlitches(start=array('d'), end=array('d'),
+                                 glitch_type=array('B'))
+        for start, end, value in zip(*self._frames_ready):
+            if value == 0:
+                 # framesReady() is zero, total underrun
+                glitch_type = GlitchType.UNDERRUN_EMPTY
+            elif value < buffer_size_frames:
+                # framesReady() is non-zero but < full frame count
+                glitch_type = GlitchType.UNDERRUN_PARTIAL
+            elif value == buffer_size_frames:
+                #glitch_type = GlitchType.UNDERRUN_FULL
+                continue
+            else:
+                glitch_type = GlitchType.OVERRUN
+            glitches.start.append(start)
+            glitches.end.append(end)
+            glitches.glitch_type.append(glitch_type.value)
+        return glitches
 
     def _audio_flinger_handler(self, buffer_size_frames=None):
         """
         Parses audio callback routines.
         """
-        
-        all_tasks = self._trace.cpu.task_intervals()
-        self._OSL_cbks = IntervalList(filter_by_task(all_tasks, 'name', 'OSLcbk', 'any'))
+        # Callback arrives when OSL callback thread (one per stream) first
+        # runs after waking up. Preemption (RUNNING -> RUNNABLE -> RUNNING)
+        # is within same callback, so only sleeping ends it.
+        def callback_timestamps(task):
+            in_callback = False
+            for ti in self._trace.cpu.task_state_intervals(task=task):
+                if ti.state is TaskState.RUNNING:
+                    if not in_callback:
+                        yield ti.interval.start
+                    in_callback = True
+                elif ti.state is not TaskState.RUNNABLE:
+                    in_callback = False
 
-        self._fRdy2s = self._trace.android.event_intervals(name='fRdy2')
-        
-        # Lets estimate buffer size (in seconds)
-        # By taking geomean of intervals between OSL callbacks
-        cbk_delta = [cbk_b.interval.start - cbk_a.interval.start \
-            for cbk_a, cbk_b in zip(self._OSL_cbks, self._OSL_cbks[1:])]
-        
-        self.buffer_size_seconds = round(percentile(cbk_delta, 0.9), 3)
+        cbk_timestamps_by_pid = {}
+        if {'sched_switch', 'sched_wakeup'} <= self._trace.tracepoints:
+            for task in self._trace.cpu.seen_tasks():
+                if task.name == 'OSLcbk':
+                    cbk_timestamps_by_pid[task.pid] = array('d', callback_timestamps(task))
+
+        # Lets estimate buffer size (in seconds) i.e. callback period
+        # By taking 90th percentile of (sorted) intervals between OSL callbacks
+        cbk_deltas = sorted(ts_b - ts_a for timestamps in cbk_timestamps_by_pid.itervalues()
+                            for ts_a, ts_b in zip(timestamps, timestamps[1:]))
+        self.buffer_size_seconds = round(percentile(cbk_deltas, 0.9), 3) \
+            if cbk_deltas else None
         
-        # Find audio jitter intervals
+        # Find audio jitter
         # This is delta (in seconds) between expected OSL callback arrival time
-        # and actual arrival time. We want this interval reasonably small.
-        self._cbk_jitters = IntervalList()
-        for cbk_a, cbk_b in zip(self._OSL_cbks, self._OSL_cbks[1:]):
-            expected_cbk_arrival_time = \
-                cbk_a.interval.start  + self.buffer_size_seconds
-            delta = cbk_b.interval.start - expected_cbk_arrival_time
-            interval = Interval(cbk_a.interval.start, cbk_b.interval.start)
-            self._cbk_jitters.append(AudioJitter(interval=interval, latency=delta))
+        # and actual arrival time. We want this reasonably small.
+        self._callbacks = AudioCallbacks(timestamp=array('d'), period=array('d'),
+                                         jitter=array('d'))
+        expected_period = self.buffer_size_seconds or 0.0
+        # (callback, previous callback) pairs of every thread, by arrival.
+        for timestamp, prev_timestamp in merge(*(zip(timestamps[1:], timestamps)
+                for timestamps in cbk_timestamps_by_pid.itervalues())):
+            self._callbacks.timestamp.append(timestamp)
+            self._callbacks.period.append(timestamp - prev_timestamp)
+            self._callbacks.jitter.append(timestamp - prev_timestamp - expected_period)
+
+        # frames ready samples, skipping unknown (prior to first sample)
+        self._frames_ready = (array('d'), array('d'), array('l'))
+        for frdy in self._trace.android.event_intervals(name='fRdy2'):
+            if frdy.value >= 0:
+                self._frames_ready[0].append(frdy.interval.start)
+                self._frames_ready[1].append(frdy.interval.end)
+                self._frames_ready[2].append(int(frdy.value))
+
+        # writes of mixer buffer to audio HAL
+        self._writes = self._trace.android.event_intervals(name='write')
+        self._write_starts = self._writes._start_times
         
-        if self.buffer_size_frames is None:
+        if buffer_size_frames is not None:
+            self.buffer_size_frames = buffer_size_frames
+        elif self.buffer_size_frames is None:
             # Estimate buffer sizes (frames)
-            self.buffer_size_frames = int(percentile([frdy.value for frdy in self._fRdy2s if frdy.value >= 0], 0.9))
-        else:
-            self.buffer_size_frames = buffer_size_frames
\ No newline at end of file
+            values = sorted(self._frames_ready[2])
+            self.buffer_size_frames = int(percentile(values, 0.9)) if values else None
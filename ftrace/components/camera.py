@@ -28,6 +28,7 @@ except ImportError:
 from collections import namedtuple
 from ftrace.interval import Interval, IntervalList
 from ftrace.ftrace import register_api, FTraceComponent
+from ftrace.composites import sorted_items, Cursor
 from ftrace.utils.decorators import requires, memoize
 
 log = Logger('Camera')
@@ -35,6 +36,11 @@ log = Logger('Camera')
 # For camera latency
 CameraLatency = namedtuple('CameraLatency', ['op', 'interval', 'latency'])
 
+OPEN_CAMERA_OP = "Open Camera Device"
+STORE_IMAGE_OP = "Store Image/ Add To Media Store"
+SHUTTER_LAG_OP = "Shutter Lag"
+CAMERA_SWITCH_OP = "Camera Switch"
+
 @register_api('camera')
 class Camera(FTraceComponent):
     """
@@ -71,13 +77,16 @@ class Camera(FTraceComponent):
      for each image taken. However, this is not possible. Hence it's highly recommended
      that user records the camera settings for each trace captured.
 
+    All latencies are detected once, in a single merged pass over atrace
+    section streams (see `_camera_latency_handler`).
+
     """
     def __init__(self, trace):
         self._trace = trace
         self._events = trace.events
 
     def _initialize(self):
-        pass
+        self._camera_latency_handler()
 
     @requires('tracing_mark_write')
     @memoize
@@ -90,21 +99,7 @@ class Camera(FTraceComponent):
         [1] http://source.android.com/devices/camera/camera3_requests_hal.html
         [2] https://android.googlesource.com/platform/hardware/libhardware/+/master/include/hardware/camera3.h
         """
-        rv = IntervalList()
-        # Several device vendors have different names
-        
-        cam_open_events = self._trace.android.event_intervals(
-            name='openCameraDevice', interval=interval) # Typical of SS
-        if not cam_open_events:
-            cam_open_events = self._trace.android.event_intervals(
-                name='AndroidCamera.open', interval=interval) # Huawei
-        for cam_open_event in cam_open_events:
-            interval = cam_open_event.interval
-            if interval.duration > 0.5:
-                log.warn("Camera open exceeded 500ms recommended time")
-            rv.append(CameraLatency(op="Open Camera Device", interval=interval,
-                                    latency=interval.duration))
-        return rv
+        return self._camera_latencies[OPEN_CAMERA_OP].slice(interval=interval)
 
 
     @requires('tracing_mark_write')
@@ -115,14 +110,7 @@ class Camera(FTraceComponent):
         
         # IMPORTANT: Not supported on Huawei devices yet. Missing markers.
         """
-        rv = IntervalList()
-        for store_image_event in self._trace.android.event_intervals(
-            name='storeImage',interval=interval):
-            interval = store_image_event.interval
-            rv.append(CameraLatency(op="Store Image/ Add To Media Store",
-                                    interval=interval,
-                                    latency=interval.duration))
-        return rv
+        return self._camera_latencies[STORE_IMAGE_OP].slice(interval=interval)
 
     #--------------------------------------------------------------------------
     """
@@ -149,47 +137,7 @@ class Camera(FTraceComponent):
         # TODO: Handle ZSL.
         # IMPORTANT: Not supported on Huawei devices yet. Missing markers.
         """
-        try:
-            return self._shutter_lag_latencies.slice(interval=interval)
-        except AttributeError:
-            return self._shutter_lag_latency_handler().slice(interval=interval)
-
-
-    def _shutter_lag_latency_handler(self):
-        """
-        Returns list of all input events
-        """
-        self._shutter_lag_latencies = IntervalList()
-        deliver_inputs = self._trace.android.event_intervals("deliverInputEvent")
-
-        def _still_capture_intervals():
-            """
-            Generator that yields intervals when still images are captured
-            """
-            last_timestamp = self._trace.interval.start
-            for tp_event in self._trace.android.event_intervals('doTakePictureAsync'):
-                yield Interval(last_timestamp, tp_event.interval.start)
-                last_timestamp = tp_event.interval.start
-
-        for interval in _still_capture_intervals():
-            touch_events = deliver_inputs.slice(interval=interval, trimmed=False)
-            # Necessary as we may be interested in different IRQ name
-            if touch_events:
-                # Use last input event within this interval
-                start_ts = touch_events[-1].interval.start
-                end_ts = start_ts
-                post_touch_interval = Interval(interval.end, self._trace.duration)
-                si_events = self._trace.android.event_intervals(name='storeImage',
-                                                 interval=post_touch_interval)
-                if si_events:
-                    end_ts = si_events[0].interval.end
-                shutter_lag_interval = Interval(start=start_ts, end=end_ts)
-                self._shutter_lag_latencies.append(
-                    CameraLatency("Shutter Lag",
-                                  interval=shutter_lag_interval,
-                                  latency=shutter_lag_interval.duration))
-
-            return self._shutter_lag_latencies
+        return self._camera_latencies[SHUTTER_LAG_OP].slice(interval=interval)
 
     #---------------------------------------------------------------------------
     """
@@ -220,54 +168,83 @@ class Camera(FTraceComponent):
         is clicked in your camera and when preview from new camera device is
         started.
         """
-        try:
-            return self._switch_latencies.slice(interval=interval)
-        except AttributeError:
-            return self._switch_device_latency_handler().slice(interval=interval)
+        return self._camera_latencies[CAMERA_SWITCH_OP].slice(interval=interval)
 
-
-    def _switch_device_latency_handler(self):
+    def _camera_latency_handler(self):
         """
-        Returns list of all input events
+        Detects all camera open, store image, shutter lag & camera switch
+        latencies in a single pass.
+
+        Still capture (`doTakePictureAsync`) and stop preview windows are
+        walked in one merge (by start), each matched to last
+        `deliverInputEvent` within it and first `storeImage`/start preview
+        after it, via `Cursor` lookups that only move forward.
         """
-        self._switch_latencies = IntervalList()
-        deliver_inputs = self._trace.android.event_intervals("deliverInputEvent")
-
-        def _preview_intervals():
-            """
-            Generator that yields intervals when still images are captured
-            """
-            last_timestamp = self._trace.interval.start
-            sp_events = self._trace.android.event_intervals('doStopPreviewSync')
-            if not sp_events:
-                preview_events = self._trace.android.event_intervals('AndroidCamera.startPreview')
-                if preview_events:
-                    camera_task = preview_events[0].event.task
-                    sp_events = (context for context in \
-                        self._trace.android.event_intervals('disconnect') \
-                        if context.event.task.pid == camera_task.pid)
-            
-            for sp_event in sp_events:
-                yield Interval(last_timestamp, sp_event.interval.start)
-                last_timestamp = sp_event.interval.start
-
-        for interval in _preview_intervals():
-            touch_events = deliver_inputs.slice(interval=interval, trimmed=False)
-            if touch_events:
-                start_ts = touch_events[-1].interval.start
-                end_ts = start_ts
-                post_touch_interval = Interval(start_ts, self._trace.duration)
-                si_events = self._trace.android.event_intervals(name='StartPreviewThread',
-                                                 interval=post_touch_interval)
-                if not si_events:
-                    si_events = self._trace.android.event_intervals(name='AndroidCamera.startPreview',
-                                                 interval=post_touch_interval)
-                if si_events:
-                    end_ts = si_events[0].interval.end
-                shutter_lag_interval = Interval(start=start_ts, end=end_ts)
-                self._switch_latencies.append(
-                    CameraLatency("Camera Switch",
-                                  interval=shutter_lag_interval,
-                                  latency=shutter_lag_interval.duration))
-
-        return self._switch_latencies
\ No newline at end of file
+        android = self._trace.android
+        self._camera_latencies = {op: IntervalList() for op in
+            (OPEN_CAMERA_OP, STORE_IMAGE_OP, SHUTTER_LAG_OP, CAMERA_SWITCH_OP)}
+
+        def add_latency(op, start, end):
+            latency_interval = Interval(start=start, end=end)
+            self._camera_latencies[op].append(
+                CameraLatency(op, interval=latency_interval,
+                              latency=latency_interval.duration))
+
+        # Several device vendors have different names
+        cam_open_events = android.event_intervals(name='openCameraDevice') # Typical of SS
+        if not cam_open_events:
+            cam_open_events = android.event_intervals(name='AndroidCamera.open') # Huawei
+        for cam_open_event in cam_open_events:
+            if cam_open_event.interval.duration > 0.5:
+                log.warn("Camera open exceeded 500ms recommended time")
+            add_latency(OPEN_CAMERA_OP, cam_open_event.interval.start,
+                        cam_open_event.interval.end)
+
+        # IMPORTANT: Not supported on Huawei devices yet. Missing markers.
+        store_image_events = android.event_intervals(name='storeImage')
+        for store_image_event in store_image_events:
+            add_latency(STORE_IMAGE_OP, store_image_event.interval.start,
+                        store_image_event.interval.end)
+
+        # still images captured
+        tp_events = android.event_intervals('doTakePictureAsync')
+        # preview stopped (for camera switch)
+        sp_events = android.event_intervals('doStopPreviewSync')
+        if not sp_events:
+            preview_events = android.event_intervals('AndroidCamera.startPreview')
+            if preview_events:
+                camera_task = preview_events[0].event.task
+                sp_events = IntervalList(context for context in
+                    android.event_intervals('disconnect')
+                    if context.event.task.pid == camera_task.pid)
+
+        deliver_inputs = Cursor(android.event_intervals('deliverInputEvent'))
+        store_images = Cursor(store_image_events)
+        start_previews = [Cursor(android.event_intervals(name)) for name in
+                          ('StartPreviewThread', 'AndroidCamera.startPreview')]
+
+        last_timestamps = {SHUTTER_LAG_OP: self._trace.interval.start,
+                           CAMERA_SWITCH_OP: self._trace.interval.start}
+        for event in sorted_items([tp_events, sp_events]):
+            op = SHUTTER_LAG_OP if event.name == 'doTakePictureAsync' \
+                else CAMERA_SWITCH_OP
+            window_start, window_end = last_timestamps[op], event.interval.start
+            last_timestamps[op] = window_end
+            touch_events = deliver_inputs.between(window_start, window_end)
+            if not touch_events:
+                continue
+            # Use last input event within this window
+            start_ts = end_ts = touch_events[-1].interval.start
+            if op == SHUTTER_LAG_OP:
+                si_event = store_images.next_after(window_end)
+            else:
+                si_event = None
+                for start_preview in start_previews:
+                    si_event = start_preview.next_after(start_ts)
+                    if si_event is not None:
+                        break
+            if si_event is not None:
+                end_ts = si_event.interval.end
+            add_latency(op, start_ts, end_ts)
+
+        return self._camera_latencies
@@ -22,13 +22,15 @@ try:
     from logbook import Logger
 except ImportError:
     from logging import Logger
+from array import array
+from bisect import bisect_left, bisect_right
 from collections import defaultdict, namedtuple
 from ftrace.interval import Interval, IntervalList
 from ftrace.event import EventList
 from ftrace.task import Task, TaskState
 from ftrace.ftrace import register_api, FTraceComponent
-from ftrace.composites import sorted_items
-from ftrace.common import ConstantBase, FtraceError
+from ftrace.composites import sorted_items, sweep_intervals, TaskIndex
+from ftrace.common import ConstantBase, FtraceError, percentile
 from ftrace.utils.decorators import requires, memoize
 
 log = Logger('CPU')
@@ -42,11 +44,23 @@ SimBusyInterval = namedtuple('SimBusyInterval', ['cpus', 'interval'])
 # Used to track run-queue depth changes per cpu
 RunQueueChange = namedtuple('RunQueueChange', ['cpu', 'runnable', 'running', 'timestamp'])
 RunQueueInterval = namedtuple('RunQueueInterval', ['cpu', 'runnable', 'running', 'interval'])
+# Time-weighted mean & max run-queue depth per fixed window
+RunQueueBucket = namedtuple('RunQueueBucket', ['cpu', 'mean_depth', 'max_depth', 'interval'])
+# Wakeup (sched_wakeup) to running (sched_switch) latencies, stored column-wise
+WakeupLatencies = namedtuple('WakeupLatencies', ['pid', 'prio', 'prev_cpu', 'cpu', 'timestamp', 'latency', 'migrated'])
+# Wakeups (waker -> wakee pid), stored column-wise. Waker is -1 in IRQ context.
+Wakeups = namedtuple('Wakeups', ['timestamp', 'waker', 'wakee'])
+# Time task (pid) was RUNNING on cpu at frequency, stored column-wise
+TaskFrequencyResidency = namedtuple('TaskFrequencyResidency', ['pid', 'cpu', 'frequency', 'time'])
+WakeupLatencySummary = namedtuple('WakeupLatencySummary', ['count', 'mean', 'median', 'p90', 'p99', 'max'])
 # Track CPU frequency
 FreqInterval = namedtuple('FreqInterval', ['cpu', 'frequency', 'interval'])
 # Track Idle state
 IdleInterval = namedtuple('IdleInterval', ['cpu', 'state', 'interval'])
 
+# TaskState by its (integer) value, for decoding task state spans.
+_TASK_STATE_BY_VALUE = dict((state.value, state) for state in TaskState.universe())
+
 class BusyState(ConstantBase):
     BUSY = ()
     IDLE = ()
@@ -135,6 +149,137 @@ class CPU(FTraceComponent):
             # could be busy or idle entire time.
             return float('nan')
 
+    @requires('sched_switch', 'sched_wakeup')
+    def busy_time_many(self, cpu, intervals):
+        """
+        Returns array of busy time for specified cpu over each of intervals
+        (e.g. every frame or 10ms window), answered in a single sweep.
+        """
+        return self.busy_intervals(cpu=cpu).overlap_durations(intervals)
+
+    @requires('sched_switch', 'sched_wakeup')
+    def idle_time_many(self, cpu, intervals):
+        """
+        Returns array of idle time for specified cpu over each of intervals.
+        """
+        intervals = [getattr(it, 'interval', it) for it in intervals]
+        busy_times = self.busy_time_many(cpu=cpu, intervals=intervals)
+        return array('d', (interval.duration - busy_time for interval, busy_time
+                           in zip(intervals, busy_times)))
+
+    @requires('cpu_idle')
+    def lpm_time_many(self, cpu, intervals):
+        """
+        Returns array of time in LPM for specified cpu over each of intervals.
+        """
+        return self.lpm_intervals(cpu=cpu).overlap_durations(intervals)
+
+    @requires('cpu_frequency')
+    def frequency_time_many(self, cpu, intervals):
+        """
+        Returns dict of {frequency: array} with time at each frequency for
+        specified cpu over each of intervals.
+        """
+        return dict((frequency, freq_intervals.overlap_durations(intervals))
+            for frequency, freq_intervals in
+                self._frequency_intervals_by_value(cpu=cpu).iteritems())
+
+    @requires('sched_switch', 'sched_wakeup')
+    def runqueue_depth_time_many(self, cpu, rq_depth, intervals):
+        """
+        Returns array of time when rq_depth is `rq_depth` for specified cpu
+        over each of intervals.
+        """
+        try:
+            rq_intervals = self._runqueue_intervals_by_depth(cpu=cpu)[rq_depth]
+        except KeyError:
+            rq_intervals = IntervalList()
+        return rq_intervals.overlap_durations(intervals)
+
+    @requires('sched_switch', 'sched_wakeup', 'cpu_frequency')
+    @memoize
+    def task_frequency_residency(self, interval=None):
+        """
+        Returns `TaskFrequencyResidency` of arrays (one entry per pid, cpu &
+        frequency) with time each task was RUNNING on each cpu at each
+        frequency within specified interval (if any). Frequency is -1 when
+        unknown i.e. before first `cpu_frequency` event on cpu.
+
+        Task & frequency intervals of each cpu are joined in a single merged
+        sweep. Use `DataFrame(residency._asdict())` for a (pid x cpu x
+        frequency) table, and map cpus to clusters as needed.
+        """
+        interval = interval or self._trace.interval
+        residency = defaultdict(float)
+
+        running = lambda ti: ti.task.pid if ti.task.pid != 0 and \
+            ti.state is TaskState.RUNNING else None
+        for cpu in sorted(self._trace.seen_cpus):
+            streams = [(self.task_intervals(cpu=cpu), running),
+                       (self.frequency_intervals(cpu=cpu), lambda fi: fi.frequency)]
+            for duration, (pid, freq) in sweep_intervals(streams, interval):
+                if pid is not None:
+                    residency[(pid, cpu, freq if freq is not None else -1)] += duration
+
+        keys = sorted(residency)
+        return TaskFrequencyResidency(pid=array('l', (key[0] for key in keys)),
+                                      cpu=array('l', (key[1] for key in keys)),
+                                      frequency=array('l', (key[2] for key in keys)),
+                                      time=array('d', (residency[key] for key in keys)))
+
+    @requires('sched_switch', 'sched_wakeup')
+    @memoize
+    def utilization_timeline(self, cpu=None, resolution=0.01, interval=None,
+                             as_numpy=False):
+        """
+        Returns array of utilization (fraction of time busy) for specified
+        cpu for every `resolution` (in seconds) bucket of interval (if any).
+        If cpu is None, returns dict of {cpu: array} for all seen cpus.
+        """
+        interval = interval or self._trace.interval
+        if cpu is not None:
+            return self.busy_intervals(cpu=cpu).resample(
+                interval=interval, resolution=resolution, as_numpy=as_numpy)
+        return dict((_cpu, self.utilization_timeline(cpu=_cpu,
+                resolution=resolution, interval=interval, as_numpy=as_numpy))
+            for _cpu in sorted(self._trace.seen_cpus))
+
+    @requires('cpu_frequency')
+    @memoize
+    def frequency_timeline(self, cpu=None, resolution=0.01, interval=None,
+                           as_numpy=False):
+        """
+        Returns array of time-weighted mean frequency for specified cpu for
+        every `resolution` (in seconds) bucket of interval (if any); NaN
+        where frequency is unknown. If cpu is None, returns dict of
+        {cpu: array} for all seen cpus.
+        """
+        interval = interval or self._trace.interval
+        if cpu is not None:
+            return self.frequency_intervals(cpu=cpu).resample(
+                interval=interval, resolution=resolution,
+                value=lambda freq_interval: freq_interval.frequency,
+                as_numpy=as_numpy)
+        return dict((_cpu, self.frequency_timeline(cpu=_cpu,
+                resolution=resolution, interval=interval, as_numpy=as_numpy))
+            for _cpu in sorted(self._trace.seen_cpus))
+
+    @memoize
+    def _frequency_intervals_by_value(self, cpu):
+        """Returns dict of {frequency: IntervalList} for cpu"""
+        rv = defaultdict(IntervalList)
+        for freq_interval in self.frequency_intervals(cpu=cpu):
+            rv[freq_interval.frequency].append(freq_interval)
+        return dict(rv)
+
+    @memoize
+    def _runqueue_intervals_by_depth(self, cpu):
+        """Returns dict of {rq_depth: IntervalList} for cpu"""
+        rv = defaultdict(IntervalList)
+        for rq_interval in self.runqueue_depth_intervals(cpu=cpu):
+            rv[rq_interval.runnable].append(rq_interval)
+        return dict(rv)
+
     @requires('sched_switch', 'sched_wakeup')
     def simultaneously_busy_time(self, num_cores, cpus=None, interval=None):
         """Returns total time when `num_cores` in `cpus` are busy"""
@@ -151,6 +296,315 @@ class CPU(FTraceComponent):
         iterable = filter(filter_func, self.runqueue_depth_intervals(cpu=cpu, interval=interval))
         return sum(it.interval.duration for it in iterable)
 
+    @requires('sched_switch', 'sched_wakeup')
+    @memoize
+    def runqueue_depth_histogram(self, cpu=None, interval=None):
+        """
+        Returns dict of {rq_depth: time} (trimmed to interval, if any) for
+        specified cpu, accumulated in a single pass over its run-queue
+        intervals. If cpu is None, returns dict of {cpu: {rq_depth: time}}
+        for all seen cpus.
+        """
+        try:
+            rq_intervals_by_cpu = self._rq_intervals_by_cpu
+        except AttributeError:
+            rq_intervals_by_cpu = self._rq_interval_handler()
+
+        interval = interval or self._trace.interval
+        start, end = interval.start, interval.end
+        cpus = [cpu] if cpu is not None else sorted(self._trace.seen_cpus)
+        rv = {}
+        for _cpu in cpus:
+            histogram = defaultdict(float)
+            rq_intervals = rq_intervals_by_cpu[_cpu]
+            # run-queue intervals are consecutive, so ends are sorted too.
+            lo = bisect_right(rq_intervals._end_times, start)
+            hi = bisect_left(rq_intervals._start_times, end)
+            for idx in xrange(lo, hi):
+                rqi = rq_intervals[idx]
+                duration = min(rqi.interval.end, end) - max(rqi.interval.start, start)
+                if duration > 0:
+                    histogram[rqi.runnable] += duration
+            rv[_cpu] = dict(histogram)
+
+        return rv[cpu] if cpu is not None else rv
+
+    @requires('sched_switch', 'sched_wakeup')
+    @memoize
+    def runqueue_depth_buckets(self, cpu=None, resolution=0.01, interval=None):
+        """
+        Returns IntervalList of `RunQueueBucket` with time-weighted mean and
+        max RQ-depth for every `resolution` (in seconds) window of specified
+        cpu. If cpu is None, returns dict of {cpu: IntervalList}.
+
+        Windows without any run-queue information have NaN depths.
+        """
+        try:
+            rq_intervals_by_cpu = self._rq_intervals_by_cpu
+        except AttributeError:
+            rq_intervals_by_cpu = self._rq_interval_handler()
+
+        interval = interval or self._trace.interval
+        start, end = interval.start, interval.end
+
+        cpus = [cpu] if cpu is not None else sorted(self._trace.seen_cpus)
+        rv = {}
+        for _cpu in cpus:
+            covered, weighted, max_depth = rq_intervals_by_cpu[_cpu].bucket_stats(
+                interval, resolution, value=lambda rqi: rqi.runnable)
+            buckets = IntervalList()
+            for idx in xrange(len(covered)):
+                bucket_interval = Interval(start + idx * resolution,
+                                           min(start + (idx + 1) * resolution, end))
+                if covered[idx]:
+                    mean, peak = weighted[idx] / covered[idx], int(max_depth[idx])
+                else:
+                    mean, peak = float('nan'), float('nan')
+                buckets.append(RunQueueBucket(cpu=_cpu, mean_depth=mean,
+                                              max_depth=peak,
+                                              interval=bucket_interval))
+            rv[_cpu] = buckets
+
+        return rv[cpu] if cpu is not None else rv
+
+    @requires('sched_switch', 'sched_wakeup')
+    @memoize
+    def wakeup_latencies(self, task=None, interval=None):
+        """
+        Returns `WakeupLatencies` of arrays (one entry per wakeup) with
+        wakeup-to-running latency for specified task (if any), for wakeups
+        that occurred within specified interval (if any).
+
+        Latency is time from `sched_wakeup` for a pid till the next
+        `sched_switch` with `next_pid` equal to that pid. `prev_cpu` is cpu
+        task last ran on (-1 if unknown) and `migrated` is set if it is
+        different from `cpu` it was switched in on.
+        """
+        latencies = self._wakeup_latencies
+        lo, hi = 0, len(latencies.timestamp)
+        if interval is not None:
+            lo = bisect_left(latencies.timestamp, interval.start)
+            hi = bisect_right(latencies.timestamp, interval.end)
+
+        if task is None:
+            if (lo, hi) == (0, len(latencies.timestamp)):
+                return latencies
+            return WakeupLatencies(*(column[lo:hi] for column in latencies))
+
+        pid = task.pid if isinstance(task, Task) else task
+        indices = self._wakeup_latency_idx_by_pid.get(pid, ())
+        indices = indices[bisect_left(indices, lo):bisect_left(indices, hi)]
+        return WakeupLatencies(*(array(column.typecode, (column[idx] for idx in indices))
+                                 for column in latencies))
+
+    @requires('sched_switch', 'sched_wakeup')
+    @memoize
+    def wakeup_latency_summary(self, by='task', interval=None):
+        """
+        Returns dict of {pid: WakeupLatencySummary} (by='task') or
+        {prio: WakeupLatencySummary} (by='prio') for wakeups
+        within specified interval (if any).
+        """
+        if by not in ('task', 'prio'):
+            raise FtraceError(msg="Unsupported `by`: {}".format(by))
+
+        latencies = self.wakeup_latencies(interval=interval)
+        keys = latencies.pid if by == 'task' else latencies.prio
+        grouped = defaultdict(list)
+        for key, latency in zip(keys, latencies.latency):
+            grouped[key].append(latency)
+
+        rv = {}
+        for key, values in grouped.iteritems():
+            values.sort()
+            rv[key] = WakeupLatencySummary(count=len(values),
+                                           mean=sum(values) / len(values),
+                                           median=percentile(values, 0.5),
+                                           p90=percentile(values, 0.9),
+                                           p99=percentile(values, 0.99),
+                                           max=values[-1])
+        return rv
+
+    @requires('sched_switch', 'sched_wakeup')
+    @memoize
+    def task_state_intervals(self, task, interval=None):
+        """
+        Returns contiguous task intervals for specified task over the
+        specified interval (if any) with its thread state i.e.
+        RUNNING (on `cpu`), RUNNABLE, SLEEPING, UNINTERRUPTIBLE etc.
+
+        Unlike `task_intervals`, this tracks full per-task state machine from
+        `sched_switch` (prev_state) and `sched_wakeup`; cpu is None when
+        task is not running.
+        """
+        pid = task.pid if isinstance(task, Task) else task
+        try:
+            timestamps, states, cpus = self._task_state_spans_by_pid[pid]
+        except KeyError:
+            return IntervalList()
+
+        task = self._task_by_pid[pid]
+        num_spans = len(timestamps)
+        if interval is None:
+            lo, hi = 0, num_spans
+            start, end = self._trace.interval.start, self._trace.duration
+        else:
+            start, end = interval.start, interval.end
+            lo = max(bisect_right(timestamps, start) - 1, 0)
+            hi = bisect_right(timestamps, end)
+
+        rv = IntervalList()
+        for idx in xrange(lo, hi):
+            span_start = max(timestamps[idx], start)
+            span_end = min(timestamps[idx + 1] if idx + 1 < num_spans \
+                else self._trace.duration, end)
+            if span_end < span_start:
+                continue
+            rv.append(TaskInterval(task=task,
+                                   cpu=cpus[idx] if cpus[idx] >= 0 else None,
+                                   interval=Interval(span_start, span_end),
+                                   state=_TASK_STATE_BY_VALUE[states[idx]]))
+        return rv
+
+    @requires('sched_switch', 'sched_wakeup')
+    @memoize
+    def task_state_time(self, task, interval=None):
+        """
+        Returns dict of {TaskState: time} for specified task within specified
+        interval (if any). Uses per-state cumulative times, so cost is
+        independent of number of state changes within interval.
+        """
+        pid = task.pid if isinstance(task, Task) else task
+        try:
+            timestamps, states, _ = self._task_state_spans_by_pid[pid]
+        except KeyError:
+            return {}
+
+        cumulative_times = self._task_state_cumulative_times(pid)
+        num_spans = len(timestamps)
+        span_end = lambda idx: timestamps[idx + 1] if idx + 1 < num_spans \
+            else self._trace.duration
+
+        rv = defaultdict(float)
+        if interval is None:
+            for value, cumulative_time in cumulative_times.iteritems():
+                rv[value] = cumulative_time[num_spans]
+        else:
+            start, end = interval.start, interval.end
+            idx_left = bisect_right(timestamps, start) - 1
+            idx_right = bisect_right(timestamps, end) - 1
+            if idx_right < 0:
+                return {}
+            if idx_left == idx_right:
+                rv[states[idx_left]] += min(end, span_end(idx_left)) - start
+            else:
+                # partial first/last spans, whole spans in-between.
+                if idx_left >= 0:
+                    rv[states[idx_left]] += span_end(idx_left) - start
+                first_whole = idx_left + 1
+                for value, cumulative_time in cumulative_times.iteritems():
+                    rv[value] += cumulative_time[idx_right] - cumulative_time[first_whole]
+                rv[states[idx_right]] += \
+                    min(end, span_end(idx_right)) - timestamps[idx_right]
+
+        return dict((_TASK_STATE_BY_VALUE[value], duration)
+                    for value, duration in rv.iteritems() if duration > 0.0)
+
+    @requires('sched_switch', 'sched_wakeup')
+    @memoize
+    def wakeup_graph(self, interval=None):
+        """
+        Returns dict of {waker pid: {wakee pid: number of wakeups}} for
+        wakeups within specified interval (if any). Wakeups from IRQ context
+        have waker pid -1.
+        """
+        wakeups = self._wakeups
+        lo, hi = 0, len(wakeups.timestamp)
+        if interval is not None:
+            lo = bisect_left(wakeups.timestamp, interval.start)
+            hi = bisect_right(wakeups.timestamp, interval.end)
+
+        graph = defaultdict(lambda: defaultdict(int))
+        for idx in xrange(lo, hi):
+            graph[wakeups.waker[idx]][wakeups.wakee[idx]] += 1
+        return dict((waker, dict(wakees)) for waker, wakees in graph.iteritems())
+
+    @requires('sched_switch', 'sched_wakeup')
+    @memoize
+    def critical_path(self, task, interval):
+        """
+        Returns IntervalList of task intervals on the critical path to
+        specified task at end of interval, walking backwards through
+        running/runnable time of each task and the wakeups that unblocked it
+        e.g. binder thread -> RenderThread -> SurfaceFlinger.
+
+        Each task interval attributes part of the end-to-end latency to a
+        hop (task) & its state. Path hops to the waker when a task became
+        runnable due to a wakeup; if waker is unknown (or in IRQ context),
+        the walk continues back through the task's own blocked time.
+        """
+        pid = task.pid if isinstance(task, Task) else task
+        start, timestamp = interval.start, interval.end
+        wakeups = self._wakeups
+        rv = IntervalList()
+        visited = set()
+
+        while timestamp > start and pid > 0 and (pid, timestamp) not in visited:
+            visited.add((pid, timestamp))
+            try:
+                timestamps, states, cpus = self._task_state_spans_by_pid[pid]
+            except KeyError:
+                break
+            task = self._task_by_pid[pid]
+            indices = self._wakeup_idx_by_pid.get(pid, ())
+            # span in progress just before `timestamp`
+            idx = bisect_left(timestamps, timestamp) - 1
+            waker = -1
+            while idx >= 0 and timestamp > start:
+                span_start = max(timestamps[idx], start)
+                rv.append(TaskInterval(task=task,
+                                       cpu=cpus[idx] if cpus[idx] >= 0 else None,
+                                       interval=Interval(span_start, timestamp),
+                                       state=_TASK_STATE_BY_VALUE[states[idx]]))
+                timestamp = span_start
+                if states[idx] == TaskState.RUNNABLE.value and \
+                    timestamps[idx] > start:
+                    # runnable since wakeup? if so, hop to the waker.
+                    wakeup_idx = bisect_right(indices, bisect_right(
+                        wakeups.timestamp, timestamp) - 1) - 1
+                    if wakeup_idx >= 0 and \
+                        wakeups.timestamp[indices[wakeup_idx]] == timestamp:
+                        waker = wakeups.waker[indices[wakeup_idx]]
+                        if waker > 0:
+                            break
+                idx -= 1
+            if waker <= 0:
+                break
+            pid = waker
+
+        return rv
+
+    @memoize
+    def _task_state_cumulative_times(self, pid):
+        """
+        Returns dict of {state value: array} where array[idx] is total time
+        spent in state over first `idx` state spans of pid.
+        """
+        timestamps, states, _ = self._task_state_spans_by_pid[pid]
+        num_spans = len(timestamps)
+        cumulative_times = {}
+        for value in set(states):
+            cumulative_times[value] = array('d', [0.0] * (num_spans + 1))
+
+        totals = defaultdict(float)
+        for idx in xrange(num_spans):
+            span_end = timestamps[idx + 1] if idx + 1 < num_spans \
+                else self._trace.duration
+            totals[states[idx]] += span_end - timestamps[idx]
+            for value, cumulative_time in cumulative_times.iteritems():
+                cumulative_time[idx + 1] = totals[value]
+        return cumulative_times
+
     @requires('sched_switch', 'sched_wakeup')
     @memoize
     def idle_intervals(self, cpu=None, interval=None):
@@ -244,6 +698,15 @@ class CPU(FTraceComponent):
         except Exception, e:
             raise FtraceError(msg=e.message)
 
+    @requires('sched_switch', 'sched_wakeup')
+    @memoize
+    def task_index(self):
+        """
+        Returns `TaskIndex` (by pid & name) over all task intervals, for
+        indexed `filter_by_task` lookups.
+        """
+        return TaskIndex(self.task_intervals())
+
     @requires('sched_switch', 'sched_wakeup')
     @memoize
     def runqueue_depth_intervals(self, cpu, interval=None):
@@ -296,7 +759,9 @@ class CPU(FTraceComponent):
                                                interval=interval,
                                                )
                     self._freq_intervals_by_cpu[cpu].append(freq_interval)
-                # again, we need some closure.
+                # again, we need some closure (from last event, which is
+                # also first if cpu has only one).
+                freq_b = events[-1]
                 self._freq_intervals_by_cpu[cpu].append(FreqInterval(
                                                         cpu=cpu,
                                                         frequency=freq_b.data.state,
@@ -475,6 +940,36 @@ class CPU(FTraceComponent):
         last_state = defaultdict(lambda: BusyState.UNKNOWN)
         last_rq_depth = defaultdict(lambda: self._trace.interval.start)
         next_task_by_cpu = defaultdict(lambda: None)
+        # wakeup latency tracking: pid -> (wakeup ts, prio, last cpu)
+        pending_wakeups = {}
+        last_cpu_by_pid = {}
+        wakeup_latencies = []
+        # per-task state spans: pid -> (timestamps, state values, cpus)
+        self._task_state_spans_by_pid = {}
+        self._task_by_pid = {}
+        # waker -> wakee index
+        wakeup_timestamps, wakers, wakees = array('d'), array('l'), array('l')
+
+        def update_task_state(task, timestamp, state, cpu=-1):
+            """Start new state span for task, if state (or cpu) changed"""
+            if task.pid == 0: # idle task(s), one per cpu.
+                return
+            self._task_by_pid[task.pid] = task
+            try:
+                timestamps, states, cpus = self._task_state_spans_by_pid[task.pid]
+            except KeyError:
+                timestamps, states, cpus = \
+                    self._task_state_spans_by_pid[task.pid] = \
+                        (array('d'), array('B'), array('h'))
+            if states and states[-1] == state.value and cpus[-1] == cpu:
+                return
+            if timestamps and timestamps[-1] == timestamp:
+                # zero-length span, simply replace.
+                states[-1], cpus[-1] = state.value, cpu
+            else:
+                timestamps.append(timestamp)
+                states.append(state.value)
+                cpus.append(cpu)
 
         for event in sched_events_gen():
             tracepoint, timestamp, data = event.tracepoint, event.timestamp, event.data
@@ -482,8 +977,9 @@ class CPU(FTraceComponent):
             if tracepoint == 'sched_switch':
                 cpu = event.cpu
                 prev_task = Task(name=data.prev_comm, pid=data.prev_pid, prio=data.prev_prio)
-                # Getting descheduled (fix: note correct state in task_intervals)
-                prev_task_state = TaskState.RUNNING # last_seen_state[cpu][prev_task]
+                # Getting descheduled, so prev_task was RUNNING till now.
+                # (see `task_state_intervals` for full thread state)
+                prev_task_state = TaskState.RUNNING
                 prev_task_interval = TaskInterval(task=prev_task, cpu=cpu,
                     interval=Interval(last_seen_timestamps[cpu][prev_task], timestamp),
                     state=prev_task_state)
@@ -491,6 +987,16 @@ class CPU(FTraceComponent):
                 next_task = Task(name=data.next_comm, pid=data.next_pid, 
                                  prio=data.next_prio)
                 next_task_by_cpu[cpu] = next_task
+
+                # wakeup-to-running latency
+                pending_wakeups.pop(prev_task.pid, None)
+                wakeup = pending_wakeups.pop(next_task.pid, None)
+                if wakeup is not None and next_task.pid != 0:
+                    wakeup_ts, wakeup_prio, wakeup_prev_cpu = wakeup
+                    wakeup_latencies.append((wakeup_ts, next_task.pid,
+                        wakeup_prio, wakeup_prev_cpu, cpu, timestamp - wakeup_ts))
+                last_cpu_by_pid[prev_task.pid] = cpu
+                last_cpu_by_pid[next_task.pid] = cpu
                 
                 next_task_interval = TaskInterval(task=next_task, cpu=cpu, 
                     interval=Interval(last_seen_timestamps[cpu][next_task], timestamp), 
@@ -508,6 +1014,10 @@ class CPU(FTraceComponent):
                 last_seen_timestamps[cpu][prev_task] = timestamp
                 last_seen_state[cpu][prev_task] = adjusted_runstate
                 last_seen_state[cpu][next_task] = TaskState.RUNNING
+
+                # full task state machine
+                update_task_state(prev_task, timestamp, adjusted_runstate)
+                update_task_state(next_task, timestamp, TaskState.RUNNING, cpu)
                 
                 # track state changes
                 if next_task.pid == 0:
@@ -577,6 +1087,26 @@ class CPU(FTraceComponent):
                 if data.success: # most likely true
                     last_seen_timestamps[target_cpu][task] = timestamp
                     self._tasks_by_cpu[target_cpu].add(task)
+                    try:
+                        current_value = self._task_state_spans_by_pid[task.pid][1][-1]
+                    except KeyError:
+                        current_value = None
+                    # waker is whoever was running, unless in IRQ context
+                    waker = event.task.pid if event.irq_type == '.' else -1
+                    wakeup_timestamps.append(timestamp)
+                    wakers.append(waker)
+                    wakees.append(task.pid)
+                    if event.task.pid not in self._task_by_pid:
+                        self._task_by_pid[event.task.pid] = event.task
+                    if current_value not in (TaskState.RUNNING.value,
+                                             TaskState.RUNNABLE.value):
+                        update_task_state(task, timestamp, TaskState.RUNNABLE)
+                    # latency is from first of (possibly) repeated wakeups,
+                    # ignoring wakeups of already running task.
+                    if current_value != TaskState.RUNNING.value and \
+                            task.pid not in pending_wakeups:
+                        pending_wakeups[task.pid] = (timestamp, task.prio,
+                            last_cpu_by_pid.get(task.pid, -1))
 
 
             num_runnable = len(runnable_tasks[cpu])
@@ -596,3 +1126,26 @@ class CPU(FTraceComponent):
                                     state=last_seen_state[cpu][task],
                                 )
                 self._task_intervals_by_cpu[cpu].append(task_interval)
+
+        # wakeup latencies as compact arrays, sorted by wakeup timestamp
+        wakeup_latencies.sort()
+        self._wakeup_latencies = WakeupLatencies(
+            pid=array('l', (row[1] for row in wakeup_latencies)),
+            prio=array('l', (row[2] for row in wakeup_latencies)),
+            prev_cpu=array('l', (row[3] for row in wakeup_latencies)),
+            cpu=array('l', (row[4] for row in wakeup_latencies)),
+            timestamp=array('d', (row[0] for row in wakeup_latencies)),
+            latency=array('d', (row[5] for row in wakeup_latencies)),
+            migrated=array('b', (row[3] not in (-1, row[4]) for row in wakeup_latencies)),
+        )
+        self._wakeup_latency_idx_by_pid = defaultdict(lambda: array('l'))
+        for idx, pid in enumerate(self._wakeup_latencies.pid):
+            self._wakeup_latency_idx_by_pid[pid].append(idx)
+        self._wakeup_latency_idx_by_pid = dict(self._wakeup_latency_idx_by_pid)
+
+        self._wakeups = Wakeups(timestamp=wakeup_timestamps, waker=wakers,
+                                wakee=wakees)
+        self._wakeup_idx_by_pid = defaultdict(lambda: array('l'))
+        for idx, pid in enumerate(wakees):
+            self._wakeup_idx_by_pid[pid].append(idx)
+        self._wakeup_idx_by_pid = dict(self._wakeup_idx_by_pid)
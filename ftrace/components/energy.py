@@ -0,0 +1,273 @@
+#!/usr/bin/python
+
+# Copyright 2015 Huawei Devices USA Inc. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+#
+# Authors:
+#       Chuk Orakwue <chuk.orakwue@huawei.com>
+
+try:
+    from logbook import Logger
+except ImportError:
+    from logging import Logger
+from bisect import bisect_left
+from collections import defaultdict, namedtuple
+from heapq import merge
+from ftrace.interval import Interval
+from ftrace.task import TaskState
+from ftrace.ftrace import register_api, FTraceComponent
+from ftrace.composites import sweep_intervals
+from ftrace.common import FtraceError, unpack_bitmap
+from ftrace.utils.decorators import requires, memoize
+
+log = Logger('Energy')
+
+# Capacity (e.g. 0..1024 as in EAS) & active power at a frequency
+CapacityState = namedtuple('CapacityState', ['capacity', 'power'])
+# Per-cluster (EAS-style) energy model. `cpus` is cpu bitmask e.g. 0x0F,
+# `capacity_states` dict of {frequency: CapacityState} & `idle_states` dict of
+# {lpm state: power} for each cpu in cluster. `cluster_power` is drawn while
+# any cpu in cluster is out of LPM, `cluster_idle_power` while all are in LPM.
+ClusterEnergyModel = namedtuple('ClusterEnergyModel', ['cpus', 'capacity_states', 'idle_states', 'cluster_power', 'cluster_idle_power'])
+
+# Estimated energy (in units of power x seconds e.g. mW -> mJ) with
+# frequency-invariant utilization i.e. busy time scaled by capacity at
+# running frequency, relative to biggest capacity in energy model.
+CpuEnergy = namedtuple('CpuEnergy', ['cpu', 'busy_time', 'utilization', 'energy'])
+ClusterEnergy = namedtuple('ClusterEnergy', ['cluster', 'active_time', 'utilization', 'energy'])
+TaskEnergy = namedtuple('TaskEnergy', ['task', 'busy_time', 'utilization', 'energy'])
+
+class EnergyModel(object):
+    """
+    User-supplied energy model (in the spirit of EAS `cpu_capacity` &
+    energy model) as list of `ClusterEnergyModel`.
+
+    Frequencies not in `capacity_states` use next higher capacity state
+    (highest one if above all or unknown i.e. before first `cpu_frequency`).
+    LPM states not in `idle_states` draw no power.
+    """
+    def __init__(self, clusters):
+        self.clusters = list(clusters)
+        self._cluster_by_cpu = {}
+        self._frequencies_by_cluster = {}
+        for cluster in self.clusters:
+            if not cluster.capacity_states:
+                raise FtraceError(msg="Cluster {:#x} has no capacity states".format(cluster.cpus))
+            self._frequencies_by_cluster[cluster.cpus] = sorted(cluster.capacity_states)
+            for cpu in unpack_bitmap(cluster.cpus):
+                self._cluster_by_cpu[cpu] = cluster
+        self.max_capacity = max(cs.capacity for cluster in self.clusters
+                                for cs in cluster.capacity_states.itervalues())
+
+    def __repr__(self):
+        return "EnergyModel(clusters={})".format(
+            ', '.join('{:#x}'.format(cluster.cpus) for cluster in self.clusters))
+
+    @property
+    def cpus(self):
+        return sorted(self._cluster_by_cpu.keys())
+
+    def cluster(self, cpu):
+        """Returns ClusterEnergyModel for cpu"""
+        try:
+            return self._cluster_by_cpu[cpu]
+        except KeyError:
+            raise FtraceError(msg="CPU{} not in energy model".format(cpu))
+
+    def capacity_state(self, cpu, frequency):
+        """Returns CapacityState of cpu at frequency"""
+        cluster = self.cluster(cpu)
+        frequencies = self._frequencies_by_cluster[cluster.cpus]
+        idx = len(frequencies) - 1 if frequency is None \
+            else min(bisect_left(frequencies, frequency), len(frequencies) - 1)
+        return cluster.capacity_states[frequencies[idx]]
+
+    def idle_power(self, cpu, state):
+        """Returns power of cpu in LPM state"""
+        return self.cluster(cpu).idle_states.get(state, 0.0)
+
+
+@register_api('energy')
+class Energy(FTraceComponent):
+    """
+    Class with APIs to estimate energy & frequency-invariant utilization
+    from user-supplied `EnergyModel` per:
+        - cpu
+        - cluster
+        - task
+    over the specified interval (if any).
+
+    Each cpu's task, frequency & LPM intervals are joined in a single
+    merged sweep, so every span has known (task, frequency, LPM state):
+        - RUNNING a task: active power at frequency
+        - in LPM state: idle power of LPM state
+        - otherwise (idle loop): active power at frequency
+    """
+    def __init__(self, trace):
+        self._trace = trace
+
+    def _initialize(self):
+        pass
+
+    @requires('sched_switch', 'sched_wakeup', 'cpu_frequency', 'cpu_idle')
+    @memoize
+    def cpu_energy(self, model, cpu=None, interval=None):
+        """
+        Returns CpuEnergy for specified cpu, or dict of {cpu: CpuEnergy}
+        for all cpus in model if cpu is None.
+        """
+        if cpu is None:
+            return dict((_cpu, self.cpu_energy(model, cpu=_cpu, interval=interval))
+                        for _cpu in model.cpus)
+        sweep = self._cpu_sweep(model, cpu, interval)
+        return CpuEnergy(cpu=cpu, busy_time=sweep['busy_time'],
+                         utilization=self._utilization(model, sweep['capacity_time'], interval),
+                         energy=sweep['energy'])
+
+    @requires('sched_switch', 'sched_wakeup', 'cpu_frequency', 'cpu_idle')
+    @memoize
+    def cluster_energy(self, model, cluster=None, interval=None):
+        """
+        Returns ClusterEnergy for specified cluster (cpu bitmask) including
+        energy of its cpus, or dict of {cluster: ClusterEnergy} for all
+        clusters in model if cluster is None.
+        """
+        if cluster is None:
+            return dict((_cluster.cpus, self.cluster_energy(model, cluster=_cluster.cpus,
+                                                            interval=interval))
+                        for _cluster in model.clusters)
+        try:
+            cluster_model = next(_cluster for _cluster in model.clusters
+                                 if _cluster.cpus == cluster)
+        except StopIteration:
+            raise FtraceError(msg="Cluster {:#x} not in energy model".format(cluster))
+
+        cpus = sorted(unpack_bitmap(cluster))
+        sweeps = [self._cpu_sweep(model, cpu, interval) for cpu in cpus]
+        start, end = self._bounds(interval)
+        all_lpm_time = self._all_lpm_time(cpus, start, end)
+        active_time = (end - start) - all_lpm_time
+        energy = sum(sweep['energy'] for sweep in sweeps) + \
+            cluster_model.cluster_power * active_time + \
+            cluster_model.cluster_idle_power * all_lpm_time
+        capacity_time = sum(sweep['capacity_time'] for sweep in sweeps)
+        return ClusterEnergy(cluster=cluster, active_time=active_time,
+                             utilization=self._utilization(
+                                 model, capacity_time, interval) / len(cpus),
+                             energy=energy)
+
+    @requires('sched_switch', 'sched_wakeup', 'cpu_frequency', 'cpu_idle')
+    @memoize
+    def task_energy(self, model, task=None, interval=None):
+        """
+        Returns TaskEnergy (active energy only, excluding idle & cluster)
+        for specified task, or dict of {pid: TaskEnergy} if task is None.
+        """
+        busy_times, capacity_times = defaultdict(float), defaultdict(float)
+        energies, tasks = defaultdict(float), {}
+        for cpu in model.cpus:
+            sweep = self._cpu_sweep(model, cpu, interval)
+            tasks.update(sweep['tasks'])
+            for pid, busy_time in sweep['busy_time_by_pid'].iteritems():
+                busy_times[pid] += busy_time
+                capacity_times[pid] += sweep['capacity_time_by_pid'][pid]
+                energies[pid] += sweep['energy_by_pid'][pid]
+
+        rv = dict((pid, TaskEnergy(task=tasks[pid], busy_time=busy_times[pid],
+                                   utilization=self._utilization(
+                                       model, capacity_times[pid], interval),
+                                   energy=energies[pid]))
+                  for pid in busy_times)
+        if task is not None:
+            pid = getattr(task, 'pid', task)
+            return rv.get(pid, TaskEnergy(task=task, busy_time=0.0,
+                                          utilization=0.0, energy=0.0))
+        return rv
+
+    @requires('sched_switch', 'sched_wakeup', 'cpu_frequency', 'cpu_idle')
+    def total_energy(self, model, interval=None):
+        """Returns total estimated energy of all clusters in model"""
+        return sum(cluster_energy.energy for cluster_energy in
+                   self.cluster_energy(model, interval=interval).itervalues())
+
+    def _bounds(self, interval):
+        interval = interval or self._trace.interval
+        return interval.start, interval.end
+
+    def _utilization(self, model, capacity_time, interval):
+        start, end = self._bounds(interval)
+        duration = end - start
+        return capacity_time / (model.max_capacity * duration) if duration else float('nan')
+
+    def _cpu_streams(self, cpu):
+        """
+        Returns `sweep_intervals` streams of RUNNING task, frequency & LPM
+        intervals of cpu, in that order.
+        """
+        cpu_api = self._trace.cpu
+        running = lambda ti: ti.task if ti.task.pid != 0 and \
+            ti.state is TaskState.RUNNING else None
+        return [(cpu_api.task_intervals(cpu=cpu), running),
+                (cpu_api.frequency_intervals(cpu=cpu), lambda fi: fi.frequency),
+                (cpu_api.lpm_intervals(cpu=cpu), lambda ii: ii.state)]
+
+    @memoize
+    def _cpu_sweep(self, model, cpu, interval):
+        """
+        Single sweep join of task, frequency & LPM intervals of cpu,
+        returning dict of accumulated busy/capacity time & energy (per pid).
+        """
+        start, end = self._bounds(interval)
+        rv = dict(busy_time=0.0, capacity_time=0.0, energy=0.0, tasks={},
+                  busy_time_by_pid=defaultdict(float),
+                  capacity_time_by_pid=defaultdict(float),
+                  energy_by_pid=defaultdict(float))
+        for duration, (task, freq, lpm) in sweep_intervals(
+                self._cpu_streams(cpu), Interval(start, end)):
+            if task is not None:
+                capacity_state = model.capacity_state(cpu, freq)
+                energy = capacity_state.power * duration
+                rv['busy_time'] += duration
+                rv['capacity_time'] += capacity_state.capacity * duration
+                rv['energy'] += energy
+                rv['tasks'][task.pid] = task
+                rv['busy_time_by_pid'][task.pid] += duration
+                rv['capacity_time_by_pid'][task.pid] += capacity_state.capacity * duration
+                rv['energy_by_pid'][task.pid] += energy
+            elif lpm is not None:
+                rv['energy'] += model.idle_power(cpu, lpm) * duration
+            else: # idle loop
+                rv['energy'] += model.capacity_state(cpu, freq).power * duration
+        return rv
+
+    def _all_lpm_time(self, cpus, start, end):
+        """Returns time within [start, end] when all cpus were in LPM"""
+        cpu_api = self._trace.cpu
+        def stream(cpu):
+            for ii in cpu_api.lpm_intervals(cpu=cpu):
+                if ii.interval.end > ii.interval.start:
+                    yield ii.interval.start, 1
+                    yield ii.interval.end, -1
+
+        num_in_lpm, last_timestamp, rv = 0, start, 0.0
+        for timestamp, delta in merge(*[stream(cpu) for cpu in cpus]):
+            span_end = min(timestamp, end)
+            if num_in_lpm == len(cpus) and span_end > last_timestamp:
+                rv += span_end - last_timestamp
+            last_timestamp = max(last_timestamp, span_end)
+            num_in_lpm += delta
+        if num_in_lpm == len(cpus) and end > last_timestamp:
+            rv += end - last_timestamp
+        return rv
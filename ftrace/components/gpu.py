@@ -22,6 +22,7 @@ try:
     from logbook import Logger
 except ImportError:
     from logging import Logger
+from array import array
 from collections import defaultdict, namedtuple
 from ftrace.interval import Interval, IntervalList
 from ftrace.event import EventList
@@ -143,6 +144,47 @@ class GPU(FTraceComponent):
             # could be busy or idle entire time.
             return float('nan')
             
+    @requires('kgsl_pwr_set_state')
+    def busy_time_many(self, intervals, device=None):
+        """
+        Returns array of Busy (ACTIVE) time for specified gpu device over
+        each of intervals (e.g. every frame), answered in a single sweep.
+        """
+        return self.busy_intervals(device=device, state=BusyState.ACTIVE).\
+            overlap_durations(intervals)
+
+    @requires('kgsl_pwr_set_state')
+    def idle_time_many(self, intervals, device=None):
+        """
+        Returns array of Idle time for specified gpu device over each of
+        intervals [including in LPM & INIT/AWARE state].
+        """
+        intervals = [getattr(it, 'interval', it) for it in intervals]
+        busy_times = self.busy_time_many(intervals=intervals, device=device)
+        return array('d', (interval.duration - busy_time for interval, busy_time
+                           in zip(intervals, busy_times)))
+
+    @requires('kgsl_pwr_set_state')
+    def lpm_time_many(self, intervals, device=None, state=None):
+        """
+        Returns array of time in LPM (or specified state) for specified gpu
+        device over each of intervals.
+        """
+        return self.idle_intervals(device=device, state=state).\
+            overlap_durations(intervals)
+
+    @requires('kgsl_pwr_set_state')
+    @memoize
+    def busy_timeline(self, device=None, resolution=0.01, interval=None,
+                      as_numpy=False):
+        """
+        Returns array of fraction of time Busy (ACTIVE) for specified gpu
+        device for every `resolution` (in seconds) bucket of interval (if any).
+        """
+        return self.busy_intervals(device=device, state=BusyState.ACTIVE).\
+            resample(interval=interval or self._trace.interval,
+                     resolution=resolution, as_numpy=as_numpy)
+
     @requires('kgsl_pwr_set_state')
     @memoize
     def idle_intervals(self, device=None, state=None, interval=None):
@@ -0,0 +1,345 @@
+#!/usr/bin/python
+
+# Copyright 2015 Huawei Devices USA Inc. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+#
+# Authors:
+#       Chuk Orakwue <chuk.orakwue@huawei.com>
+
+try:
+    from logbook import Logger
+except ImportError:
+    from logging import Logger
+from array import array
+from bisect import bisect_left
+from collections import defaultdict, deque, namedtuple
+from ftrace.interval import Interval, IntervalList
+from ftrace.task import Task
+from ftrace.ftrace import register_api, FTraceComponent
+from ftrace.common import ConstantBase, FtraceError
+from ftrace.utils.decorators import requires, memoize
+
+log = Logger('IRQ')
+
+HARDIRQ_TRACEPOINTS = ['irq_handler_entry', 'irq_handler_exit']
+SOFTIRQ_TRACEPOINTS = ['softirq_raise', 'softirq_entry', 'softirq_exit']
+
+class IRQType(ConstantBase):
+    HARDIRQ = ()
+    SOFTIRQ = ()
+
+# Hardirq handler/softirq action run on cpu. `irq` is irq number (hardirq)
+# or vector (softirq), `task` the task interrupted, `depth` nesting level
+# (0 if outermost) and `self_time` excludes time of nested spans.
+IRQInterval = namedtuple('IRQInterval', ['cpu', 'irq_type', 'irq', 'name', 'task',
+                                         'depth', 'self_time', 'interval'])
+# Softirq pending on cpu, from (first) raise till entry.
+SoftIRQLatency = namedtuple('SoftIRQLatency', ['cpu', 'vec', 'action', 'interval', 'latency'])
+# Count, rate (per second) & total (self) time of spans.
+IRQStats = namedtuple('IRQStats', ['name', 'count', 'rate', 'time'])
+# Burst of at least `threshold` spans of irq within `window` seconds.
+IRQStorm = namedtuple('IRQStorm', ['irq_type', 'irq', 'name', 'count', 'interval'])
+
+@register_api('irq')
+class IRQ(FTraceComponent):
+    """
+    Class with APIs to process hardirq (`irq_handler_*`) and softirq
+    (`softirq_*`) events, such as:
+        - hardirq/softirq spans per cpu and irq/vector, including nesting
+        - softirq raise -> entry latency per vector
+        - count, rate & time per irq/vector
+        - time stolen from interrupted tasks
+        - irq storms
+
+    Spans are reconstructed per cpu in a single pass over events, using
+    stack of open spans per cpu. Queries by interval bisect (sorted) start
+    times and cumulative self times, so are O(log n).
+
+    NOTE: Softirqs run by ksoftirqd are attributed to ksoftirqd.
+    """
+    def __init__(self, trace):
+        self._trace = trace
+        self._events = trace.events
+
+    def _initialize(self):
+        self._parse_irq_events()
+
+    @property
+    @requires()
+    def names(self):
+        """Returns dict of {(irq_type, irq): name} seen"""
+        return dict(self._names)
+
+    @requires()
+    @memoize
+    def irq_intervals(self, irq_type=IRQType.HARDIRQ, irq=None, cpu=None,
+                      interval=None):
+        """
+        Returns IntervalList of `IRQInterval` of `irq_type` for irq (if any)
+        on cpu (if any) overlapping the specified interval (if any).
+        """
+        intervals = self._intervals_for(irq_type, irq=irq, cpu=cpu)
+        if irq is not None and cpu is not None:
+            intervals = IntervalList(i for i in intervals if i.cpu == cpu)
+        if interval is None:
+            return intervals
+        lo = bisect_left(intervals._start_times,
+                         interval.start - self._max_durations[irq_type])
+        hi = bisect_left(intervals._start_times, interval.end)
+        return IntervalList(i for i in intervals[lo:hi]
+                            if i.interval.end > interval.start)
+
+    def hardirq_intervals(self, irq=None, cpu=None, interval=None):
+        """Returns hardirq handler spans"""
+        return self.irq_intervals(IRQType.HARDIRQ, irq=irq, cpu=cpu,
+                                  interval=interval)
+
+    def softirq_intervals(self, vec=None, cpu=None, interval=None):
+        """Returns softirq action spans"""
+        return self.irq_intervals(IRQType.SOFTIRQ, irq=vec, cpu=cpu,
+                                  interval=interval)
+
+    @requires(*SOFTIRQ_TRACEPOINTS)
+    @memoize
+    def softirq_latencies(self, vec=None, cpu=None, interval=None):
+        """
+        Returns IntervalList of `SoftIRQLatency` (raise -> entry) for vector
+        (if any) on cpu (if any) raised within the specified interval (if any).
+        """
+        if vec is not None:
+            latencies = self._softirq_latencies_by_vec[vec]
+        elif cpu is not None:
+            latencies = self._softirq_latencies_by_cpu[cpu]
+        else:
+            latencies = self._softirq_latencies
+        if vec is not None and cpu is not None:
+            latencies = IntervalList(sl for sl in latencies if sl.cpu == cpu)
+        lo, hi = self._range(latencies._start_times, interval)
+        return IntervalList(latencies[lo:hi])
+
+    @requires()
+    @memoize
+    def irq_stats(self, irq_type=IRQType.HARDIRQ, by='irq', interval=None):
+        """
+        Returns dict of {irq: IRQStats} (by='irq') or {cpu: IRQStats}
+        (by='cpu') of `irq_type` spans starting within the specified
+        interval (if any). Time is self time i.e. excludes nested spans.
+        """
+        if by == 'irq':
+            intervals_by_key = self._intervals_by_irq[irq_type]
+        elif by == 'cpu':
+            intervals_by_key = self._intervals_by_cpu[irq_type]
+        else:
+            raise FtraceError(msg="Unsupported `by`: {}".format(by))
+
+        duration = interval.duration if interval else self._trace.duration
+        rv = {}
+        for key, intervals in intervals_by_key.iteritems():
+            lo, hi = self._range(intervals._start_times, interval)
+            if hi == lo:
+                continue
+            cumulative = self._cumulative_times(irq_type, by, key)
+            count = hi - lo
+            rv[key] = IRQStats(
+                name=self._names.get((irq_type, key)) if by == 'irq' else None,
+                count=count,
+                rate=count / duration if duration else float('nan'),
+                time=cumulative[hi] - cumulative[lo])
+        return rv
+
+    @requires()
+    @memoize
+    def stolen_time(self, task=None, interval=None):
+        """
+        Returns time (in seconds) outermost hardirq/softirq spans starting
+        within the specified interval (if any) ran on top of task.
+        If task is None, returns dict of {task: time} for all tasks.
+        """
+        if task is not None:
+            pid = task.pid if isinstance(task, Task) else task
+            intervals = self._outermost_by_pid.get(pid)
+            if not intervals:
+                return 0.0
+            lo, hi = self._range(intervals._start_times, interval)
+            cumulative = self._cumulative_times(None, 'pid', pid)
+            return cumulative[hi] - cumulative[lo]
+        return {intervals[0].task: self.stolen_time(task=pid, interval=interval)
+                for pid, intervals in self._outermost_by_pid.iteritems()}
+
+    @requires()
+    @memoize
+    def irq_storms(self, irq_type=IRQType.HARDIRQ, window=0.01, threshold=50,
+                   interval=None):
+        """
+        Returns IntervalList of `IRQStorm` where at least `threshold`
+        spans of same irq started within `window` seconds, within the
+        specified interval (if any).
+
+        Detected in single pass over (start sorted) spans, with sliding
+        window of recent start times per irq.
+        """
+        if threshold < 1 or window <= 0:
+            raise FtraceError(msg="Invalid storm `window`/`threshold`")
+        storms = IntervalList()
+        recent_by_irq = defaultdict(deque)
+        # irq -> [start, last span end, count] of storm in progress.
+        open_storms = {}
+
+        def close_storm(irq, storm):
+            start, end, count = storm
+            storms.append(IRQStorm(irq_type=irq_type, irq=irq,
+                                   name=self._names.get((irq_type, irq)),
+                                   count=count, interval=Interval(start, end)))
+
+        for span in self.irq_intervals(irq_type, interval=interval):
+            irq, start = span.irq, span.interval.start
+            recent = recent_by_irq[irq]
+            recent.append(start)
+            while start - recent[0] > window:
+                recent.popleft()
+
+            storm = open_storms.get(irq)
+            if len(recent) >= threshold:
+                if storm is None:
+                    open_storms[irq] = [recent[0], span.interval.end, len(recent)]
+                else:
+                    storm[1] = max(storm[1], span.interval.end)
+                    storm[2] += 1
+            elif storm is not None:
+                close_storm(irq, open_storms.pop(irq))
+
+        for irq, storm in open_storms.iteritems():
+            close_storm(irq, storm)
+        return storms
+
+    def _range(self, timestamps, interval=None):
+        """Returns index range of (sorted) timestamps within interval"""
+        if interval is None:
+            return 0, len(timestamps)
+        return bisect_left(timestamps, interval.start), \
+            bisect_left(timestamps, interval.end)
+
+    def _intervals_for(self, irq_type, irq=None, cpu=None):
+        try:
+            if irq is not None:
+                return self._intervals_by_irq[irq_type][irq]
+            elif cpu is not None:
+                return self._intervals_by_cpu[irq_type][cpu]
+            return self._intervals[irq_type]
+        except KeyError:
+            raise FtraceError(msg="Unsupported irq type: {}".format(irq_type))
+
+    @memoize
+    def _cumulative_times(self, irq_type, by, key):
+        """
+        Returns array of cumulative (self) time of spans by irq/cpu/pid,
+        so time over any index range is difference of two entries.
+        """
+        if by == 'pid':
+            intervals, time_func = self._outermost_by_pid[key], \
+                lambda span: span.interval.duration
+        else:
+            intervals = self._intervals_for(irq_type, **{by: key})
+            time_func = lambda span: span.self_time
+        cumulative = array('d', [0.0])
+        for span in intervals:
+            cumulative.append(cumulative[-1] + time_func(span))
+        return cumulative
+
+    def _parse_irq_events(self):
+        """Reconstruct hardirq/softirq spans per cpu in single pass over events"""
+        self._intervals = dict((irq_type, IntervalList()) for irq_type in IRQType.universe())
+        self._intervals_by_irq = dict((irq_type, defaultdict(IntervalList)) for irq_type in IRQType.universe())
+        self._intervals_by_cpu = dict((irq_type, defaultdict(IntervalList)) for irq_type in IRQType.universe())
+        self._max_durations = dict((irq_type, 0.0) for irq_type in IRQType.universe())
+        self._outermost_by_pid = defaultdict(IntervalList)
+        self._softirq_latencies = IntervalList()
+        self._softirq_latencies_by_vec = defaultdict(IntervalList)
+        self._softirq_latencies_by_cpu = defaultdict(IntervalList)
+        self._names = {}
+
+        # cpu -> stack of open spans [irq_type, irq, task, start, nested time]
+        open_spans_by_cpu = defaultdict(list)
+        # cpu -> {vec: (first) raise timestamp awaiting entry}
+        raises_by_cpu = defaultdict(dict)
+        last_timestamp_by_cpu = {}
+
+        def irq_events_gen():
+            tracepoints = set(HARDIRQ_TRACEPOINTS + SOFTIRQ_TRACEPOINTS)
+            filter_func = lambda event: event.tracepoint in tracepoints
+            for event in filter(filter_func, self._events):
+                yield event
+
+        def close_span(cpu, timestamp):
+            open_spans = open_spans_by_cpu[cpu]
+            irq_type, irq, task, start, nested_time = open_spans.pop()
+            interval = Interval(start, timestamp)
+            span = IRQInterval(cpu=cpu, irq_type=irq_type, irq=irq,
+                               name=self._names.get((irq_type, irq)),
+                               task=task, depth=len(open_spans),
+                               self_time=interval.duration - nested_time,
+                               interval=interval)
+            self._intervals[irq_type].append(span)
+            self._intervals_by_irq[irq_type][irq].append(span)
+            self._intervals_by_cpu[irq_type][cpu].append(span)
+            self._max_durations[irq_type] = max(self._max_durations[irq_type],
+                                                interval.duration)
+            if open_spans:
+                open_spans[-1][4] += interval.duration
+            else:
+                self._outermost_by_pid[task.pid].append(span)
+
+        for event in irq_events_gen():
+            tracepoint, data, cpu = event.tracepoint, event.data, event.cpu
+            timestamp = event.timestamp
+            last_timestamp_by_cpu[cpu] = timestamp
+            if tracepoint == 'softirq_raise':
+                raises_by_cpu[cpu].setdefault(data.vec, timestamp)
+                continue
+
+            if tracepoint in ('irq_handler_entry', 'irq_handler_exit'):
+                irq_type, irq = IRQType.HARDIRQ, data.irq
+            else:
+                irq_type, irq = IRQType.SOFTIRQ, data.vec
+
+            if tracepoint in ('irq_handler_entry', 'softirq_entry'):
+                self._names[(irq_type, irq)] = data.name \
+                    if irq_type is IRQType.HARDIRQ else data.action
+                open_spans_by_cpu[cpu].append([irq_type, irq, event.task, timestamp, 0.0])
+                if tracepoint == 'softirq_entry':
+                    raised = raises_by_cpu[cpu].pop(irq, None)
+                    if raised is not None:
+                        latency = SoftIRQLatency(cpu=cpu, vec=irq, action=data.action,
+                                                 interval=Interval(raised, timestamp),
+                                                 latency=timestamp - raised)
+                        self._softirq_latencies.append(latency)
+                        self._softirq_latencies_by_vec[irq].append(latency)
+                        self._softirq_latencies_by_cpu[cpu].append(latency)
+                continue
+
+            # exit: close matching span, and any (missing exit) nested in it.
+            open_spans = open_spans_by_cpu[cpu]
+            depth = next((idx for idx in xrange(len(open_spans) - 1, -1, -1)
+                          if open_spans[idx][0] is irq_type and open_spans[idx][1] == irq),
+                         None)
+            if depth is None: # entered before trace started.
+                continue
+            while len(open_spans) > depth:
+                close_span(cpu, timestamp)
+
+        # closure: still open at last event seen on cpu.
+        for cpu, open_spans in open_spans_by_cpu.iteritems():
+            while open_spans:
+                close_span(cpu, last_timestamp_by_cpu[cpu])
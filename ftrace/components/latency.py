@@ -0,0 +1,181 @@
+#!/usr/bin/python
+
+# Copyright 2015 Huawei Devices USA Inc. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+#
+# Authors:
+#       Chuk Orakwue <chuk.orakwue@huawei.com>
+
+try:
+    from logbook import Logger
+except ImportError:
+    from logging import Logger
+from bisect import bisect_left, bisect_right
+from collections import defaultdict, namedtuple
+from ftrace.interval import Interval, IntervalList
+from ftrace.ftrace import register_api, FTraceComponent
+from ftrace.composites import sorted_items
+from ftrace.common import ConstantBase, FtraceError
+from ftrace.utils.decorators import requires, memoize
+
+log = Logger('Latency')
+
+# Span when flag was set on cpu, attributed to task at start of span.
+LatencyInterval = namedtuple('LatencyInterval', ['cpu', 'task', 'latency_type', 'interval'])
+# Worst offending task: number, total & max duration of its spans.
+LatencyOffender = namedtuple('LatencyOffender', ['task', 'count', 'total', 'max'])
+
+class LatencyType(ConstantBase):
+    IRQS_OFF = ()
+    PREEMPT_OFF = ()
+    NEED_RESCHED = ()
+
+# Predicate on event header flags for each latency type.
+_FLAG_FUNCS = {
+    LatencyType.IRQS_OFF: lambda event: event.irqs_off == 'd',
+    LatencyType.PREEMPT_OFF: lambda event: event.preempt_depth not in ('.', '0'),
+    LatencyType.NEED_RESCHED: lambda event: event.need_resched in ('N', 'n', 'p'),
+}
+
+@register_api('latency')
+class Latency(FTraceComponent):
+    """
+    Class with APIs to analyse (irqsoff/preemptoff tracer style) latencies
+    from flags in header of every event, such as:
+        - spans with interrupts disabled
+        - spans with preemption disabled
+        - spans with need_resched set but not yet serviced
+        - worst offending tasks
+
+    Spans are reconstructed per cpu in a single pass over events, from first
+    event with flag set till next event on same cpu with flag cleared.
+
+    IMPORTANT: Spans are only as accurate as events recorded on cpu; flags
+    set/cleared between events are not visible.
+    """
+    def __init__(self, trace):
+        self._trace = trace
+        self._events = trace.events
+
+    def _initialize(self):
+        self._parse_latency_spans()
+
+    @requires()
+    @memoize
+    def latency_intervals(self, latency_type, cpu=None, task=None, interval=None):
+        """
+        Returns IntervalList of `LatencyInterval` of `latency_type`
+        on cpu (if any), attributed to task (if any) over the
+        specified interval (if any), trimmed.
+        """
+        try:
+            intervals_by_cpu = self._latency_intervals_by_type[latency_type]
+        except KeyError:
+            raise FtraceError(msg="Unsupported latency type: {}".format(latency_type))
+        cpus = [cpu] if cpu is not None else intervals_by_cpu.keys()
+        intervals = sorted_items(self._trimmed(intervals_by_cpu[_cpu], interval)
+                                 for _cpu in cpus)
+
+        filter_func = (lambda li: li.task == task) if task else None
+        return IntervalList(filter(filter_func, intervals))
+
+    def _trimmed(self, intervals, interval):
+        """
+        Returns IntervalList of spans (of one cpu) overlapping interval, trimmed.
+        Spans of cpu don't overlap, so their ends are sorted too.
+        """
+        if interval is None:
+            return intervals
+        start, end = interval.start, interval.end
+        lo = bisect_right(intervals._end_times, start)
+        hi = bisect_left(intervals._start_times, end)
+        return IntervalList(li._replace(interval=Interval(max(li.interval.start, start),
+                                                          min(li.interval.end, end)))
+                            for li in intervals[lo:hi])
+
+    def irqsoff_intervals(self, cpu=None, task=None, interval=None):
+        """Returns spans with interrupts disabled"""
+        return self.latency_intervals(LatencyType.IRQS_OFF, cpu=cpu,
+                                      task=task, interval=interval)
+
+    def preemptoff_intervals(self, cpu=None, task=None, interval=None):
+        """Returns spans with preemption disabled (preempt-depth > 0)"""
+        return self.latency_intervals(LatencyType.PREEMPT_OFF, cpu=cpu,
+                                      task=task, interval=interval)
+
+    def need_resched_intervals(self, cpu=None, task=None, interval=None):
+        """Returns spans with need_resched set, but not yet serviced"""
+        return self.latency_intervals(LatencyType.NEED_RESCHED, cpu=cpu,
+                                      task=task, interval=interval)
+
+    @requires()
+    @memoize
+    def worst_intervals(self, latency_type, num=10, cpu=None, interval=None):
+        """Returns `num` longest spans of `latency_type`, longest first"""
+        intervals = self.latency_intervals(latency_type, cpu=cpu, interval=interval)
+        return sorted(intervals, key=lambda li: li.interval.duration,
+                      reverse=True)[:num]
+
+    @requires()
+    @memoize
+    def worst_offenders(self, latency_type, num=10, cpu=None, interval=None):
+        """
+        Returns list of `LatencyOffender` for `num` tasks with longest
+        (max) spans of `latency_type`, worst first.
+        """
+        counts, totals, maxs = defaultdict(int), defaultdict(float), defaultdict(float)
+        for li in self.latency_intervals(latency_type, cpu=cpu, interval=interval):
+            duration = li.interval.duration
+            counts[li.task] += 1
+            totals[li.task] += duration
+            maxs[li.task] = max(maxs[li.task], duration)
+
+        offenders = [LatencyOffender(task=task, count=counts[task],
+                                     total=totals[task], max=maxs[task])
+                     for task in counts]
+        return sorted(offenders, key=lambda lo: (lo.max, lo.total),
+                      reverse=True)[:num]
+
+    def _parse_latency_spans(self):
+        """Reconstruct latency spans per cpu in single pass over events"""
+        self._latency_intervals_by_type = dict(
+            (latency_type, defaultdict(IntervalList)) for latency_type in _FLAG_FUNCS)
+        # cpu -> {latency_type: event that opened span}
+        open_events_by_cpu = defaultdict(dict)
+        last_timestamp_by_cpu = {}
+
+        def close_span(cpu, latency_type, start_event, timestamp):
+            interval = Interval(start_event.timestamp, timestamp)
+            self._latency_intervals_by_type[latency_type][cpu].append(
+                LatencyInterval(cpu=cpu, task=start_event.task,
+                                latency_type=latency_type, interval=interval))
+
+        for event in self._events:
+            cpu = event.cpu
+            open_events = open_events_by_cpu[cpu]
+            for latency_type, flag_func in _FLAG_FUNCS.iteritems():
+                is_set = flag_func(event)
+                start_event = open_events.get(latency_type)
+                if is_set and start_event is None:
+                    open_events[latency_type] = event
+                elif not is_set and start_event is not None:
+                    close_span(cpu, latency_type, start_event, event.timestamp)
+                    del open_events[latency_type]
+            last_timestamp_by_cpu[cpu] = event.timestamp
+
+        # closure: still open at last event seen on cpu.
+        for cpu, open_events in open_events_by_cpu.iteritems():
+            for latency_type, start_event in open_events.iteritems():
+                close_span(cpu, latency_type, start_event, last_timestamp_by_cpu[cpu])
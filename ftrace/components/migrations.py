@@ -0,0 +1,248 @@
+#!/usr/bin/python
+
+# Copyright 2015 Huawei Devices USA Inc. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+#
+# Authors:
+#       Chuk Orakwue <chuk.orakwue@huawei.com>
+
+try:
+    from logbook import Logger
+except ImportError:
+    from logging import Logger
+from bisect import bisect
+from collections import defaultdict, namedtuple
+from ftrace.event import EventList
+from ftrace.task import Task
+from ftrace.ftrace import register_api, FTraceComponent
+from ftrace.composites import sorted_items
+from ftrace.common import FtraceError, unpack_bitmap
+from ftrace.sched_hmp import HMPMigrate
+from ftrace.utils.decorators import requires, memoize
+
+log = Logger('Migrations')
+
+# Task migration from `orig_cpu` to `dest_cpu` (-1 if unknown)
+Migration = namedtuple('Migration', ['task', 'orig_cpu', 'dest_cpu', 'migrate_type', 'timestamp'])
+# Destination cpu state at time of migration
+MigrationState = namedtuple('MigrationState', ['migration', 'dest_frequency', 'dest_idle_state', 'timestamp'])
+# Count & rate (per second) of migrations
+MigrationStats = namedtuple('MigrationStats', ['count', 'rate'])
+
+@register_api('migrations')
+class Migrations(FTraceComponent):
+    """
+    Class with APIs to process task migrations i.e. `sched_migrate_task` and
+    (Linaro/ARM's HMP) `sched_hmp_migrate` events such as:
+        - migrations by task, source/destination cpu & cluster
+        - count & rate of migrations per migration type or cluster
+        - destination cpu frequency/idle state at time of migration
+
+    When both tracepoints are present, each `sched_hmp_migrate` is paired
+    with the `sched_migrate_task` for same task & destination cpu that
+    follows it, so that migrations carry their `HMPMigrate` type. Traces
+    with only one of the tracepoints are supported too.
+    """
+    def __init__(self, trace):
+        self._trace = trace
+        self._events = trace.events
+
+    def _initialize(self):
+        self._parse_migration_events()
+
+    @requires()
+    @memoize
+    def migrations(self, task=None, orig_cpu=None, dest_cpu=None,
+                   orig_cluster=None, dest_cluster=None, interval=None):
+        """
+        Returns EventList of migrations for specified task (if any),
+        from `orig_cpu`/`orig_cluster` (if any) to `dest_cpu`/`dest_cluster`
+        (if any) over the specified interval (if any).
+
+        Clusters are specified as cpu bitmask e.g. 0xF0.
+        """
+        if task is not None:
+            pid = task.pid if isinstance(task, Task) else task
+            migrations = self._migrations_by_pid[pid]
+        elif dest_cpu is not None:
+            migrations = self._migrations_by_dest_cpu[dest_cpu]
+        elif orig_cpu is not None:
+            migrations = self._migrations_by_orig_cpu[orig_cpu]
+        elif dest_cluster is not None:
+            migrations = self._cluster_migrations('dest', dest_cluster)
+        elif orig_cluster is not None:
+            migrations = self._cluster_migrations('orig', orig_cluster)
+        else:
+            migrations = self._migrations
+
+        migrations = migrations.slice(interval=interval)
+
+        filters = []
+        if orig_cpu is not None:
+            filters.append(lambda m: m.orig_cpu == orig_cpu)
+        if dest_cpu is not None:
+            filters.append(lambda m: m.dest_cpu == dest_cpu)
+        if orig_cluster is not None:
+            orig_cpus = unpack_bitmap(orig_cluster)
+            filters.append(lambda m: m.orig_cpu in orig_cpus)
+        if dest_cluster is not None:
+            dest_cpus = unpack_bitmap(dest_cluster)
+            filters.append(lambda m: m.dest_cpu in dest_cpus)
+
+        if filters:
+            return EventList(m for m in migrations if all(f(m) for f in filters))
+        return migrations
+
+    @requires()
+    @memoize
+    def migration_stats(self, by='type', cluster_masks=None, interval=None):
+        """
+        Returns dict of {key: MigrationStats} computed in single pass over
+        migrations within specified interval (if any).
+
+        Parameters:
+        -----------
+        by : string
+            'type' keys by `HMPMigrate` type, 'cluster' keys by
+            (orig_cluster_mask, dest_cluster_mask). Unknown clusters are None.
+        cluster_masks : tuple
+            Cpu bitmasks for each cluster e.g. (0x0F, 0xF0). Required if
+            by='cluster'.
+        """
+        if by == 'type':
+            key_func = lambda m: m.migrate_type
+        elif by == 'cluster':
+            if not cluster_masks:
+                raise FtraceError(msg="`cluster_masks` required for by='cluster'")
+            cluster_by_cpu = {}
+            for mask in cluster_masks:
+                for cpu in unpack_bitmap(mask):
+                    cluster_by_cpu[cpu] = mask
+            key_func = lambda m: (cluster_by_cpu.get(m.orig_cpu),
+                                  cluster_by_cpu.get(m.dest_cpu))
+        else:
+            raise FtraceError(msg="Unsupported `by`: {}".format(by))
+
+        counts = defaultdict(int)
+        for migration in self.migrations(interval=interval):
+            counts[key_func(migration)] += 1
+
+        duration = interval.duration if interval else self._trace.duration
+        return {key: MigrationStats(count=count,
+                                    rate=count / duration if duration else float('nan'))
+                for key, count in counts.iteritems()}
+
+    @requires('cpu_frequency', 'cpu_idle')
+    @memoize
+    def migration_states(self, task=None, dest_cpu=None, interval=None):
+        """
+        Returns EventList of `MigrationState` joining each migration to its
+        destination cpu frequency and LPM (idle) state at time of migration.
+        Unknown frequency and (not in) LPM are None.
+        """
+        rv = EventList()
+        for migration in self.migrations(task=task, dest_cpu=dest_cpu,
+                                         interval=interval):
+            cpu, timestamp = migration.dest_cpu, migration.timestamp
+            freq = self._as_of(
+                self._trace.cpu.frequency_intervals(cpu=cpu), timestamp)
+            lpm = self._as_of(
+                self._trace.cpu.lpm_intervals(cpu=cpu), timestamp)
+            rv.append(MigrationState(migration=migration,
+                                     dest_frequency=freq.frequency if freq else None,
+                                     dest_idle_state=lpm.state if lpm else None,
+                                     timestamp=timestamp))
+        return rv
+
+    def _as_of(self, intervals, timestamp):
+        """
+        Returns item in IntervalList (of non-overlapping intervals) that
+        covers timestamp, None otherwise.
+        """
+        idx = bisect(intervals._start_times, timestamp) - 1
+        if idx >= 0 and intervals[idx].interval.end >= timestamp:
+            return intervals[idx]
+        return None
+
+    @memoize
+    def _cluster_migrations(self, side, cluster):
+        """Returns EventList of migrations from/to ('orig'/'dest')
+        cpus in cluster bitmask"""
+        migrations_by_cpu = self._migrations_by_orig_cpu if side == 'orig' \
+            else self._migrations_by_dest_cpu
+        return EventList(sorted_items(migrations_by_cpu[cpu]
+                                      for cpu in unpack_bitmap(cluster)))
+
+    def _parse_migration_events(self):
+        """Parse task migration events"""
+        self._migrations = EventList()
+        self._migrations_by_pid = defaultdict(EventList)
+        self._migrations_by_orig_cpu = defaultdict(EventList)
+        self._migrations_by_dest_cpu = defaultdict(EventList)
+
+        has_migrate_task = 'sched_migrate_task' in self._trace.tracepoints
+        if not has_migrate_task and 'sched_hmp_migrate' not in self._trace.tracepoints:
+            log.warn("Neither 'sched_migrate_task' nor 'sched_hmp_migrate' "
+                     "tracepoint recorded in trace, no migrations found.")
+        # pid -> sched_hmp_migrate awaiting its sched_migrate_task
+        pending_hmp_events = {}
+
+        def migration_events_gen():
+            filter_func = lambda event: event.tracepoint in ('sched_migrate_task',
+                            'sched_hmp_migrate')
+            for event in filter(filter_func, self._events):
+                yield event
+
+        def add_migration(migration):
+            self._migrations.append(migration)
+            self._migrations_by_pid[migration.task.pid].append(migration)
+            self._migrations_by_orig_cpu[migration.orig_cpu].append(migration)
+            self._migrations_by_dest_cpu[migration.dest_cpu].append(migration)
+
+        def hmp_migration(event):
+            data = event.data
+            task = Task(name=data.comm, pid=data.pid)
+            return Migration(task=task, orig_cpu=-1, dest_cpu=data.dest,
+                             migrate_type=data.force, timestamp=event.timestamp)
+
+        for event in migration_events_gen():
+            data = event.data
+            if event.tracepoint == 'sched_hmp_migrate':
+                if has_migrate_task:
+                    # previous one never resulted in migration.
+                    stale_event = pending_hmp_events.get(data.pid)
+                    if stale_event is not None:
+                        add_migration(hmp_migration(stale_event))
+                    pending_hmp_events[data.pid] = event
+                else:
+                    add_migration(hmp_migration(event))
+                continue
+
+            migrate_type = HMPMigrate.UNKNOWN
+            hmp_event = pending_hmp_events.pop(data.pid, None)
+            if hmp_event is not None:
+                if hmp_event.data.dest == data.dest_cpu:
+                    migrate_type = hmp_event.data.force
+                else: # stale, never resulted in migration
+                    add_migration(hmp_migration(hmp_event))
+            task = Task(name=data.comm, pid=data.pid, prio=data.prio)
+            add_migration(Migration(task=task, orig_cpu=data.orig_cpu,
+                                    dest_cpu=data.dest_cpu,
+                                    migrate_type=migrate_type,
+                                    timestamp=event.timestamp))
+
+        # closure
+        for event in pending_hmp_events.itervalues():
+            add_migration(hmp_migration(event))
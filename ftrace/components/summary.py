@@ -0,0 +1,205 @@
+#!/usr/bin/python
+
+# Copyright 2015 Huawei Devices USA Inc. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+#
+# Authors:
+#       Chuk Orakwue <chuk.orakwue@huawei.com>
+
+try:
+    from logbook import Logger
+except ImportError:
+    import logging
+    logging.basicConfig()
+    from logging import getLogger as Logger
+import os
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+from ftrace.ftrace import register_api, FTraceComponent
+from ftrace.pyramid import SummaryPyramid
+from ftrace.common import FtraceError
+from ftrace.components.gpu import BusyState
+
+log = Logger('Summary')
+
+PYRAMID_FILE_EXT = '.pyramid'
+PYRAMID_FILE_VERSION = 2
+
+GPU_PWRSTATE_SERIES = ['gpu.busy', 'gpu.active', 'gpu.aware', 'gpu.nap', 'gpu.slumber']
+
+@register_api('summary')
+class Summary(FTraceComponent):
+    """
+    Class with APIs for fast range statistics over long traces, backed by
+    (lazily built) multi-resolution `SummaryPyramid` per series:
+        - 'cpu.busy', 'cpu.idle' (key: cpu) - fraction of time
+        - 'cpu.frequency', 'cpu.rq_depth' (key: cpu)
+        - 'gpu.busy' (key: device, time ACTIVE or AWARE), 'gpu.frequency' (key: device)
+        - 'gpu.active', 'gpu.aware', 'gpu.nap', 'gpu.slumber' (key: device)
+          - time in each GPU power state
+        - 'android.counter' (key: (pid, counter name) track)
+
+    Pyramids can be saved (and re-loaded) alongside the trace file,
+    so they are built once per trace.
+    """
+    def __init__(self, trace, resolution=0.001, factor=10, num_levels=4):
+        self._trace = trace
+        self.resolution = resolution
+        self.factor = factor
+        self.num_levels = num_levels
+        self._pyramids = {}
+
+    def _initialize(self):
+        pass
+
+    @property
+    def series(self):
+        """Supported series names"""
+        return sorted(self._series_sources().keys())
+
+    def pyramid(self, series, key=None):
+        """Returns SummaryPyramid for specified series & key (e.g. cpu)"""
+        try:
+            return self._pyramids[(series, key)]
+        except KeyError:
+            pass
+        try:
+            source = self._series_sources()[series]
+        except KeyError:
+            raise FtraceError(msg="Unsupported series: {}".format(series))
+        intervals, value = source(key)
+        pyramid = SummaryPyramid.from_intervals(intervals,
+                                                interval=self._trace.interval,
+                                                resolution=self.resolution,
+                                                factor=self.factor,
+                                                num_levels=self.num_levels,
+                                                value=value)
+        self._pyramids[(series, key)] = pyramid
+        return pyramid
+
+    def range_stats(self, series, key=None, interval=None):
+        """
+        Returns RangeStats (time, mean, min, max) of series over specified
+        interval (if any). For 'busy'/'idle' & GPU power state series, `time`
+        is time in that state.
+        """
+        return self.pyramid(series, key=key).range_stats(
+            interval or self._trace.interval)
+
+    def range_stats_many(self, series, key=None, intervals=()):
+        """Returns list of RangeStats of series over each of intervals"""
+        return self.pyramid(series, key=key).range_stats_many(intervals)
+
+    def build(self, series=None):
+        """
+        Build pyramids for specified series (if any, all otherwise)
+        for all seen cpus/devices/counters.
+        """
+        for name in ([series] if series else self.series):
+            for key in self._series_keys(name):
+                self.pyramid(name, key=key)
+
+    def save(self, filepath=None):
+        """
+        Save built pyramids, defaults to trace filepath with `.pyramid`
+        extension.
+        """
+        filepath = filepath or self._default_filepath()
+        with open(filepath, 'wb') as f:
+            pickle.dump((self._header(), self._pyramids), f,
+                        pickle.HIGHEST_PROTOCOL)
+        log.info("Saved {} pyramids to {}".format(len(self._pyramids), filepath))
+        return filepath
+
+    def load(self, filepath=None):
+        """
+        Load pyramids saved for this trace. Returns True if successful,
+        False if missing or (stale i.e. saved for another trace/resolution).
+        """
+        filepath = filepath or self._default_filepath()
+        if not os.path.exists(filepath):
+            return False
+        with open(filepath, 'rb') as f:
+            header, pyramids = pickle.load(f)
+        if header != self._header():
+            log.warn("Ignoring stale pyramids in {}".format(filepath))
+            return False
+        self._pyramids.update(pyramids)
+        return True
+
+    def _default_filepath(self):
+        return os.path.join(self._trace.filedir,
+                            self._trace.filename + PYRAMID_FILE_EXT)
+
+    def _header(self):
+        return (PYRAMID_FILE_VERSION, self._trace.filename,
+                self._trace.duration, self.resolution, self.factor,
+                self.num_levels)
+
+    def _series_sources(self):
+        """Returns dict of {series: func(key) -> (IntervalList, value func)}"""
+        trace = self._trace
+        return {
+            'cpu.busy': lambda cpu: (trace.cpu.busy_intervals(cpu=cpu), None),
+            'cpu.idle': lambda cpu: (trace.cpu.idle_intervals(cpu=cpu), None),
+            'cpu.frequency': lambda cpu: (trace.cpu.frequency_intervals(cpu=cpu),
+                                          lambda fi: fi.frequency),
+            'cpu.rq_depth': lambda cpu: (trace.cpu.runqueue_depth_intervals(cpu=cpu),
+                                         lambda rqi: rqi.runnable),
+            'gpu.busy': lambda device: (trace.gpu.busy_intervals(device=device), None),
+            'gpu.active': lambda device: (trace.gpu.pwrstate_intervals(
+                                              device=device, state=BusyState.ACTIVE),
+                                          None),
+            'gpu.aware': lambda device: (trace.gpu.pwrstate_intervals(
+                                             device=device, state=BusyState.AWARE),
+                                         None),
+            'gpu.nap': lambda device: (trace.gpu.pwrstate_intervals(
+                                           device=device, state=BusyState.NAP),
+                                       None),
+            'gpu.slumber': lambda device: (trace.gpu.pwrstate_intervals(
+                                               device=device, state=BusyState.SLUMBER),
+                                           None),
+            'gpu.frequency': lambda device: (trace.gpu.frequency_intervals(device=device),
+                                             lambda fi: fi.frequency),
+            'android.counter': self._counter_source,
+        }
+
+    def _counter_source(self, key):
+        """
+        Returns (IntervalList, value func) of (pid, name) counter track.
+        Tracks are summarised separately, as merged ones overlap.
+        """
+        android = self._trace.android
+        if key not in android.counter_keys:
+            raise FtraceError(msg="Unknown counter track: {}".format(key))
+        # skip unknown value (before first sample)
+        return (android._counter_intervals(key),
+                lambda c: c.value if c.event is not None else None)
+
+    def _series_keys(self, series):
+        """Returns keys to build for series"""
+        if series.startswith('cpu.'):
+            return sorted(self._trace.seen_cpus)
+        elif series in GPU_PWRSTATE_SERIES:
+            return [None] if 'kgsl_pwr_set_state' in self._trace.tracepoints else []
+        elif series == 'gpu.frequency':
+            return [None] if 'kgsl_pwrlevel' in self._trace.tracepoints else []
+        elif series == 'android.counter':
+            if 'tracing_mark_write' not in self._trace.tracepoints:
+                return []
+            return self._trace.android.counter_keys
+        return []
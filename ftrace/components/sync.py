@@ -0,0 +1,292 @@
+#!/usr/bin/python
+
+# Copyright 2015 Huawei Devices USA Inc. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+#
+# Authors:
+#       Chuk Orakwue <chuk.orakwue@huawei.com>
+
+try:
+    from logbook import Logger
+except ImportError:
+    from logging import Logger
+from array import array
+from bisect import bisect_left
+from collections import defaultdict, namedtuple
+from ftrace.interval import Interval, IntervalList
+from ftrace.event import EventList
+from ftrace.task import Task
+from ftrace.ftrace import register_api, FTraceComponent
+from ftrace.common import FtraceError
+from ftrace.utils.decorators import requires, memoize
+
+log = Logger('Sync')
+
+SYNC_TRACEPOINTS = ['sync_wait', 'sync_pt', 'sync_timeline']
+
+# Fence wait by task, from begin till end. `points` are (timeline, value)
+# of sync points in fence, `timeline`/`value` the point signalled last
+# (None if unknown) at `signal_time`. `status` is fence status at end:
+# 1 signalled, 0 active (timed out) and < 0 error.
+FenceWait = namedtuple('FenceWait', ['task', 'fence', 'points', 'timeline', 'value',
+                                     'signal_time', 'status', 'interval'])
+# Timeline advanced to value.
+TimelineSignal = namedtuple('TimelineSignal', ['timeline', 'value', 'timestamp'])
+
+@register_api('sync')
+class Sync(FTraceComponent):
+    """
+    Class with APIs to process Android sync fence (`sync_wait`, `sync_pt`
+    & `sync_timeline`) events, such as:
+        - fence waits per task, fence & signalling timeline (e.g. GPU, display)
+        - timeline signals
+        - wait time per task or timeline, and per frame (or any interval)
+
+    Waits are paired by task in single pass over events, as task blocks
+    on one fence at a time. Each wait is linked to first `sync_timeline`
+    signal reaching value of each of its points (by bisect, as timeline
+    values only increase).
+
+    Wait time over any interval is O(log n), from cumulative sums of
+    (sorted) wait start & end times.
+    """
+    def __init__(self, trace):
+        self._trace = trace
+        self._events = trace.events
+
+    def _initialize(self):
+        self._parse_sync_events()
+
+    @property
+    @requires('sync_timeline')
+    def timelines(self):
+        """Timelines seen"""
+        return sorted(self._signals_by_timeline.keys())
+
+    @property
+    @requires('sync_wait')
+    def fences(self):
+        """Fences waited on"""
+        return sorted(self._waits_by_fence.keys())
+
+    @requires('sync_wait')
+    @memoize
+    def fence_waits(self, task=None, fence=None, timeline=None, interval=None):
+        """
+        Returns IntervalList of `FenceWait` by task (if any) on fence (if any)
+        signalled by timeline (if any) overlapping the specified interval
+        (if any).
+        """
+        waits = self._waits_for(task=task, timeline=timeline)
+        if fence is not None:
+            if task is None and timeline is None:
+                waits = self._waits_by_fence.get(fence, IntervalList())
+            else:
+                waits = IntervalList(fw for fw in waits if fw.fence == fence)
+        if interval is None:
+            return waits
+        lo = bisect_left(waits._start_times, interval.start - self._max_duration)
+        hi = bisect_left(waits._start_times, interval.end)
+        return IntervalList(fw for fw in waits[lo:hi]
+                            if fw.interval.end > interval.start)
+
+    @requires('sync_timeline')
+    @memoize
+    def timeline_signals(self, timeline, interval=None):
+        """
+        Returns EventList of `TimelineSignal` of timeline within the
+        specified interval (if any).
+        """
+        try:
+            timestamps, values = self._signals_by_timeline[timeline]
+        except KeyError:
+            raise FtraceError(msg="Unknown timeline: {}".format(timeline))
+        lo, hi = 0, len(timestamps)
+        if interval is not None:
+            lo = bisect_left(timestamps, interval.start)
+            hi = bisect_left(timestamps, interval.end)
+        return EventList(TimelineSignal(timeline=timeline, value=values[idx],
+                                        timestamp=timestamps[idx])
+                         for idx in xrange(lo, hi))
+
+    @requires(*SYNC_TRACEPOINTS)
+    @memoize
+    def wait_time(self, by='task', interval=None):
+        """
+        Returns dict of {task: time} (by='task') or {timeline: time}
+        (by='timeline') waited on fences (in seconds), trimmed to
+        the specified interval (if any).
+        """
+        if by == 'task':
+            keys = [(waits[0].task, pid) for pid, waits in self._waits_by_pid.iteritems()]
+        elif by == 'timeline':
+            keys = [(timeline, timeline) for timeline in self._waits_by_timeline]
+        else:
+            raise FtraceError(msg="Unsupported `by`: {}".format(by))
+        interval = interval or self._trace.interval
+        rv = {}
+        for key, index_key in keys:
+            time = self._wait_time(by, index_key, interval)
+            if time > 0:
+                rv[key] = time
+        return rv
+
+    @requires(*SYNC_TRACEPOINTS)
+    def frame_wait_times(self, intervals, task=None, timeline=None):
+        """
+        Returns array with time waited on fences (by task/signalled by
+        timeline, if any) trimmed to each of specified intervals e.g.
+        frames, in order. Each lookup is O(log n).
+        """
+        if task is not None:
+            by, index_key = 'task', task.pid if isinstance(task, Task) else task
+        elif timeline is not None:
+            by, index_key = 'timeline', timeline
+        else:
+            by, index_key = None, None
+        return array('d', (self._wait_time(by, index_key, getattr(interval, 'interval', interval))
+                           for interval in intervals))
+
+    def _waits_for(self, task=None, timeline=None):
+        """Returns IntervalList of waits by task or timeline (all otherwise)"""
+        if task is not None:
+            pid = task.pid if isinstance(task, Task) else task
+            waits = self._waits_by_pid.get(pid, IntervalList())
+            if timeline is not None:
+                waits = IntervalList(fw for fw in waits if fw.timeline == timeline)
+            return waits
+        elif timeline is not None:
+            return self._waits_by_timeline.get(timeline, IntervalList())
+        return self._waits
+
+    def _wait_time(self, by, key, interval):
+        """Total (trimmed) wait time of waits by task/timeline in interval"""
+        cumulative = self._cumulative_waits(by, key)
+        return self._covered(cumulative, interval.end) - \
+            self._covered(cumulative, interval.start)
+
+    def _covered(self, cumulative, point):
+        """
+        Returns total wait time before point:
+
+            sum(min(end, point) - start) for start < point
+          = point * #(start < point) - sum(start < point)
+            - point * #(end < point) + sum(end < point)
+        """
+        starts, sum_starts, ends, sum_ends = cumulative
+        idx_start = bisect_left(starts, point)
+        idx_end = bisect_left(ends, point)
+        return point * (idx_start - idx_end) - sum_starts[idx_start] + sum_ends[idx_end]
+
+    @memoize
+    def _cumulative_waits(self, by, key):
+        """
+        Returns (sorted) wait start & end times with cumulative sums,
+        for waits by task ('task', pid), timeline ('timeline', name)
+        or all (None, None).
+        """
+        if by == 'task':
+            waits = self._waits_by_pid.get(key, IntervalList())
+        elif by == 'timeline':
+            waits = self._waits_by_timeline.get(key, IntervalList())
+        else:
+            waits = self._waits
+
+        def cumulative_sum(timestamps):
+            rv = array('d', [0.0])
+            for timestamp in timestamps:
+                rv.append(rv[-1] + timestamp)
+            return rv
+
+        starts, ends = waits._start_times, waits._end_times
+        return starts, cumulative_sum(starts), ends, cumulative_sum(ends)
+
+    def _signal_time(self, timeline, value):
+        """
+        Returns timestamp timeline (first) reached value, None if unknown.
+        """
+        try:
+            timestamps, values = self._signals_by_timeline[timeline]
+        except KeyError:
+            return None
+        idx = bisect_left(values, value)
+        return timestamps[idx] if idx < len(values) else None
+
+    def _parse_sync_events(self):
+        """Pair fence waits per task & record timeline signals in single pass"""
+        self._waits = IntervalList()
+        self._waits_by_pid = {}
+        self._waits_by_fence = {}
+        self._waits_by_timeline = {}
+        self._max_duration = 0.0
+        # timeline -> (timestamps, values) of signals
+        self._signals_by_timeline = defaultdict(lambda: (array('d'), []))
+        # pid -> [task, fence, begin timestamp, points] of wait in progress
+        open_waits = {}
+        # completed waits, linked once all signals are seen.
+        closed_waits = []
+
+        def sync_events_gen():
+            filter_func = lambda event: event.tracepoint in SYNC_TRACEPOINTS
+            for event in filter(filter_func, self._events):
+                yield event
+
+        def value_of(data):
+            try:
+                return int(data.value)
+            except ValueError: # e.g. non-numeric timeline values
+                return None
+
+        for event in sync_events_gen():
+            data, pid = event.data, event.task.pid
+            if event.tracepoint == 'sync_timeline':
+                value = value_of(data)
+                if value is not None:
+                    timestamps, values = self._signals_by_timeline[data.name]
+                    timestamps.append(event.timestamp)
+                    values.append(value)
+            elif event.tracepoint == 'sync_pt':
+                if pid in open_waits:
+                    open_waits[pid][3].append((data.name, value_of(data)))
+            elif data.begin == 'begin':
+                open_waits[pid] = [event.task, data.name, event.timestamp, []]
+            else:
+                wait = open_waits.pop(pid, None)
+                if wait is None or wait[1] != data.name: # began before trace started.
+                    continue
+                closed_waits.append((wait, event.timestamp, data.status))
+
+        self._signals_by_timeline = dict(self._signals_by_timeline)
+        for (task, fence, start, points), end, status in closed_waits:
+            timeline = value = signal_time = None
+            for point_timeline, point_value in points:
+                if point_value is None:
+                    continue
+                point_signal_time = self._signal_time(point_timeline, point_value)
+                if point_signal_time is not None and \
+                        (signal_time is None or point_signal_time > signal_time):
+                    timeline, value = point_timeline, point_value
+                    signal_time = point_signal_time
+
+            fence_wait = FenceWait(task=task, fence=fence, points=tuple(points),
+                                   timeline=timeline, value=value,
+                                   signal_time=signal_time, status=status,
+                                   interval=Interval(start, end))
+            self._waits.append(fence_wait)
+            self._waits_by_pid.setdefault(task.pid, IntervalList()).append(fence_wait)
+            self._waits_by_fence.setdefault(fence, IntervalList()).append(fence_wait)
+            if timeline is not None:
+                self._waits_by_timeline.setdefault(timeline, IntervalList()).append(fence_wait)
+            self._max_duration = max(self._max_duration, fence_wait.interval.duration)
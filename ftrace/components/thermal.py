@@ -28,7 +28,7 @@ from collections import defaultdict, namedtuple
 from ftrace.interval import Interval, IntervalList
 from ftrace.event import EventList
 from ftrace.ftrace import register_api, FTraceComponent
-from ftrace.utils.decorators import requires
+from ftrace.utils.decorators import requires, memoize
 
 log = Logger('Thermal')
 
@@ -68,6 +68,20 @@ class Thermal(FTraceComponent):
         except AttributeError:
             return self._thermal_events_handler()[tsens].slice(interval=interval)
 
+    @requires('tsens_read', 'tsens_threshold_hit', 'tsens_threshold_clear')
+    @memoize
+    def temp_timeline(self, tsens, resolution=0.1, interval=None, as_numpy=False):
+        """
+        Returns array of time-weighted mean temp for specified `tsens` for
+        every `resolution` (in seconds) bucket of interval (if any).
+        Buckets before first `tsens_read` (unknown temp) are NaN.
+        """
+        return self.temp_intervals(tsens=tsens).resample(
+            interval=interval or self._trace.interval,
+            resolution=resolution,
+            value=lambda ti: ti.temp if ti.temp != -1.0 else None,
+            as_numpy=as_numpy)
+
     def _thermal_events_handler(self):
         """Handler function for thermal events"""
         self._thermal_intervals_by_tsens = defaultdict(IntervalList)
@@ -0,0 +1,237 @@
+#!/usr/bin/python
+
+# Copyright 2015 Huawei Devices USA Inc. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+#
+# Authors:
+#       Chuk Orakwue <chuk.orakwue@huawei.com>
+
+try:
+    from logbook import Logger
+except ImportError:
+    from logging import Logger
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import defaultdict, namedtuple
+from ftrace.ftrace import register_api, FTraceComponent
+from ftrace.task import TaskState
+from ftrace.common import ConstantBase, FtraceError, percentile
+from ftrace.utils.decorators import requires, memoize
+
+log = Logger('Workqueue')
+
+WORKQUEUE_TRACEPOINTS = ['workqueue_queue_work', 'workqueue_activate_work',
+                         'workqueue_execute_start', 'workqueue_execute_end']
+
+NaN = float('nan')
+
+# Executed work items in start order, stored column-wise. `function` is
+# index into function names, `cpu`/`pid` where (kworker) executed it.
+# Timestamps are NaN if not seen (e.g. queued before trace started).
+WorkItems = namedtuple('WorkItems', ['function', 'cpu', 'pid', 'queued',
+                                     'activated', 'start', 'end'])
+WorkLatencySummary = namedtuple('WorkLatencySummary', ['count', 'mean', 'median', 'p90', 'p99', 'max'])
+
+class WorkStage(ConstantBase):
+    QUEUE_TO_ACTIVATE = ()
+    ACTIVATE_TO_START = ()
+    QUEUE_TO_START = ()
+    EXECUTION = ()
+
+# (from, to) columns of WorkItems for each stage.
+_STAGE_COLUMNS = {
+    WorkStage.QUEUE_TO_ACTIVATE: ('queued', 'activated'),
+    WorkStage.ACTIVATE_TO_START: ('activated', 'start'),
+    WorkStage.QUEUE_TO_START: ('queued', 'start'),
+    WorkStage.EXECUTION: ('start', 'end'),
+}
+
+@register_api('workqueue')
+class Workqueue(FTraceComponent):
+    """
+    Class with APIs to process kernel workqueue events, such as:
+        - queue -> activate -> start -> end latencies per work function & cpu
+        - execution time distributions
+        - kworker cpu share
+
+    Work items are matched by work (struct) pointer in single streaming
+    pass over events, and kept as compact column arrays.
+    """
+    def __init__(self, trace):
+        self._trace = trace
+        self._events = trace.events
+        self._functions = []
+        self._function_ids = {}
+
+    def _initialize(self):
+        self._parse_workqueue_events()
+
+    @property
+    @requires(*WORKQUEUE_TRACEPOINTS)
+    def functions(self):
+        """Work functions seen"""
+        return list(self._functions)
+
+    @requires(*WORKQUEUE_TRACEPOINTS)
+    @memoize
+    def work_items(self, function=None, cpu=None, interval=None):
+        """
+        Returns `WorkItems` of arrays for work items of function (if any)
+        executed on cpu (if any) starting within interval (if any).
+        """
+        items = self._work_items
+        lo, hi = 0, len(items.start)
+        if interval is not None:
+            lo = bisect_left(items.start, interval.start)
+            hi = bisect_right(items.start, interval.end)
+        function_id = self._function_id(function)
+        if function is None and cpu is None:
+            indices = xrange(lo, hi)
+        else:
+            indices = [idx for idx in xrange(lo, hi)
+                       if (function is None or items.function[idx] == function_id) and
+                       (cpu is None or items.cpu[idx] == cpu)]
+        return WorkItems(*(array(column.typecode, (column[idx] for idx in indices))
+                           for column in items))
+
+    @requires(*WORKQUEUE_TRACEPOINTS)
+    @memoize
+    def work_latencies(self, stage=WorkStage.QUEUE_TO_START, by='function',
+                       interval=None):
+        """
+        Returns dict of {function: WorkLatencySummary} (by='function') or
+        {cpu: WorkLatencySummary} (by='cpu') of `WorkStage` latency (in
+        seconds) for work items starting within interval (if any).
+        Items missing either end of stage are skipped.
+        """
+        if by not in ('function', 'cpu'):
+            raise FtraceError(msg="Unsupported `by`: {}".format(by))
+
+        grouped = defaultdict(list)
+        items = self.work_items(interval=interval)
+        keys = [self._functions[idx] for idx in items.function] \
+            if by == 'function' else items.cpu
+        for key, latency in zip(keys, self._stage_latencies(items, stage)):
+            if latency == latency: # skip NaN
+                grouped[key].append(latency)
+
+        rv = {}
+        for key, values in grouped.iteritems():
+            values.sort()
+            rv[key] = WorkLatencySummary(count=len(values),
+                                         mean=sum(values) / len(values),
+                                         median=percentile(values, 0.5),
+                                         p90=percentile(values, 0.9),
+                                         p99=percentile(values, 0.99),
+                                         max=values[-1])
+        return rv
+
+    @requires(*WORKQUEUE_TRACEPOINTS)
+    @memoize
+    def execution_histogram(self, function=None, cpu=None,
+                            bin_edges=(0., 1e-5, 1e-4, 1e-3, 1e-2, 1e-1),
+                            interval=None):
+        """
+        Returns array of number of work items (of function/cpu, if any)
+        with execution time in each [bin_edges[i], bin_edges[i + 1]) bin
+        (last bin unbounded), for items starting within interval (if any).
+        """
+        counts = array('l', [0]) * len(bin_edges)
+        items = self.work_items(function=function, cpu=cpu, interval=interval)
+        for latency in self._stage_latencies(items, WorkStage.EXECUTION):
+            if latency == latency:
+                counts[max(bisect_right(bin_edges, latency) - 1, 0)] += 1
+        return counts
+
+    @requires('sched_switch', 'sched_wakeup')
+    @memoize
+    def kworker_cpu_share(self, interval=None):
+        """
+        Returns dict of {cpu: fraction of time kworker threads ran on cpu}
+        within interval (if any).
+        """
+        interval = interval or self._trace.interval
+        duration = interval.duration
+        running_time = defaultdict(float)
+        for ti in self._trace.cpu.task_index().prefixed('kworker'):
+            if ti.state is not TaskState.RUNNING:
+                continue
+            overlap = min(ti.interval.end, interval.end) - \
+                max(ti.interval.start, interval.start)
+            if overlap > 0:
+                running_time[ti.cpu] += overlap
+        return {cpu: running_time[cpu] / duration if duration else NaN
+                for cpu in self._trace.seen_cpus}
+
+    def _function_id(self, function):
+        return self._function_ids.get(function, -1) if function is not None else None
+
+    def _stage_latencies(self, items, stage):
+        """Returns generator of `stage` latency of each item (NaN if unknown)"""
+        try:
+            from_column, to_column = _STAGE_COLUMNS[stage]
+        except KeyError:
+            raise FtraceError(msg="Unsupported stage: {}".format(stage))
+        return (end - start for start, end in
+                zip(getattr(items, from_column), getattr(items, to_column)))
+
+    def _parse_workqueue_events(self):
+        """Match workqueue events by work (struct) pointer, in single pass"""
+        self._work_items = WorkItems(function=array('l'), cpu=array('h'),
+                                     pid=array('l'), queued=array('d'),
+                                     activated=array('d'), start=array('d'),
+                                     end=array('d'))
+        items = self._work_items
+        function_ids = self._function_ids
+        # work -> [queued, activated] timestamps, awaiting execution.
+        pending_by_work = {}
+        # work -> index of item executing.
+        running_by_work = {}
+
+        def workqueue_events_gen():
+            filter_func = lambda event: event.tracepoint in WORKQUEUE_TRACEPOINTS
+            for event in filter(filter_func, self._events):
+                yield event
+
+        for event in workqueue_events_gen():
+            tracepoint, data = event.tracepoint, event.data
+            work = data.work_struct
+            if tracepoint == 'workqueue_queue_work':
+                pending_by_work[work] = [event.timestamp, NaN]
+            elif tracepoint == 'workqueue_activate_work':
+                pending_by_work.setdefault(work, [NaN, NaN])[1] = event.timestamp
+            elif tracepoint == 'workqueue_execute_start':
+                try:
+                    function_id = function_ids[data.function]
+                except KeyError:
+                    function_id = function_ids[data.function] = len(self._functions)
+                    self._functions.append(data.function)
+                queued, activated = pending_by_work.pop(work, (NaN, NaN))
+                running_by_work[work] = len(items.start)
+                items.function.append(function_id)
+                items.cpu.append(event.cpu)
+                items.pid.append(event.task.pid)
+                items.queued.append(queued)
+                items.activated.append(activated)
+                items.start.append(event.timestamp)
+                items.end.append(NaN) # until executed
+            elif tracepoint == 'workqueue_execute_end':
+                idx = running_by_work.pop(work, None)
+                if idx is not None:
+                    items.end[idx] = event.timestamp
+
+        if running_by_work:
+            log.warn("{} work items still executing at end of trace".format(
+                len(running_by_work)))
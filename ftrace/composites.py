@@ -19,6 +19,8 @@
 #       Chuk Orakwue <chuk.orakwue@huawei.com>
 
 import heapq
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
 from .event import EventList
 from .interval import IntervalList
 from .common import FtraceError
@@ -38,4 +40,172 @@ def sorted_items(iterables):
     sorted_iterable = heapq.merge(*(_decorate_items(s) for s in iterables))
 
     for _, item in sorted_iterable:
-        yield item
\ No newline at end of file
+        yield item
+
+def sweep_intervals(streams, interval):
+    """
+    Single merged sweep over (sorted) IntervalLists, yielding
+    (duration, state) for every span within interval between changes,
+    where state is list (one entry per stream) of value of item covering
+    span, None if none. State list is reused, so copy it if kept.
+
+    Parameters:
+    -----------
+    streams : list
+        (IntervalList, value func) pairs. Value func returns value for
+        item, or None to skip it. Items within each IntervalList must not
+        overlap; ends sort before starts at same timestamp, so abutting
+        items never do.
+    """
+    def stream(idx, intervals, value_func):
+        for item in intervals:
+            value = value_func(item)
+            if value is None or item.interval.end <= item.interval.start:
+                continue
+            yield item.interval.start, 1, idx, value
+            yield item.interval.end, 0, idx, None
+
+    start, end = interval.start, interval.end
+    state = [None] * len(streams)
+    last_timestamp = start
+    for timestamp, _, idx, value in heapq.merge(*(stream(idx, intervals, value_func)
+            for idx, (intervals, value_func) in enumerate(streams))):
+        span_end = min(timestamp, end)
+        if span_end > last_timestamp:
+            yield span_end - last_timestamp, state
+            last_timestamp = span_end
+        if timestamp >= end:
+            break
+        state[idx] = value
+
+    if end > last_timestamp: # closure
+        yield end - last_timestamp, state
+
+class Cursor(object):
+    """
+    Cursor over (sorted) EventList/IntervalList answering "next item after
+    timestamp" lookups. Lookups bisect only ahead of last position when
+    timestamps are non-decreasing, as in a forward merge of streams.
+    """
+    def __init__(self, iterable):
+        decorated = list(_decorate_items(iterable))
+        self._timestamps = [ts for ts, _ in decorated]
+        self._items = [item for _, item in decorated]
+        self._pos = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    def _seek(self, timestamp):
+        """Returns index of first item after timestamp"""
+        lo = self._pos if self._pos == 0 or \
+            self._timestamps[self._pos - 1] <= timestamp else 0
+        self._pos = bisect_right(self._timestamps, timestamp, lo)
+        return self._pos
+
+    def next_after(self, timestamp):
+        """Returns first item with timestamp (start) after `timestamp`, None if none"""
+        idx = self._seek(timestamp)
+        return self._items[idx] if idx < len(self._items) else None
+
+    def between(self, start, end):
+        """Returns list of items with timestamp (start) in (start, end]"""
+        lo = self._seek(start)
+        return self._items[lo:bisect_right(self._timestamps, end, lo)]
+
+
+def _timestamps(iterable):
+    """Returns (sorted) timestamps/start times of EventList/IntervalList"""
+    if isinstance(iterable, EventList):
+        return iterable._timestamps
+    return iterable._start_times
+
+class TaskIndex(object):
+    """
+    Index of (sorted) EventList/IntervalList by task pid & name, so task
+    lookups (see `common.filter_by_task`) only touch matching subset and
+    bisect within it. Items are indexed by their `task` or `event.task`
+    (e.g. android contexts); items without task are skipped.
+
+    Names can also be matched by prefix or (compiled) regex against
+    dictionary of distinct names.
+    """
+    attrs = ('pid', 'name')
+
+    def __init__(self, iterable):
+        if not isinstance(iterable, (EventList, IntervalList)):
+            raise FtraceError(msg='Unsupported iterable: {}'.format(type(iterable)))
+        self._list_cls = type(iterable)
+        items_by_attr = dict((attr, defaultdict(list)) for attr in self.attrs)
+        for item in iterable:
+            task = getattr(item, 'task', None) or \
+                getattr(getattr(item, 'event', None), 'task', None)
+            if task is None:
+                continue
+            for attr in self.attrs:
+                items_by_attr[attr][getattr(task, attr)].append(item)
+        self._subsets = dict(
+            (attr, dict((value, self._list_cls(items))
+                        for value, items in items_by_value.iteritems()))
+            for attr, items_by_value in items_by_attr.iteritems())
+        self._names = sorted(self._subsets['name'])
+
+    @property
+    def pids(self):
+        return self._subsets['pid'].keys()
+
+    @property
+    def names(self):
+        return self._names
+
+    def matching_names(self, pattern=None, prefix=None):
+        """Returns names matching (compiled) regex pattern and/or prefix"""
+        names = self._names
+        if prefix:
+            idx = bisect_left(names, prefix)
+            end_idx = idx
+            while end_idx < len(names) and names[end_idx].startswith(prefix):
+                end_idx += 1
+            names = names[idx:end_idx]
+        if pattern is not None:
+            names = [name for name in names if pattern.match(name)]
+        return names
+
+    def subset(self, attr, value):
+        """
+        Returns EventList/IntervalList of items whose task `attr` ('pid' or
+        'name') has `value`. Names may also be compiled regex.
+        """
+        subsets = self._subsets[attr]
+        if attr == 'name' and hasattr(value, 'match'):
+            return self.prefixed(None, pattern=value)
+        return subsets.get(value) or self._list_cls()
+
+    def prefixed(self, prefix, pattern=None):
+        """Returns items whose task name starts with prefix (and matches pattern)"""
+        subsets = [self._subsets['name'][name] for name in
+                   self.matching_names(pattern=pattern, prefix=prefix)]
+        if len(subsets) == 1:
+            return subsets[0]
+        return self._list_cls(sorted_items(subsets))
+
+    def lookup(self, attr, value, how='first', interval=None):
+        """
+        Returns first/last item (None if none), or iterator for 'any'/'all',
+        of items whose task `attr` has `value` within interval (if any).
+        """
+        items = self.subset(attr, value)
+        lo, hi = 0, len(items)
+        if interval is not None:
+            timestamps = _timestamps(items)
+            lo = bisect_left(timestamps, interval.start)
+            hi = bisect_right(timestamps, interval.end)
+        if how in ('any', 'all'):
+            return iter(items[lo:hi])
+        elif lo >= hi:
+            return None
+        elif how == 'first':
+            return items[lo]
+        elif how == 'last':
+            return items[hi - 1]
+        return None
@@ -21,8 +21,20 @@
 """ Interval:  Represents an interval of time defined by two timestamps.
     IntervalList: List with objects with interval, sorted/sliceable by interval.
 """
-from bisect import bisect, insort
-from .common import memoize
+import math
+from array import array
+from bisect import bisect, bisect_left, insort
+from collections import namedtuple
+from .common import memoize, FtraceError
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Per-bucket time covered by objects, time-integral of their value &
+# max value (NaN if not covered), see `IntervalList.bucket_stats`.
+BucketStats = namedtuple('BucketStats', ['covered', 'weighted', 'max'])
 
 class Interval(object):
     """
@@ -69,6 +81,7 @@ class IntervalList(list):
         self._intervals = []
         self._start_timestamps = []
         self._end_timestamps = []
+        self._max_duration = 0.0
         if iterable:
             for item in iterable:
                 if hasattr(item, 'interval'):
@@ -99,6 +112,7 @@ class IntervalList(list):
         insort(self._end_timestamps, end)
         self._start_timestamps.insert(idx, start) # insert into self based on start
         self._intervals.insert(idx, obj.interval)
+        self._max_duration = max(self._max_duration, end - start)
         return idx
 
     def append(self, obj):
@@ -109,6 +123,126 @@ class IntervalList(list):
             raise TypeError("Must have interval attribute")
         super(self.__class__, self).insert(self.__add_interval(obj), obj)
 
+    def overlap_durations(self, intervals):
+        """
+        Returns array with total time objects in list overlap each of
+        specified intervals (i.e. sum of their trimmed durations), in order.
+
+        All intervals are answered in a single merge sweep over (sorted)
+        start/end timestamps, so cost is O(n + m log m) for m intervals,
+        rather than a slice per interval.
+        """
+        # also accept list of objects with intervals e.g. frames.
+        intervals = [getattr(interval, 'interval', interval) for interval in intervals]
+        points = sorted(set(ts for interval in intervals
+                            for ts in (interval.start, interval.end)))
+        cumulative = dict(zip(points, self._cumulative_durations(points)))
+        return array('d', (cumulative[interval.end] - cumulative[interval.start]
+                           for interval in intervals))
+
+    def resample(self, interval, resolution, value=None, as_numpy=False):
+        """
+        Returns array with one (time-weighted) value per `resolution` seconds
+        bucket of interval, computed in a single sweep. Bucket `idx` covers
+        [interval.start + idx * resolution, interval.start + (idx + 1) * resolution).
+
+        Parameters:
+        -----------
+        value : function (optional)
+            Function of object returning its value e.g. frequency. If
+            specified, returns time-weighted mean value over part of
+            bucket covered by objects (NaN if not covered) - objects whose value
+            is None are ignored. Otherwise, returns fraction of bucket
+            covered by objects e.g. utilization.
+        as_numpy : bool, default False
+            Return numpy array (requires numpy).
+        """
+        if as_numpy and np is None:
+            raise FtraceError(msg='numpy is required for `as_numpy`')
+
+        start, end = interval.start, interval.end
+        covered, weighted, _ = self.bucket_stats(interval, resolution, value=value)
+        num_buckets = len(covered)
+
+        if value is None:
+            bucket_durations = [min(resolution, end - start - idx * resolution)
+                                for idx in xrange(num_buckets)]
+            rv = [covered_time / duration if duration > 0 else float('nan')
+                  for covered_time, duration in zip(covered, bucket_durations)]
+        else:
+            rv = [weighted_value / covered_time if covered_time else float('nan')
+                  for weighted_value, covered_time in zip(weighted, covered)]
+
+        return np.array(rv) if as_numpy else array('d', rv)
+
+    def bucket_stats(self, interval, resolution, value=None):
+        """
+        Returns `BucketStats` of arrays with time covered by objects,
+        time-integral of their value and max value for every `resolution`
+        seconds bucket of interval, splitting each object across buckets
+        it spans in a single sweep.
+
+        Only objects overlapping interval are visited: objects may overlap,
+        so scan starts at those starting up to longest object duration
+        before interval.
+
+        Parameters:
+        -----------
+        value : function (optional)
+            Function of object returning its value, or None to skip it.
+            Every object has value 1.0 if not specified.
+        """
+        start, end = interval.start, interval.end
+        num_buckets = max(int(math.ceil((end - start) / resolution)), 1)
+        covered = array('d', [0.0]) * num_buckets
+        weighted = array('d', [0.0]) * num_buckets
+        maxs = array('d', [float('nan')]) * num_buckets
+
+        starts = self._start_timestamps
+        lo = bisect_left(starts, start - self._max_duration)
+        hi = bisect_left(starts, end)
+        for idx in xrange(lo, hi):
+            item = self[idx]
+            if item.interval.end <= start:
+                continue
+            item_value = value(item) if value else 1.0
+            if item_value is None:
+                continue
+            ts, item_end = max(item.interval.start, start), min(item.interval.end, end)
+            bucket = min(int((ts - start) / resolution), num_buckets - 1)
+            # split interval across the buckets it spans.
+            while ts < item_end and bucket < num_buckets:
+                bucket_end = min(start + (bucket + 1) * resolution, item_end)
+                covered[bucket] += bucket_end - ts
+                weighted[bucket] += item_value * (bucket_end - ts)
+                if not maxs[bucket] >= item_value:
+                    maxs[bucket] = item_value
+                ts = bucket_end
+                bucket += 1
+
+        return BucketStats(covered=covered, weighted=weighted, max=maxs)
+
+    def _cumulative_durations(self, points):
+        """
+        Yields total duration of objects before each of (sorted) points.
+
+            sum(min(end, point) - start) for start < point
+          = point * #(start < point) - sum(start < point)
+            - point * #(end < point) + sum(end < point)
+        """
+        starts, ends = self._start_timestamps, self._end_timestamps
+        num_items = len(starts)
+        idx_start = idx_end = 0
+        sum_starts = sum_ends = 0.0
+        for point in points:
+            while idx_start < num_items and starts[idx_start] < point:
+                sum_starts += starts[idx_start]
+                idx_start += 1
+            while idx_end < num_items and ends[idx_end] < point:
+                sum_ends += ends[idx_end]
+                idx_end += 1
+            yield point * (idx_start - idx_end) - sum_starts + sum_ends
+
     def slice(self, interval, trimmed=True):
         """
         Returns list of objects whose interval fall
@@ -32,24 +32,24 @@ __all__ = [TRACEPOINT]
 IRQHandlerExitBase = namedtuple(TRACEPOINT,
     [
     'irq',
-    'name',
+    'ret',
     ]
 )
 
 class IRQHandlerExit(IRQHandlerExitBase):
     __slots__ = ()
-    def __new__(cls, irq, name):
+    def __new__(cls, irq, ret):
             irq = int(irq)
             return super(cls, IRQHandlerExit).__new__(
                 cls,
                 irq=irq,
-                name=name,
+                ret=ret,
             )
 
 irq_handler_exit_pattern = re.compile(
         r"""
         irq=(?P<irq>\d+)\s+
-        name=(?P<name>.+)
+        ret=(?P<ret>.+)
         """,
         re.X|re.M
 )
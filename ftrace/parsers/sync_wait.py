@@ -43,8 +43,8 @@ class SyncWait(SyncWaitBase):
             status = int(status)
             return super(cls, SyncWait).__new__(
                 cls,
-                state=state,
                 name=name,
+                status=status,
                 begin=begin,
             )
 
@@ -52,7 +52,7 @@ sync_wait_pattern = re.compile(
         r"""
         (?P<begin>\w+)\s+
         name=(?P<name>.+)\s+
-        status=(?P<status>\d+)
+        (?:state|status)=(?P<status>-?\d+)
         """,
         re.X|re.M
 )
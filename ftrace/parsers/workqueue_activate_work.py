@@ -46,7 +46,7 @@ class WorkqueueQueueActivateWork(WorkqueueQueueActivateWorkBase):
 
 workqueue_activate_work_pattern = re.compile(
         r"""
-        work struct (?P<work_struct>.+)
+        work\ struct\ (?P<work_struct>[^\s:]+)
         """,
         re.X|re.M
 )
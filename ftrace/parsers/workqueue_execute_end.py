@@ -46,7 +46,7 @@ class WorkqueueQueueExecuteEnd(WorkqueueQueueExecuteEndBase):
 
 workqueue_execute_end_pattern = re.compile(
         r"""
-        work struct (?P<work_struct>.+)
+        work\ struct\ (?P<work_struct>[^\s:]+)
         """,
         re.X|re.M
 )
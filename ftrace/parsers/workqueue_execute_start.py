@@ -48,8 +48,8 @@ class WorkqueueQueueExecuteStart(WorkqueueQueueExecuteStartBase):
 
 workqueue_execute_start_pattern = re.compile(
         r"""
-        work struct (?P<work_struct>.+):\s+
-        function (?P<function>.+)
+        work\ struct\ (?P<work_struct>[^\s:]+):\s+
+        function\ (?P<function>\S+)
         """,
         re.X|re.M
 )
@@ -56,9 +56,9 @@ class WorkqueueQueueWork(WorkqueueQueueWorkBase):
 
 workqueue_queue_work_pattern = re.compile(
         r"""
-        work struct=(?P<work_struct>.+)\s+
-        function=(?P<function>.+)\s+
-        workqueue=(?P<workqueue>.+)\s+
+        work\ struct=(?P<work_struct>\S+)\s+
+        function=(?P<function>\S+)\s+
+        workqueue=(?P<workqueue>\S+)\s+
         req_cpu=(?P<req_cpu>\d+)\s+
         cpu=(?P<cpu>\d+)
         """,
@@ -0,0 +1,213 @@
+#!/usr/bin/python
+
+# Copyright 2015 Huawei Devices USA Inc. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+#
+# Authors:
+#       Chuk Orakwue <chuk.orakwue@huawei.com>
+
+"""
+    SummaryPyramid: Multi-resolution per-bucket aggregates of IntervalList
+"""
+import math
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+from .common import FtraceError
+
+__all__ = ['SummaryPyramid', 'RangeStats']
+
+NaN = float('nan')
+
+# Statistics over a range: time covered (in seconds), time-weighted mean,
+# min & max value. For plain (valueless) intervals, mean is 1.0 when covered.
+RangeStats = namedtuple('RangeStats', ['time', 'mean', 'min', 'max'])
+
+
+class SummaryPyramid(object):
+    """
+    Multi-resolution pyramid of per-bucket aggregates (time covered,
+    time-integral of value, min & max) over fixed-width buckets.
+
+    Level 0 has `resolution` wide buckets (e.g. 1ms), each following level
+    is `factor` times coarser (e.g. 10ms, 100ms, 1s). Range statistics
+    combine whole buckets from the coarsest level that fits and trim only
+    the partial buckets at edges, exactly, against (compact copy of) the
+    underlying intervals. Cost is O(factor * levels + log n) per range,
+    plus number of intervals within the two edge buckets.
+    """
+    def __init__(self, start, resolution, factor, levels, items):
+        self.start = start
+        self.resolution = resolution
+        self.factor = factor
+        # list of (time, integral, min, max) arrays, finest first.
+        self.levels = levels
+        # (start, end, value) arrays of (clipped, non-overlapping) intervals.
+        self.items = items
+
+    def __repr__(self):
+        return "SummaryPyramid(start={}, resolution={}, factor={}, levels={})".format(
+            self.start, self.resolution, self.factor, len(self.levels))
+
+    @property
+    def num_buckets(self):
+        return len(self.levels[0][0])
+
+    @classmethod
+    def from_intervals(cls, intervals, interval, resolution=0.001, factor=10,
+                       num_levels=4, value=None):
+        """
+        Build pyramid from IntervalList (of non-overlapping intervals)
+        over specified interval in a single pass.
+
+        Parameters:
+        -----------
+        value : callable (optional)
+            Returns value for item in list, or None to skip it.
+            If None, every item has value 1.0 (i.e. coverage).
+        """
+        if resolution <= 0 or factor < 2 or num_levels < 1:
+            raise FtraceError(msg="Invalid pyramid resolution/factor/levels")
+        start = interval.start
+        num_buckets = max(int(math.ceil((interval.end - start) / resolution)), 1)
+        times, integrals = array('d', [0.0]) * num_buckets, array('d', [0.0]) * num_buckets
+        mins, maxs = array('d', [NaN]) * num_buckets, array('d', [NaN]) * num_buckets
+        items = (array('d'), array('d'), array('d'))
+
+        for item in intervals:
+            item_start = max(item.interval.start, start)
+            item_end = min(item.interval.end, interval.end)
+            if item_end <= item_start:
+                continue
+            item_value = 1.0 if value is None else value(item)
+            if item_value is None:
+                continue
+            items[0].append(item_start)
+            items[1].append(item_end)
+            items[2].append(item_value)
+            idx = int((item_start - start) / resolution)
+            last_idx = min(int((item_end - start) / resolution), num_buckets - 1)
+            while idx <= last_idx:
+                bucket_start = start + idx * resolution
+                overlap = min(item_end, bucket_start + resolution) - \
+                    max(item_start, bucket_start)
+                if overlap > 0:
+                    times[idx] += overlap
+                    integrals[idx] += item_value * overlap
+                    if not mins[idx] <= item_value:
+                        mins[idx] = item_value
+                    if not maxs[idx] >= item_value:
+                        maxs[idx] = item_value
+                idx += 1
+
+        levels = [(times, integrals, mins, maxs)]
+        for _ in xrange(num_levels - 1):
+            levels.append(cls._coarsen(levels[-1], factor))
+        return cls(start=start, resolution=resolution, factor=factor,
+                   levels=levels, items=items)
+
+    @staticmethod
+    def _coarsen(level, factor):
+        """Aggregate every `factor` buckets of level into one"""
+        times, integrals, mins, maxs = level
+        num_buckets = (len(times) + factor - 1) // factor
+        rv = (array('d'), array('d'), array('d'), array('d'))
+        for idx in xrange(num_buckets):
+            lo, hi = idx * factor, (idx + 1) * factor
+            rv[0].append(sum(times[lo:hi]))
+            rv[1].append(sum(integrals[lo:hi]))
+            _mins = [v for v in mins[lo:hi] if v == v]
+            _maxs = [v for v in maxs[lo:hi] if v == v]
+            rv[2].append(min(_mins) if _mins else NaN)
+            rv[3].append(max(_maxs) if _maxs else NaN)
+        return rv
+
+    def range_stats(self, interval):
+        """
+        Returns RangeStats for specified interval (clipped to pyramid).
+        """
+        num_buckets = self.num_buckets
+        lo = min(max((interval.start - self.start) / self.resolution, 0.0), num_buckets)
+        hi = min(max((interval.end - self.start) / self.resolution, 0.0), num_buckets)
+        acc = [0.0, 0.0, NaN, NaN]
+        if hi <= lo:
+            return RangeStats(time=0.0, mean=NaN, min=NaN, max=NaN)
+
+        start = self.start + lo * self.resolution
+        end = self.start + hi * self.resolution
+        whole_lo, whole_hi = int(math.ceil(lo)), int(hi)
+        if whole_lo >= whole_hi: # within single bucket
+            self._accumulate_items(acc, start, end)
+        else:
+            self._accumulate_items(acc, start, self.start + whole_lo * self.resolution)
+            self._accumulate_range(acc, whole_lo, whole_hi)
+            self._accumulate_items(acc, self.start + whole_hi * self.resolution, end)
+
+        time, integral, _min, _max = acc
+        return RangeStats(time=time, mean=integral / time if time else NaN,
+                          min=_min, max=_max)
+
+    def range_stats_many(self, intervals):
+        """Returns list of RangeStats for each of specified intervals"""
+        return [self.range_stats(getattr(interval, 'interval', interval))
+                for interval in intervals]
+
+    def _accumulate_range(self, acc, lo, hi):
+        """Accumulate whole level-0 buckets [lo, hi) using coarsest levels"""
+        factor, level = self.factor, 0
+        num_levels = len(self.levels)
+        while lo < hi:
+            if level == num_levels - 1:
+                for idx in xrange(lo, hi):
+                    self._accumulate(acc, level, idx)
+                break
+            while lo < hi and lo % factor:
+                self._accumulate(acc, level, lo)
+                lo += 1
+            while lo < hi and hi % factor:
+                hi -= 1
+                self._accumulate(acc, level, hi)
+            lo, hi, level = lo // factor, hi // factor, level + 1
+
+    def _accumulate_items(self, acc, start, end):
+        """Accumulate intervals trimmed to [start, end), for edge buckets"""
+        if end <= start:
+            return
+        starts, ends, values = self.items
+        # non-overlapping, so ends are sorted too.
+        idx = bisect_right(ends, start)
+        last_idx = bisect_left(starts, end)
+        while idx < last_idx:
+            overlap = min(ends[idx], end) - max(starts[idx], start)
+            if overlap > 0:
+                value = values[idx]
+                acc[0] += overlap
+                acc[1] += value * overlap
+                if not acc[2] <= value:
+                    acc[2] = value
+                if not acc[3] >= value:
+                    acc[3] = value
+            idx += 1
+
+    def _accumulate(self, acc, level, idx):
+        times, integrals, mins, maxs = self.levels[level]
+        if idx >= len(times) or not times[idx]:
+            return
+        acc[0] += times[idx]
+        acc[1] += integrals[idx]
+        if not acc[2] <= mins[idx]:
+            acc[2] = mins[idx]
+        if not acc[3] >= maxs[idx]:
+            acc[3] = maxs[idx]
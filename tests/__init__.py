@@ -0,0 +1,43 @@
+#!/usr/bin/python
+
+# Copyright 2015 Huawei Devices USA Inc. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+#
+# Authors:
+#       Chuk Orakwue <chuk.orakwue@huawei.com>
+
+import os
+import tempfile
+from ftrace import Ftrace
+
+HEADER = """# tracer: nop
+#
+# entries-in-buffer/entries-written: {0}/{0}   #P:1
+#
+#           TASK-PID    CPU#  ||||    TIMESTAMP  FUNCTION
+#              | |       |   ||||       |         |
+"""
+
+
+def load_trace(lines):
+    """Returns Ftrace parsed from (temporary) file with trace lines"""
+    fd, filepath = tempfile.mkstemp(suffix='.txt')
+    with os.fdopen(fd, 'w') as f:
+        f.write(HEADER.format(len(lines.splitlines())))
+        f.write(lines)
+    try:
+        return Ftrace(filepath)
+    finally:
+        os.remove(filepath)
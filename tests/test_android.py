@@ -0,0 +1,246 @@
+#!/usr/bin/python
+
+# Copyright 2015 Huawei Devices USA Inc. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+#
+# Authors:
+#       Chuk Orakwue <chuk.orakwue@huawei.com>
+
+import unittest
+from ftrace.interval import Interval
+from ftrace.components.android import _NameIndex
+from tests import load_trace
+
+ATRACE = '{comm:>16}-{pid:<5} [000] ...1 {ts:12.6f}: tracing_mark_write: {msg}\n'
+SWITCH = ('{comm:>16}-{pid:<5} [003] d..3 {ts:12.6f}: sched_switch: prev_comm={comm} '
+          'prev_pid={pid} prev_prio=120 prev_state={state} ==> next_comm={next_comm} '
+          'next_pid={next_pid} next_prio=120\n')
+
+
+def atrace(*marks):
+    """Returns trace lines of (timestamp, pid, message) atrace marks"""
+    return ''.join(ATRACE.format(comm='app', pid=pid, ts=ts, msg=msg)
+                   for ts, pid, msg in marks)
+
+
+def run(comm, pid, start, end):
+    """Returns trace lines of task running on cpu 3 over [start, end)"""
+    return (SWITCH.format(comm='swapper/3', pid=0, ts=start, state='R',
+                          next_comm=comm, next_pid=pid) +
+            SWITCH.format(comm=comm, pid=pid, ts=end, state='S',
+                          next_comm='swapper/3', next_pid=0))
+
+
+def input_trace(*timestamps):
+    """
+    Returns trace lines of touch inputs at timestamps: touch IRQ, InputReader,
+    app (pid 400) input queue & deliverInputEvent, then SF doComposition
+    [5ms, 6ms) after touch.
+    """
+    lines = []
+    for ts in timestamps:
+        lines.append((ts, run('irq/13-fts_touc', 90, ts, ts + 0.0003)))
+        lines.append((ts + 0.0005, run('InputReader', 250, ts + 0.0005, ts + 0.001)))
+        lines.append((ts + 0.0012, atrace((ts + 0.0012, 400, 'C|400|aq:pending:app|1'),
+                                          (ts + 0.0013, 400, 'B|400|deliverInputEvent'),
+                                          (ts + 0.0019, 400, 'E'),
+                                          (ts + 0.002, 400, 'C|400|aq:pending:app|0'),
+                                          (ts + 0.005, 300, 'B|300|doComposition'),
+                                          (ts + 0.006, 300, 'E'))))
+    return ''.join(line for _, line in sorted(lines))
+
+
+def launch_trace(*launches):
+    """
+    Returns trace lines of app launches, each of (pid, timestamp, draws,
+    setTransactionState & wmUpdateFocus timestamps): app runs at timestamp,
+    binds application 10ms after, then draws (performTraversals) at draws.
+    """
+    lines = [(1.0, run('surfaceflinger', 300, 1.0, 1.001))]
+    for pid, ts, draws, sts, wmuf in launches:
+        lines.append((ts, run('app', pid, ts, ts + 0.002)))
+        marks = [(ts + 0.01, pid, 'B|{}|bindApplication'.format(pid)),
+                 (ts + 0.03, pid, 'E')]
+        for draw in draws:
+            marks.extend([(draw, pid, 'B|{}|performTraversals'.format(pid)),
+                          (draw + 0.004, pid, 'E')])
+        for sts_ts in sts:
+            marks.extend([(sts_ts, 300, 'B|300|setTransactionState'),
+                          (sts_ts + 0.0004, 300, 'E')])
+        for wmuf_ts in wmuf:
+            marks.extend([(wmuf_ts, 200, 'B|200|wmUpdateFocus'), (wmuf_ts + 0.0002, 200, 'E')])
+        lines.extend((mark[0], atrace(mark)) for mark in marks)
+    return ''.join(line for _, line in sorted(lines))
+
+
+class TestSliceTree(unittest.TestCase):
+
+    def test_zero_length_child_before_interval(self):
+        trace = load_trace(atrace((1.0, 400, 'B|400|root'),
+                                  (1.1, 400, 'B|400|zero'),
+                                  (1.1, 400, 'E'),
+                                  (2.0, 400, 'E')))
+        roots = trace.android.slice_tree(400, interval=Interval(0.5, 0.9))
+        self.assertEqual(len(roots), 1)
+        self.assertEqual(roots[0].name, 'root')
+        self.assertEqual(roots[0].children, [])
+        self.assertAlmostEqual(roots[0].self_time, 0.4)
+
+    def test_zero_length_child_within_interval(self):
+        trace = load_trace(atrace((1.0, 400, 'B|400|root'),
+                                  (1.1, 400, 'B|400|zero'),
+                                  (1.1, 400, 'E'),
+                                  (2.0, 400, 'E')))
+        roots = trace.android.slice_tree(400, interval=Interval(0.05, 0.9))
+        self.assertEqual([child.name for child in roots[0].children], ['zero'])
+        self.assertAlmostEqual(roots[0].self_time, 0.85)
+
+
+class TestAsyncSlices(unittest.TestCase):
+
+    def test_long_span_started_before_interval(self):
+        # long launch (cookie 1) starts well before window, short ones don't overlap it.
+        trace = load_trace(atrace((1.0, 10, 'S|10|launch|1'),
+                                  (1.1, 10, 'S|10|launch|2'),
+                                  (1.2, 10, 'F|10|launch|2'),
+                                  (1.3, 10, 'S|10|launch|3'),
+                                  (1.4, 10, 'F|10|launch|3'),
+                                  (2.0, 10, 'F|10|launch|1')))
+        spans = trace.android.async_slices(name='launch', interval=Interval(0.25, 0.35))
+        self.assertEqual([(span.cookie, span.lane) for span in spans], [(1, 0), (3, 1)])
+        self.assertAlmostEqual(spans[0].interval.duration, 0.1)
+        self.assertAlmostEqual(spans[1].interval.duration, 0.05)
+        self.assertEqual(len(trace.android.async_slices(interval=Interval(1.5, 2.0))), 0)
+
+
+class TestFramerateWindows(unittest.TestCase):
+
+    def setUp(self):
+        # VSYNC-sf toggles every 20ms from 0, SF posts 2ms after each VSYNC
+        # but the one at 0.12.
+        marks = []
+        for idx in xrange(13):
+            ts = 1.0 + idx * 0.02
+            marks.append((ts, 300, 'C|300|VSYNC-sf|{}'.format(idx % 2)))
+            if idx != 6:
+                marks.extend([(ts + 0.002, 300, 'B|300|postFramebuffer'),
+                              (ts + 0.003, 300, 'E')])
+        self.trace = load_trace(atrace(*marks))
+
+    def test_vsync_counted_in_window_it_starts_in(self):
+        rates = self.trace.android.framerate_windows(window=0.1, interval=Interval(0.05, 0.19))
+        self.assertEqual([round(ts, 6) for ts in rates.start], [0.05, 0.15])
+        # VSYNCs at 0.06 .. 0.14 (no post at 0.12), then 0.16 & 0.18 (whole).
+        self.assertEqual(list(rates.frames), [4, 2])
+        self.assertEqual([round(t, 6) for t in rates.present_time], [0.1, 0.04])
+        self.assertEqual(list(rates.fps), [40.0, 50.0])
+
+    def test_window_without_vsync(self):
+        rates = self.trace.android.framerate_windows(window=0.1, interval=Interval(0.065, 0.075))
+        self.assertEqual(list(rates.frames), [0])
+        self.assertNotEqual(rates.fps[0], rates.fps[0])
+
+
+class TestInputLatencies(unittest.TestCase):
+
+    def setUp(self):
+        trace = load_trace(atrace((1.0, 300, 'C|300|VSYNC-sf|0')) +
+                           input_trace(1.1, 1.2))
+        self.android = trace.android
+        self.latencies = trace.android.input_latencies('irq/13-fts_touc')
+
+    def test_all_latencies(self):
+        self.assertEqual(len(self.latencies), 2)
+        self.assertAlmostEqual(self.latencies[1].interval.start, 0.2)
+        self.assertAlmostEqual(self.latencies[1].latency, 0.006)
+
+    def test_latency_starting_within_interval(self):
+        first, second = self.latencies
+        rv = self.android.input_latencies('irq/13-fts_touc', interval=Interval(0.15, 0.3))
+        self.assertEqual(list(rv), [second])
+        # latency starting at interval start is included, untrimmed.
+        rv = self.android.input_latencies('irq/13-fts_touc', interval=Interval(
+            first.interval.start, 0.15))
+        self.assertEqual(list(rv), [first])
+
+    def test_interval_without_latency_start(self):
+        # within first latency, but none starts there.
+        rv = self.android.input_latencies('irq/13-fts_touc', interval=Interval(0.103, 0.15))
+        self.assertEqual(len(rv), 0)
+
+
+class TestAppLaunchLatencies(unittest.TestCase):
+
+    def _latencies(self, *launches):
+        trace = load_trace(launch_trace(*launches))
+        return [(latency.task.pid, round(latency.interval.start, 6),
+                 round(latency.interval.end, 6))
+                for latency in trace.android.app_launch_latencies()]
+
+    def test_launch_ends_at_draw_after_last_transaction(self):
+        # launch starts when app is first seen on CPU (0.05), and is bounded
+        # by next launch (0.3), not trace end.
+        latencies = self._latencies((500, 1.05, [1.10, 1.12, 1.14], [1.108, 1.128], []),
+                                    (501, 1.3, [1.35, 1.37], [1.358], []))
+        self.assertEqual(latencies, [(500, 0.05, 0.14), (501, 0.3, 0.37)])
+
+    def test_focus_switch_ignored(self):
+        latencies = self._latencies((500, 1.05, [1.10, 1.12, 1.14], [1.108, 1.128], [1.129]))
+        self.assertEqual(latencies, [(500, 0.05, 0.12)])
+
+    def test_transaction_at_draw_start(self):
+        # windows between draws are (start, end], so transaction counts
+        # toward draw before it.
+        latencies = self._latencies((500, 1.05, [1.10, 1.12, 1.14], [1.12], []))
+        self.assertEqual(latencies, [(500, 0.05, 0.12)])
+
+
+class TestFramePipeline(unittest.TestCase):
+
+    def test_frames_of_task_within_interval(self):
+        trace = load_trace(atrace((1.0, 300, 'C|300|VSYNC-sf|1'),
+                                  (1.001, 400, 'B|400|Choreographer#doFrame'),
+                                  (1.002, 500, 'B|500|Choreographer#doFrame'),
+                                  (1.004, 500, 'E'),
+                                  (1.005, 400, 'E'),
+                                  (1.0167, 300, 'C|300|VSYNC-sf|0'),
+                                  (1.018, 400, 'B|400|Choreographer#doFrame'),
+                                  (1.020, 400, 'E'),
+                                  (1.0334, 300, 'C|300|VSYNC-sf|1'),
+                                  (1.035, 400, 'B|400|Choreographer#doFrame'),
+                                  (1.037, 400, 'E')))
+        self.assertEqual(len(trace.android.frame_pipeline().ui_start), 4)
+        pipeline = trace.android.frame_pipeline(task=400, interval=Interval(0.0005, 0.02))
+        self.assertEqual(list(pipeline.pid), [400, 400])
+        self.assertEqual([round(ts, 6) for ts in pipeline.ui_start], [0.001, 0.018])
+        self.assertEqual([round(ts, 6) for ts in pipeline.vsync], [0.0, 0.0167])
+
+
+class TestNameIndex(unittest.TestCase):
+
+    def test_containing_and_prefixed(self):
+        names = ['Choreographer#doFrame', 'DrawFrame', 'queueBuffer', 'dequeueBuffer', 'draw']
+        index = _NameIndex(names)
+        self.assertEqual(index.containing('Frame'),
+                         frozenset(['Choreographer#doFrame', 'DrawFrame']))
+        self.assertEqual(index.containing('ueueB'), frozenset(['queueBuffer', 'dequeueBuffer']))
+        self.assertEqual(index.containing('raw'), frozenset(['DrawFrame', 'draw']))
+        self.assertEqual(index.containing('Frames'), frozenset())
+        self.assertEqual(index.containing(''), frozenset(names))
+        self.assertEqual(index.prefixed('d'), frozenset(['dequeueBuffer', 'draw']))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+#!/usr/bin/python
+
+# Copyright 2015 Huawei Devices USA Inc. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+#
+# Authors:
+#       Chuk Orakwue <chuk.orakwue@huawei.com>
+
+
+import unittest
+from tests import load_trace
+
+SWITCH = ('{comm:>16}-{pid:<5} [000] d..3 {ts:12.6f}: sched_switch: prev_comm={comm} '
+          'prev_pid={pid} prev_prio=120 prev_state={state} ==> next_comm={next_comm} '
+          'next_pid={next_pid} next_prio=120\n')
+WAKEUP = ('{comm:>16}-{pid:<5} [000] d..3 {ts:12.6f}: sched_wakeup: comm=OSLcbk '
+          'pid=700 prio=120 success=1 target_cpu=000\n')
+
+
+def osl_callbacks(num_callbacks, period=0.01, preempted=()):
+    """
+    Returns trace lines with OSLcbk (pid 700) woken every `period`, running
+    for 3ms - preempted by foo (pid 100) for 1ms in callbacks `preempted`.
+    """
+    lines = []
+    for idx in xrange(num_callbacks):
+        ts = 1.0 + idx * period
+        lines.append(WAKEUP.format(comm='<idle>', pid=0, ts=ts))
+        lines.append(SWITCH.format(comm='swapper/0', pid=0, ts=ts + 0.0001, state='R',
+                                   next_comm='OSLcbk', next_pid=700))
+        if idx in preempted:
+            lines.append(SWITCH.format(comm='OSLcbk', pid=700, ts=ts + 0.001, state='R',
+                                       next_comm='foo', next_pid=100))
+            lines.append(SWITCH.format(comm='foo', pid=100, ts=ts + 0.002, state='S',
+                                       next_comm='OSLcbk', next_pid=700))
+        lines.append(SWITCH.format(comm='OSLcbk', pid=700, ts=ts + 0.003, state='S',
+                                   next_comm='swapper/0', next_pid=0))
+    return ''.join(lines)
+
+
+class TestAudioCallbacks(unittest.TestCase):
+
+    def test_preempted_callback_is_single_callback(self):
+        trace = load_trace(osl_callbacks(20, preempted=(5, 12)))
+        callbacks = trace.audio.callbacks()
+        self.assertEqual(len(callbacks.timestamp), 19)
+        self.assertEqual(trace.audio.buffer_size_seconds, 0.01)
+        for period, jitter in zip(callbacks.period, callbacks.jitter):
+            self.assertAlmostEqual(period, 0.01)
+            self.assertAlmostEqual(jitter, 0.0)
+
+    def test_jitter_intervals_accepts_buffer_size_frames(self):
+        trace = load_trace(osl_callbacks(5))
+        jitters = trace.audio.jitter_intervals(buffer_size_frames=240)
+        self.assertEqual(len(jitters), 4)
+        for jitter in jitters:
+            self.assertAlmostEqual(jitter.interval.duration, 0.01)
+            self.assertAlmostEqual(jitter.latency, 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
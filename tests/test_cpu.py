@@ -0,0 +1,135 @@
+#!/usr/bin/python
+
+# Copyright 2015 Huawei Devices USA Inc. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+#
+# Authors:
+#       Chuk Orakwue <chuk.orakwue@huawei.com>
+
+import unittest
+from ftrace.interval import Interval
+from ftrace.task import TaskState
+from tests import load_trace
+
+# foo is woken while already running (1.1), then sleeps and is really
+# woken at 5.0 - latency must be measured from 5.0, not stale 1.1.
+WAKEUP_WHILE_RUNNING = """\
+          <idle>-0     [000] d..3     0.900000: sched_wakeup: comm=foo pid=100 prio=120 success=1 target_cpu=000
+          <idle>-0     [000] d..3     1.000000: sched_switch: prev_comm=swapper/0 prev_pid=0 prev_prio=120 prev_state=R ==> next_comm=foo next_pid=100 next_prio=120
+             bar-200   [000] d..3     1.100000: sched_wakeup: comm=foo pid=100 prio=120 success=1 target_cpu=000
+             foo-100   [000] d..3     2.000000: sched_switch: prev_comm=foo prev_pid=100 prev_prio=120 prev_state=S ==> next_comm=swapper/0 next_pid=0 next_prio=120
+          <idle>-0     [000] d..3     5.000000: sched_wakeup: comm=foo pid=100 prio=120 success=1 target_cpu=000
+          <idle>-0     [000] d..3     5.001000: sched_switch: prev_comm=swapper/0 prev_pid=0 prev_prio=120 prev_state=R ==> next_comm=foo next_pid=100 next_prio=120
+"""
+
+# A (300) wakes B (400) at 1.5, B runs [1.6, 2.0) on cpu 1.
+WAKEUP_CHAIN = """\
+          <idle>-0     [000] d..3     1.000000: sched_switch: prev_comm=swapper/0 prev_pid=0 prev_prio=120 prev_state=R ==> next_comm=A next_pid=300 next_prio=120
+               A-300   [000] d..3     1.500000: sched_wakeup: comm=B pid=400 prio=120 success=1 target_cpu=001
+          <idle>-0     [001] d..3     1.600000: sched_switch: prev_comm=swapper/1 prev_pid=0 prev_prio=120 prev_state=R ==> next_comm=B next_pid=400 next_prio=120
+               B-400   [001] d..3     2.000000: sched_switch: prev_comm=B prev_pid=400 prev_prio=120 prev_state=S ==> next_comm=swapper/1 next_pid=0 next_prio=120
+               A-300   [000] d..3     2.100000: sched_switch: prev_comm=A prev_pid=300 prev_prio=120 prev_state=S ==> next_comm=swapper/0 next_pid=0 next_prio=120
+"""
+
+
+class TestWakeupLatencies(unittest.TestCase):
+
+    def test_wakeup_while_running_is_ignored(self):
+        trace = load_trace(WAKEUP_WHILE_RUNNING)
+        latencies = trace.cpu.wakeup_latencies(task=100)
+        self.assertEqual(len(latencies.latency), 2)
+        self.assertAlmostEqual(latencies.latency[0], 0.1)
+        self.assertAlmostEqual(latencies.latency[1], 0.001)
+
+
+class TestRunQueueDepth(unittest.TestCase):
+
+    def test_histogram_window_starts_mid_interval(self):
+        trace = load_trace(WAKEUP_WHILE_RUNNING)
+        # depth 1 over [0.2, 1.1), 0 over [1.1, 4.1) - window starts in former.
+        histogram = trace.cpu.runqueue_depth_histogram(cpu=0, interval=Interval(0.5, 3.0))
+        self.assertEqual(sorted(histogram.keys()), [0, 1])
+        self.assertAlmostEqual(histogram[1], 0.6)
+        self.assertAlmostEqual(histogram[0], 1.9)
+
+
+class TestTaskState(unittest.TestCase):
+
+    def setUp(self):
+        # foo: RUNNABLE [0, 0.1), RUNNING [0.1, 1.1), SLEEPING [1.1, 4.1),
+        # RUNNABLE [4.1, 4.101).
+        self.trace = load_trace(WAKEUP_WHILE_RUNNING)
+
+    def test_state_time_window_edges_mid_span(self):
+        state_time = self.trace.cpu.task_state_time(100, interval=Interval(0.05, 3.0))
+        self.assertEqual(set(state_time.keys()),
+                         set([TaskState.RUNNABLE, TaskState.RUNNING, TaskState.SLEEPING]))
+        self.assertAlmostEqual(state_time[TaskState.RUNNABLE], 0.05)
+        self.assertAlmostEqual(state_time[TaskState.RUNNING], 1.0)
+        self.assertAlmostEqual(state_time[TaskState.SLEEPING], 1.9)
+
+    def test_state_time_window_within_span(self):
+        state_time = self.trace.cpu.task_state_time(100, interval=Interval(1.5, 1.7))
+        self.assertEqual(state_time.keys(), [TaskState.SLEEPING])
+        self.assertAlmostEqual(state_time[TaskState.SLEEPING], 0.2)
+
+    def test_state_intervals_trimmed(self):
+        intervals = self.trace.cpu.task_state_intervals(100, interval=Interval(0.05, 3.0))
+        self.assertEqual([ti.state for ti in intervals],
+                         [TaskState.RUNNABLE, TaskState.RUNNING, TaskState.SLEEPING])
+        self.assertEqual([ti.cpu for ti in intervals], [None, 0, None])
+        self.assertAlmostEqual(intervals[0].interval.start, 0.05)
+        self.assertAlmostEqual(intervals[-1].interval.end, 3.0)
+
+
+class TestTimeMany(unittest.TestCase):
+
+    def test_busy_idle_time_many_window_edges(self):
+        trace = load_trace(WAKEUP_CHAIN)
+        # cpu 1 busy over [0.6, 1.0), trace ends at 1.1.
+        windows = [Interval(0.0, 0.25), Interval(0.25, 0.75), Interval(0.9, 1.2)]
+        self.assertEqual([round(t, 6) for t in trace.cpu.busy_time_many(1, windows)],
+                         [0.0, 0.15, 0.1])
+        self.assertEqual([round(t, 6) for t in trace.cpu.idle_time_many(1, windows)],
+                         [0.25, 0.35, 0.2])
+
+
+class TestCriticalPath(unittest.TestCase):
+
+    def setUp(self):
+        self.trace = load_trace(WAKEUP_CHAIN)
+
+    def test_hops_to_waker_trimmed_to_interval(self):
+        path = self.trace.cpu.critical_path(400, Interval(0.2, 0.9))
+        self.assertEqual([(ti.task.pid, ti.state, ti.cpu) for ti in path],
+                         [(300, TaskState.RUNNING, 0), (400, TaskState.RUNNABLE, None),
+                          (400, TaskState.RUNNING, 1)])
+        self.assertEqual([(round(ti.interval.start, 6), round(ti.interval.end, 6))
+                          for ti in path], [(0.2, 0.5), (0.5, 0.6), (0.6, 0.9)])
+
+    def test_no_hop_if_wakeup_before_interval(self):
+        path = self.trace.cpu.critical_path(400, Interval(0.55, 0.9))
+        self.assertEqual([ti.task.pid for ti in path], [400, 400])
+        self.assertAlmostEqual(path[0].interval.start, 0.55)
+
+    def test_wakeup_graph_window(self):
+        self.assertEqual(self.trace.cpu.wakeup_graph(), {300: {400: 1}})
+        self.assertEqual(self.trace.cpu.wakeup_graph(interval=Interval(0.5, 0.9)),
+                         {300: {400: 1}})
+        self.assertEqual(self.trace.cpu.wakeup_graph(interval=Interval(0.0, 0.4)), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+#!/usr/bin/python
+
+# Copyright 2015 Huawei Devices USA Inc. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+#
+# Authors:
+#       Chuk Orakwue <chuk.orakwue@huawei.com>
+
+import unittest
+from ftrace.interval import Interval
+from ftrace.components.energy import EnergyModel, ClusterEnergyModel, CapacityState
+from tests import load_trace
+
+# cpu0: idle loop [0, 0.1), A running [0.1, 0.5) - at 300MHz till 0.3, then
+# 1.2GHz -, idle loop [0.5, 0.6), LPM 0 [0.6, 1.0).
+# cpu1: LPM 1 [0, 0.8), idle loop at 300MHz [0.8, 1.0).
+ENERGY_TRACE = """\
+          <idle>-0     [000] d..3     1.000000: cpu_frequency: state=300000 cpu_id=0
+          <idle>-0     [001] d..3     1.000000: cpu_frequency: state=300000 cpu_id=1
+          <idle>-0     [001] d..3     1.000000: cpu_idle: state=1 cpu_id=1
+          <idle>-0     [000] d..3     1.100000: sched_switch: prev_comm=swapper/0 prev_pid=0 prev_prio=120 prev_state=R ==> next_comm=A next_pid=300 next_prio=120
+               A-300   [000] d..3     1.300000: cpu_frequency: state=1200000 cpu_id=0
+               A-300   [000] d..3     1.500000: sched_switch: prev_comm=A prev_pid=300 prev_prio=120 prev_state=S ==> next_comm=swapper/0 next_pid=0 next_prio=120
+          <idle>-0     [000] d..3     1.600000: cpu_idle: state=0 cpu_id=0
+          <idle>-0     [001] d..3     1.800000: cpu_idle: state=4294967295 cpu_id=1
+          <idle>-0     [000] d..3     2.000000: cpu_idle: state=4294967295 cpu_id=0
+"""
+
+MODEL = EnergyModel([ClusterEnergyModel(
+    cpus=0x3,
+    capacity_states={300000: CapacityState(100, 10.0), 1200000: CapacityState(400, 60.0)},
+    idle_states={0: 2.0, 1: 0.5}, cluster_power=5.0, cluster_idle_power=1.0)])
+
+
+class TestEnergy(unittest.TestCase):
+
+    def setUp(self):
+        self.energy = load_trace(ENERGY_TRACE).energy
+
+    def test_cpu_energy(self):
+        cpu_energy = self.energy.cpu_energy(MODEL)
+        # 0.2 * 10 + 0.2 * 60 busy, 0.1 * 10 + 0.1 * 60 idle loop, 0.4 * 2 LPM.
+        self.assertAlmostEqual(cpu_energy[0].busy_time, 0.4)
+        self.assertAlmostEqual(cpu_energy[0].energy, 21.8)
+        # (0.2 * 100 + 0.2 * 400) / (400 * 1.0)
+        self.assertAlmostEqual(cpu_energy[0].utilization, 0.25)
+        # cpu with single frequency event stays at that frequency.
+        self.assertAlmostEqual(cpu_energy[1].energy, 0.8 * 0.5 + 0.2 * 10)
+
+    def test_cpu_energy_window_edges(self):
+        cpu_energy = self.energy.cpu_energy(MODEL, cpu=0, interval=Interval(0.2, 0.7))
+        self.assertAlmostEqual(cpu_energy.busy_time, 0.3)
+        self.assertAlmostEqual(cpu_energy.energy, 0.1 * 10 + 0.2 * 60 + 0.1 * 60 + 0.1 * 2)
+        self.assertAlmostEqual(cpu_energy.utilization, (0.1 * 100 + 0.2 * 400) / (400 * 0.5))
+
+    def test_cluster_and_task_energy(self):
+        cluster_energy = self.energy.cluster_energy(MODEL, cluster=0x3)
+        # both cpus in LPM over [0.6, 0.8) only.
+        self.assertAlmostEqual(cluster_energy.active_time, 0.8)
+        self.assertAlmostEqual(cluster_energy.energy, 21.8 + 2.4 + 5.0 * 0.8 + 1.0 * 0.2)
+        task_energy = self.energy.task_energy(MODEL, task=300, interval=Interval(0.2, 0.7))
+        self.assertAlmostEqual(task_energy.busy_time, 0.3)
+        self.assertAlmostEqual(task_energy.energy, 0.1 * 10 + 0.2 * 60)
+
+
+if __name__ == '__main__':
+    unittest.main()
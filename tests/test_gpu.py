@@ -0,0 +1,51 @@
+#!/usr/bin/python
+
+# Copyright 2015 Huawei Devices USA Inc. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+#
+# Authors:
+#       Chuk Orakwue <chuk.orakwue@huawei.com>
+
+import unittest
+from ftrace.interval import Interval
+from tests import load_trace
+
+# GPU ACTIVE [0, 0.0005), NAP [0.0005, 0.5), AWARE [0.5, 0.7), SLUMBER after
+# (relative to first event).
+GPU_PWRSTATES = """\
+     kworker/0:1-50    [000] ...1     1.000000: kgsl_pwr_set_state: d_name=kgsl-3d0 state=ACTIVE
+     kworker/0:1-50    [000] ...1     1.000500: kgsl_pwr_set_state: d_name=kgsl-3d0 state=NAP
+     kworker/0:1-50    [000] ...1     1.500000: kgsl_pwr_set_state: d_name=kgsl-3d0 state=AWARE
+     kworker/0:1-50    [000] ...1     1.700000: kgsl_pwr_set_state: d_name=kgsl-3d0 state=SLUMBER
+     kworker/0:1-50    [000] ...1     2.000000: kgsl_pwr_set_state: d_name=kgsl-3d0 state=ACTIVE
+"""
+
+
+class TestGpuTimeMany(unittest.TestCase):
+
+    def test_busy_idle_time_many_window_edges(self):
+        gpu = load_trace(GPU_PWRSTATES).gpu
+        windows = [Interval(0.0002, 0.0108), Interval(0.4, 0.6), Interval(0.6, 1.0)]
+        # busy is ACTIVE only, idle includes AWARE.
+        self.assertEqual([round(t, 6) for t in gpu.busy_time_many(windows)],
+                         [0.0003, 0.0, 0.0])
+        self.assertEqual([round(t, 6) for t in gpu.idle_time_many(windows)],
+                         [0.0103, 0.2, 0.4])
+        self.assertEqual([round(t, 6) for t in gpu.lpm_time_many(windows)],
+                         [0.0103, 0.1, 0.3])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+#!/usr/bin/python
+
+# Copyright 2015 Huawei Devices USA Inc. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+#
+# Authors:
+#       Chuk Orakwue <chuk.orakwue@huawei.com>
+
+import unittest
+from collections import namedtuple
+from ftrace.interval import Interval, IntervalList
+
+Span = namedtuple('Span', ['interval'])
+
+
+class TestOverlapDurations(unittest.TestCase):
+
+    def test_trimmed_to_each_interval(self):
+        spans = IntervalList([Span(Interval(1.0, 2.0)), Span(Interval(3.0, 3.5)),
+                              Span(Interval(3.25, 4.0))])
+        windows = [Interval(0.0, 1.5), Interval(1.5, 3.25), Interval(3.0, 3.5),
+                   Interval(4.0, 5.0), Interval(1.2, 1.3)]
+        # windows are answered in any order, overlapping objects add up.
+        self.assertEqual([round(d, 6) for d in spans.overlap_durations(windows)],
+                         [0.5, 0.75, 0.75, 0.0, 0.1])
+
+    def test_accepts_objects_with_intervals(self):
+        spans = IntervalList([Span(Interval(1.0, 2.0))])
+        self.assertEqual(list(spans.overlap_durations([Span(Interval(1.5, 2.5))])), [0.5])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+#!/usr/bin/python
+
+# Copyright 2015 Huawei Devices USA Inc. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+#
+# Authors:
+#       Chuk Orakwue <chuk.orakwue@huawei.com>
+
+import unittest
+from ftrace.interval import Interval
+from ftrace.components.irq import IRQType
+from tests import load_trace
+
+LINE = '             app-1000  [000] d.h3 {ts:12.6f}: {tracepoint}: {data}\n'
+
+
+def irq_trace(*events):
+    """Returns trace lines of (timestamp, tracepoint, data) events on cpu 0"""
+    return ''.join(LINE.format(ts=ts, tracepoint=tracepoint, data=data)
+                   for ts, tracepoint, data in events)
+
+
+class TestIRQ(unittest.TestCase):
+
+    def setUp(self):
+        self.trace = load_trace(irq_trace(
+            (1.0, 'irq_handler_entry', 'irq=45 name=msm_sdcc'),
+            (1.0001, 'irq_handler_exit', 'irq=45 ret=handled'),
+            # NET_RX raised & run, with timer hardirq nested.
+            (1.01, 'softirq_raise', 'vec=3 [action=NET_RX]'),
+            (1.0101, 'softirq_entry', 'vec=3 [action=NET_RX]'),
+            (1.0102, 'irq_handler_entry', 'irq=19 name=arch_timer'),
+            (1.0104, 'irq_handler_exit', 'irq=19 ret=handled'),
+            (1.0106, 'softirq_exit', 'vec=3 [action=NET_RX]'),
+            (1.02, 'irq_handler_entry', 'irq=45 name=msm_sdcc'),
+            (1.025, 'irq_handler_exit', 'irq=45 ret=unhandled'),
+            # entered before trace started.
+            (1.03, 'irq_handler_exit', 'irq=200 ret=handled'),
+            # still running at last event.
+            (1.04, 'irq_handler_entry', 'irq=45 name=msm_sdcc'),
+            (1.045, 'softirq_raise', 'vec=1 [action=TIMER]')))
+        self.irq = self.trace.irq
+
+    def _spans(self, intervals):
+        return [(span.irq, span.depth, round(span.interval.start, 6),
+                 round(span.interval.end, 6)) for span in intervals]
+
+    def test_spans(self):
+        self.assertEqual(self._spans(self.irq.hardirq_intervals()),
+                         [(45, 0, 0.0, 0.0001), (19, 1, 0.0102, 0.0104),
+                          (45, 0, 0.02, 0.025), (45, 0, 0.04, 0.045)])
+        softirqs = self.irq.softirq_intervals()
+        self.assertEqual(self._spans(softirqs), [(3, 0, 0.0101, 0.0106)])
+        self.assertAlmostEqual(softirqs[0].self_time, 0.0003)
+        self.assertEqual(self.irq.names[(IRQType.SOFTIRQ, 3)], 'NET_RX')
+
+    def test_span_started_before_interval(self):
+        self.assertEqual(self._spans(self.irq.hardirq_intervals(interval=Interval(0.021, 0.022))),
+                         [(45, 0, 0.02, 0.025)])
+        # span ending at interval start doesn't overlap it.
+        self.assertEqual(len(self.irq.hardirq_intervals(interval=Interval(0.025, 0.03))), 0)
+
+    def test_softirq_latencies(self):
+        latencies = self.irq.softirq_latencies()
+        self.assertEqual([(sl.vec, sl.action) for sl in latencies], [(3, 'NET_RX')])
+        self.assertAlmostEqual(latencies[0].latency, 0.0001)
+        # by raise time, [start, end)
+        self.assertEqual(len(self.irq.softirq_latencies(interval=Interval(0.01, 0.0101))), 1)
+        self.assertEqual(len(self.irq.softirq_latencies(interval=Interval(0.0101, 0.02))), 0)
+
+    def test_stats_by_start_time(self):
+        stats = self.irq.irq_stats()
+        self.assertEqual((stats[45].name, stats[45].count), ('msm_sdcc', 3))
+        self.assertAlmostEqual(stats[45].time, 0.0101)
+        # spans starting within [start, end)
+        stats = self.irq.irq_stats(interval=Interval(0.02, 0.04))
+        self.assertEqual(stats.keys(), [45])
+        self.assertEqual(stats[45].count, 1)
+        self.assertAlmostEqual(stats[45].time, 0.005)
+        self.assertAlmostEqual(stats[45].rate, 50.0)
+
+    def test_stolen_time(self):
+        self.assertAlmostEqual(self.irq.stolen_time(task=1000), 0.0106)
+        self.assertAlmostEqual(self.irq.stolen_time(task=1000, interval=Interval(0.01, 0.04)),
+                               0.0055)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+#!/usr/bin/python
+
+# Copyright 2015 Huawei Devices USA Inc. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+#
+# Authors:
+#       Chuk Orakwue <chuk.orakwue@huawei.com>
+
+import unittest
+from ftrace.interval import Interval
+from ftrace.components.latency import LatencyType
+from tests import load_trace
+
+# cpu0: irqs off & preempt depth 1 over [0.001, 0.004), need_resched over
+# [0.003, 0.01). cpu1: irqs off & preempt depth 2 over [0.0035, 0.03).
+LATENCY_TRACE = """\
+               a-10    [000] ....     1.000000: sched_wakeup: comm=b pid=11 prio=120 success=1 target_cpu=000
+               a-10    [000] d.h1     1.001000: sched_wakeup: comm=b pid=11 prio=120 success=1 target_cpu=000
+               a-10    [000] dN.1     1.003000: sched_wakeup: comm=b pid=11 prio=120 success=1 target_cpu=000
+               c-12    [001] d..2     1.003500: sched_wakeup: comm=b pid=11 prio=120 success=1 target_cpu=001
+               a-10    [000] .N..     1.004000: sched_wakeup: comm=b pid=11 prio=120 success=1 target_cpu=000
+               a-10    [000] ....     1.010000: sched_wakeup: comm=b pid=11 prio=120 success=1 target_cpu=000
+               c-12    [001] d..2     1.020000: sched_wakeup: comm=b pid=11 prio=120 success=1 target_cpu=001
+               c-12    [001] ....     1.030000: sched_wakeup: comm=b pid=11 prio=120 success=1 target_cpu=001
+"""
+
+
+def spans(intervals):
+    return [(li.cpu, round(li.interval.start, 6), round(li.interval.end, 6))
+            for li in intervals]
+
+
+class TestLatency(unittest.TestCase):
+
+    def setUp(self):
+        self.latency = load_trace(LATENCY_TRACE).latency
+
+    def test_spans_from_flags(self):
+        self.assertEqual(spans(self.latency.irqsoff_intervals()),
+                         [(0, 0.001, 0.004), (1, 0.0035, 0.03)])
+        self.assertEqual(spans(self.latency.preemptoff_intervals()),
+                         [(0, 0.001, 0.004), (1, 0.0035, 0.03)])
+        self.assertEqual(spans(self.latency.need_resched_intervals(cpu=0)),
+                         [(0, 0.003, 0.01)])
+
+    def test_window_starting_mid_span(self):
+        window = Interval(0.002, 0.005)
+        self.assertEqual(spans(self.latency.irqsoff_intervals(interval=window)),
+                         [(0, 0.002, 0.004), (1, 0.0035, 0.005)])
+        self.assertEqual(spans(self.latency.need_resched_intervals(cpu=0, interval=window)),
+                         [(0, 0.003, 0.005)])
+        self.assertEqual(self.latency.irqsoff_intervals(interval=Interval(0.01, 0.015))[0].cpu, 1)
+
+    def test_worst_offenders(self):
+        offenders = self.latency.worst_offenders(LatencyType.IRQS_OFF)
+        self.assertEqual([(lo.task.pid, lo.count) for lo in offenders], [(12, 1), (10, 1)])
+        self.assertAlmostEqual(offenders[0].max, 0.0265)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+#!/usr/bin/python
+
+# Copyright 2015 Huawei Devices USA Inc. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+#
+# Authors:
+#       Chuk Orakwue <chuk.orakwue@huawei.com>
+
+import unittest
+from ftrace.sched_hmp import HMPMigrate
+from tests import load_trace
+
+HMP_MIGRATE = ('             foo-100   [000] d..3 {ts:12.6f}: sched_hmp_migrate: '
+               'comm=foo pid=100 dest={dest} force={force}\n')
+MIGRATE_TASK = ('             foo-100   [000] d..3 {ts:12.6f}: sched_migrate_task: '
+                'comm=foo pid=100 prio=120 orig_cpu={orig} dest_cpu={dest}\n')
+
+
+class TestMigrations(unittest.TestCase):
+
+    def test_hmp_only_trace(self):
+        trace = load_trace(HMP_MIGRATE.format(ts=1.0, dest=4, force=0) +
+                           HMP_MIGRATE.format(ts=2.0, dest=0, force=2))
+        rv = trace.migrations.migrations(task=100)
+        self.assertEqual([m.dest_cpu for m in rv], [4, 0])
+        self.assertEqual([m.migrate_type for m in rv], [HMPMigrate.WAKE, HMPMigrate.OFFLOAD])
+
+    def test_replaced_hmp_event_is_kept(self):
+        # first hmp decision (to cpu 5) is superseded before any migration.
+        trace = load_trace(HMP_MIGRATE.format(ts=1.0, dest=5, force=1) +
+                           HMP_MIGRATE.format(ts=1.5, dest=4, force=0) +
+                           MIGRATE_TASK.format(ts=1.6, orig=0, dest=4))
+        rv = trace.migrations.migrations()
+        self.assertEqual([(m.orig_cpu, m.dest_cpu, m.migrate_type) for m in rv],
+                         [(-1, 5, HMPMigrate.FORCED), (0, 4, HMPMigrate.WAKE)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+#!/usr/bin/python
+
+# Copyright 2015 Huawei Devices USA Inc. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+#
+# Authors:
+#       Chuk Orakwue <chuk.orakwue@huawei.com>
+
+
+import unittest
+from ftrace.parsers import PARSERS
+
+WORK = 'ffffffc0e75b8f08'
+
+
+class TestWorkqueueParsers(unittest.TestCase):
+
+    def test_work_struct_is_pointer_only(self):
+        payloads = {
+            'workqueue_queue_work': 'work struct={} function=vmstat_update '
+                                    'workqueue=ffffffc0f1a0a000 req_cpu=2 cpu=2'.format(WORK),
+            'workqueue_activate_work': 'work struct {}'.format(WORK),
+            'workqueue_execute_start': 'work struct {}: function vmstat_update'.format(WORK),
+            'workqueue_execute_end': 'work struct {}'.format(WORK),
+        }
+        for tracepoint, payload in payloads.iteritems():
+            self.assertEqual(PARSERS[tracepoint](payload).work_struct, WORK)
+
+    def test_execute_end_with_function(self):
+        # newer kernels also print function on execute_end.
+        data = PARSERS['workqueue_execute_end'](
+            'work struct {}: function vmstat_update'.format(WORK))
+        self.assertEqual(data.work_struct, WORK)
+
+
+class TestIRQParsers(unittest.TestCase):
+
+    def test_handler_exit_ret(self):
+        data = PARSERS['irq_handler_exit']('irq=45 ret=unhandled')
+        self.assertEqual((data.irq, data.ret), (45, 'unhandled'))
+
+
+class TestSyncParsers(unittest.TestCase):
+
+    def test_wait_state_or_status(self):
+        # kernel prints 'state=', older ones 'status='.
+        for payload in ('end name=f1 state=-2', 'end name=f1 status=-2'):
+            data = PARSERS['sync_wait'](payload)
+            self.assertEqual((data.begin, data.name, data.status), ('end', 'f1', -2))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+#!/usr/bin/python
+
+# Copyright 2015 Huawei Devices USA Inc. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+#
+# Authors:
+#       Chuk Orakwue <chuk.orakwue@huawei.com>
+
+import unittest
+from ftrace.interval import Interval
+from tests import load_trace
+
+# GPU ACTIVE [0, 0.0005), NAP [0.0005, 0.5), ACTIVE [0.5, 0.7), SLUMBER after
+# (relative to first event).
+GPU_PWRSTATES = """\
+     kworker/0:1-50    [000] ...1     1.000000: kgsl_pwr_set_state: d_name=kgsl-3d0 state=ACTIVE
+     kworker/0:1-50    [000] ...1     1.000500: kgsl_pwr_set_state: d_name=kgsl-3d0 state=NAP
+     kworker/0:1-50    [000] ...1     1.500000: kgsl_pwr_set_state: d_name=kgsl-3d0 state=ACTIVE
+     kworker/0:1-50    [000] ...1     1.700000: kgsl_pwr_set_state: d_name=kgsl-3d0 state=SLUMBER
+     kworker/0:1-50    [000] ...1     2.000000: kgsl_pwr_set_state: d_name=kgsl-3d0 state=ACTIVE
+"""
+
+# `queued` counter of pids 10 & 20, with samples interleaved.
+COUNTERS = """\
+             p10-10    [000] ...1     1.000000: tracing_mark_write: C|10|queued|1
+             p20-20    [000] ...1     1.000200: tracing_mark_write: C|20|queued|5
+             p10-10    [000] ...1     1.000700: tracing_mark_write: C|10|queued|3
+             p20-20    [000] ...1     1.001500: tracing_mark_write: C|20|queued|7
+             p10-10    [000] ...1     1.010000: tracing_mark_write: C|10|queued|0
+"""
+
+
+class TestSummary(unittest.TestCase):
+
+    def setUp(self):
+        self.trace = load_trace(GPU_PWRSTATES)
+
+    def test_gpu_pwrstate_series(self):
+        summary = self.trace.summary
+        for series in ['gpu.busy', 'gpu.active', 'gpu.aware', 'gpu.nap', 'gpu.slumber']:
+            self.assertIn(series, summary.series)
+        self.assertAlmostEqual(summary.range_stats('gpu.active').time, 0.2005)
+        self.assertAlmostEqual(summary.range_stats('gpu.nap').time, 0.4995)
+        self.assertAlmostEqual(summary.range_stats('gpu.slumber').time, 0.3)
+        self.assertAlmostEqual(summary.range_stats('gpu.aware').time, 0.0)
+
+    def test_edge_buckets_trimmed_exactly(self):
+        # both edges fall mid-bucket (1ms), ACTIVE only in [0, 0.0005).
+        stats = self.trace.summary.range_stats('gpu.active',
+                                               interval=Interval(0.0002, 0.0108))
+        self.assertAlmostEqual(stats.time, 0.0003)
+        stats = self.trace.summary.range_stats('gpu.nap',
+                                               interval=Interval(0.0002, 0.0108))
+        self.assertAlmostEqual(stats.time, 0.0103)
+
+
+class TestCounterSummary(unittest.TestCase):
+
+    def test_counter_series_per_track(self):
+        summary = load_trace(COUNTERS).summary
+        self.assertEqual(summary._series_keys('android.counter'),
+                         [(10, 'queued'), (20, 'queued')])
+        # window edges mid-bucket, pid 10 is 1 over [0, 0.0007) then 3.
+        stats = summary.range_stats('android.counter', key=(10, 'queued'),
+                                    interval=Interval(0.0004, 0.0012))
+        self.assertAlmostEqual(stats.time, 0.0008)
+        self.assertAlmostEqual(stats.mean, (1 * 0.0003 + 3 * 0.0005) / 0.0008)
+        self.assertEqual((stats.min, stats.max), (1.0, 3.0))
+        # pid 20 is known from 0.0002 only.
+        stats = summary.range_stats('android.counter', key=(20, 'queued'),
+                                    interval=Interval(0.0, 0.002))
+        self.assertAlmostEqual(stats.time, 0.0018)
+        self.assertEqual((stats.min, stats.max), (5.0, 7.0))
+
+
+if __name__ == '__main__':
+    unittest.main()
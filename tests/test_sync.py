@@ -0,0 +1,115 @@
+#!/usr/bin/python
+
+# Copyright 2015 Huawei Devices USA Inc. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+#
+# Authors:
+#       Chuk Orakwue <chuk.orakwue@huawei.com>
+
+import unittest
+from ftrace.common import FtraceError
+from ftrace.interval import Interval
+from tests import load_trace
+
+LINE = '{comm:>16}-{pid:<5} [000] d..3 {ts:12.6f}: {tracepoint}: {data}\n'
+
+TASKS = {50: 'kgsl_worker', 51: 'mdss_fb0', 2001: 'RenderThread', 2002: 'surfaceflinger'}
+
+# RenderThread waits on f1 (GPU) [0.01, 0.021], then f3 (never signalled,
+# timed out) [0.06, 0.07]. surfaceflinger waits on f2 (GPU & display)
+# [0.015, 0.031], display signalled last.
+SYNC = [
+    (1.0, 50, 'sync_timeline', 'name=kgsl-3d0 value=1'),
+    (1.01, 2001, 'sync_wait', 'begin name=f1 state=0'),
+    (1.01, 2001, 'sync_pt', 'name=kgsl-3d0 value=2'),
+    (1.015, 2002, 'sync_wait', 'begin name=f2 state=0'),
+    (1.015, 2002, 'sync_pt', 'name=kgsl-3d0 value=2'),
+    (1.015, 2002, 'sync_pt', 'name=mdss_fb_0 value=1'),
+    (1.02, 50, 'sync_timeline', 'name=kgsl-3d0 value=2'),
+    (1.021, 2001, 'sync_wait', 'end name=f1 state=1'),
+    (1.03, 51, 'sync_timeline', 'name=mdss_fb_0 value=1'),
+    (1.031, 2002, 'sync_wait', 'end name=f2 state=1'),
+    # began before trace started.
+    (1.05, 2002, 'sync_wait', 'end name=f0 state=1'),
+    (1.06, 2001, 'sync_wait', 'begin name=f3 state=0'),
+    (1.06, 2001, 'sync_pt', 'name=kgsl-3d0 value=9'),
+    (1.07, 2001, 'sync_wait', 'end name=f3 state=0'),
+]
+
+
+def sync_trace(events):
+    """Returns trace lines of (timestamp, pid, tracepoint, data) events"""
+    return ''.join(LINE.format(comm=TASKS[pid], pid=pid, ts=ts, tracepoint=tracepoint,
+                               data=data) for ts, pid, tracepoint, data in events)
+
+
+class TestSync(unittest.TestCase):
+
+    def setUp(self):
+        self.sync = load_trace(sync_trace(SYNC)).sync
+
+    def _waits(self, waits):
+        return [(fw.task.pid, fw.fence) for fw in waits]
+
+    def test_fence_waits_linked_to_last_signal(self):
+        waits = self.sync.fence_waits()
+        self.assertEqual(self._waits(waits), [(2001, 'f1'), (2002, 'f2'), (2001, 'f3')])
+        f1, f2, f3 = waits
+        self.assertEqual((f1.timeline, f1.value, f1.status), ('kgsl-3d0', 2, 1))
+        self.assertAlmostEqual(f1.signal_time, 0.02)
+        self.assertEqual((f2.timeline, f2.value), ('mdss_fb_0', 1))
+        self.assertAlmostEqual(f2.signal_time, 0.03)
+        self.assertEqual((f3.timeline, f3.signal_time, f3.status), (None, None, 0))
+        self.assertEqual(self._waits(self.sync.fence_waits(timeline='mdss_fb_0')),
+                         [(2002, 'f2')])
+
+    def test_fence_waits_overlapping_interval(self):
+        self.assertEqual(self._waits(self.sync.fence_waits(interval=Interval(0.02, 0.025))),
+                         [(2001, 'f1'), (2002, 'f2')])
+        # waits ending at interval start, or starting at its end don't overlap.
+        self.assertEqual(self._waits(self.sync.fence_waits(interval=Interval(0.021, 0.025))),
+                         [(2002, 'f2')])
+        self.assertEqual(len(self.sync.fence_waits(interval=Interval(0.031, 0.06))), 0)
+
+    def test_wait_time(self):
+        wait_time = dict((task.pid, time) for task, time in self.sync.wait_time().iteritems())
+        self.assertEqual(sorted(wait_time), [2001, 2002])
+        self.assertAlmostEqual(wait_time[2001], 0.021)
+        self.assertAlmostEqual(wait_time[2002], 0.016)
+        wait_time = self.sync.wait_time(by='timeline')
+        self.assertEqual(sorted(wait_time), ['kgsl-3d0', 'mdss_fb_0'])
+        self.assertAlmostEqual(wait_time['kgsl-3d0'], 0.011)
+        # trimmed to interval.
+        wait_time = dict((task.pid, time) for task, time in
+                         self.sync.wait_time(interval=Interval(0.015, 0.065)).iteritems())
+        self.assertAlmostEqual(wait_time[2001], 0.011)
+        self.assertAlmostEqual(wait_time[2002], 0.016)
+
+    def test_frame_wait_times(self):
+        frames = [Interval(0.0, 0.02), Interval(0.02, 0.04), Interval(0.04, 0.065)]
+        for kwargs, expected in (({'task': 2001}, [0.01, 0.001, 0.005]),
+                                 ({'timeline': 'kgsl-3d0'}, [0.01, 0.001, 0.0]),
+                                 ({}, [0.015, 0.012, 0.005])):
+            times = self.sync.frame_wait_times(frames, **kwargs)
+            self.assertEqual([round(time, 6) for time in times], expected)
+
+    def test_timeline_signals(self):
+        signals = self.sync.timeline_signals('kgsl-3d0', interval=Interval(0.0, 0.02))
+        self.assertEqual([signal.value for signal in signals], [1])
+        self.assertRaises(FtraceError, self.sync.timeline_signals, 'unknown')
+
+
+if __name__ == '__main__':
+    unittest.main()